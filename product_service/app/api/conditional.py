@@ -0,0 +1,63 @@
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Iterable, Optional
+from fastapi import Request, Response
+
+def make_etag(*parts: Any) -> str:
+    """
+    Strong ETag over the row versions a representation is built from.
+    """
+    digest = hashlib.sha256(":".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+def latest(*timestamps: Optional[datetime]) -> Optional[datetime]:
+    values = [ts for ts in timestamps if ts is not None]
+    return max(values) if values else None
+
+def _as_utc(value: datetime) -> datetime:
+    # SQLite hands back naive timestamps; func.now() stores them in UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).replace(microsecond=0)
+
+def _etag_matches(header: str, etag: str) -> bool:
+    if header.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison
+    candidates: Iterable[str] = (tag.strip() for tag in header.split(","))
+    return any(tag[2:] == etag if tag.startswith("W/") else tag == etag for tag in candidates)
+
+def check_not_modified(
+    request: Request,
+    response: Response,
+    *,
+    etag: str,
+    last_modified: Optional[datetime] = None,
+) -> Optional[Response]:
+    """
+    Set the validators on `response` and return a 304 response if the client's copy is current.
+    """
+    validators = {"ETag": etag}
+    if last_modified is not None:
+        last_modified = _as_utc(last_modified)
+        validators["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+    response.headers.update(validators)
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        not_modified = _etag_matches(if_none_match, etag)
+    else:
+        not_modified = False
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and last_modified is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                since = None
+            if since is not None:
+                not_modified = last_modified <= _as_utc(since)
+
+    if not_modified:
+        return Response(status_code=304, headers=validators)
+    return None
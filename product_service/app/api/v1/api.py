@@ -1,8 +1,10 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import products, cart, orders
+from app.api.v1.endpoints import products, cart, orders, reservations, analytics
 
 api_router = APIRouter()
 
 api_router.include_router(products.router, prefix="/products", tags=["products"])
 api_router.include_router(cart.router, prefix="/cart", tags=["cart"])
-api_router.include_router(orders.router, prefix="/orders", tags=["orders"]) 
\ No newline at end of file
+api_router.include_router(orders.router, prefix="/orders", tags=["orders"])
+api_router.include_router(reservations.router, prefix="/reservations", tags=["reservations"])
+api_router.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
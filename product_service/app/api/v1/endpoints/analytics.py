@@ -0,0 +1,85 @@
+from datetime import date
+from typing import Any, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from app.core.database import get_db
+from app.schemas.analytics import CategorySales, DailySales, ProductSales
+from app.services.analytics import sales_rollup_service
+from app.api.deps import get_current_active_admin
+
+router = APIRouter()
+
+@router.get("/sales/daily", response_model=List[DailySales])
+def read_daily_sales(
+    db: Session = Depends(get_db),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    category_id: Optional[int] = None,
+    current_user: Any = Depends(get_current_active_admin),
+) -> Any:
+    """
+    Sales per day, for the whole shop or one category (default: the last 30 days).
+    """
+    try:
+        return sales_rollup_service.daily(db, start=start, end=end, category_id=category_id)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@router.get("/sales/products", response_model=List[ProductSales])
+def read_product_sales(
+    db: Session = Depends(get_db),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    limit: int = Query(20, ge=1, le=500),
+    current_user: Any = Depends(get_current_active_admin),
+) -> Any:
+    """
+    Best selling products of a date range.
+    """
+    try:
+        return sales_rollup_service.by_product(db, start=start, end=end, limit=limit)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@router.get("/sales/products/{product_id}", response_model=List[DailySales])
+def read_daily_product_sales(
+    product_id: int,
+    db: Session = Depends(get_db),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    current_user: Any = Depends(get_current_active_admin),
+) -> Any:
+    """
+    Sales per day of one product.
+    """
+    try:
+        return sales_rollup_service.daily(db, start=start, end=end, product_id=product_id)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@router.get("/sales/categories", response_model=List[CategorySales])
+def read_category_sales(
+    db: Session = Depends(get_db),
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    current_user: Any = Depends(get_current_active_admin),
+) -> Any:
+    """
+    Sales per category over a date range.
+    """
+    try:
+        return sales_rollup_service.by_category(db, start=start, end=end)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
@@ -2,7 +2,7 @@ from typing import Any, List
 from fastapi import APIRouter, Depends, HTTPException, status, Response
 from sqlalchemy.orm import Session
 from app.core.database import get_db
-from app.schemas.cart import Cart, CartCreate, CartItem, CartItemCreate, CartItemUpdate
+from app.schemas.cart import Cart, CartCreate, CartItem, CartItemCreate, CartItemUpdate, CartItemBulkUpdate, CartSummary
 from app.services.cart import cart_service
 from app.api.deps import get_current_active_user
 
@@ -17,10 +17,18 @@ def read_cart(
     """
     Get current user's cart.
     """
-    cart = cart_service.get_by_user_id(db, user_id=current_user.id)
-    if not cart:
-        cart = cart_service.create(db, user_id=current_user.id)
-    return cart
+    return cart_service.get_or_empty(db, user_id=current_user.id)
+
+@router.get("/summary", response_model=CartSummary)
+def read_cart_summary(
+    *,
+    db: Session = Depends(get_db),
+    current_user: Any = Depends(get_current_active_user),
+) -> Any:
+    """
+    Get item count, subtotal and availability flags of the current user's cart.
+    """
+    return cart_service.summary(db, user_id=current_user.id)
 
 @router.post("/items/", response_model=CartItem)
 def add_cart_item(
@@ -32,9 +40,7 @@ def add_cart_item(
     """
     Add item to cart.
     """
-    cart = cart_service.get_by_user_id(db, user_id=current_user.id)
-    if not cart:
-        cart = cart_service.create(db, user_id=current_user.id)
+    cart = cart_service.get_or_create(db, user_id=current_user.id)
     
     try:
         cart_item = cart_service.add_item(
@@ -50,6 +56,27 @@ def add_cart_item(
             detail=str(e)
         )
 
+@router.patch("/items", response_model=Cart)
+def update_cart_items(
+    *,
+    db: Session = Depends(get_db),
+    bulk_in: CartItemBulkUpdate,
+    current_user: Any = Depends(get_current_active_user),
+) -> Any:
+    """
+    Apply a list of add / set / remove operations to the cart in one transaction.
+    """
+    cart = cart_service.get_or_create(db, user_id=current_user.id)
+
+    try:
+        return cart_service.apply_operations(db, cart_id=cart.id, operations=bulk_in.operations)
+    except ValueError as e:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
 @router.put("/items/{item_id}", response_model=CartItem)
 def update_cart_item(
     *,
@@ -115,6 +142,7 @@ def clear_cart(
 ):
     cart = cart_service.get_by_user_id(db, user_id=current_user.id)
     if not cart:
-        raise HTTPException(status_code=404, detail="Cart not found")
+        # A virtual cart is already empty
+        return Response(status_code=200)
     cart_service.clear_cart(db, cart_id=cart.id)
     return Response(status_code=200) 
\ No newline at end of file
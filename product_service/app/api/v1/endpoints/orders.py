@@ -1,49 +1,262 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status
+import json
+from typing import Any, Callable, List, Optional, Tuple
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
+from app.core.config import settings
 from app.core.database import get_db
-from app.schemas.order import Order, OrderCreate, OrderUpdate
+from app.schemas.order import (
+    Order, OrderAccepted, OrderBulkResult, OrderBulkSelection, OrderBulkStatusUpdate, OrderCreate,
+    OrderIntent, OrderSummary, OrderUpdate,
+)
+from app.services.idempotency import IdempotencyConflict, idempotency_service
 from app.services.order import order_service
+from app.services.order_intake import order_intake_service
 from app.api.deps import get_current_active_user, get_current_active_admin
 
 router = APIRouter()
 
-@router.post("/", response_model=Order)
+def _order_body(order: Any) -> Any:
+    return jsonable_encoder(Order.model_validate(order))
+
+def _accepted_body(request: Request, intent: Any) -> Any:
+    return jsonable_encoder(OrderAccepted(
+        intent_id=intent.id,
+        status=intent.status,
+        status_url=str(request.url_for("read_order_intent", intent_id=intent.id)),
+    ))
+
+def _accepted(body: Any, **headers: str) -> JSONResponse:
+    return JSONResponse(
+        content=body,
+        status_code=status.HTTP_202_ACCEPTED,
+        headers=dict(headers, Location=body["status_url"]),
+    )
+
+def _place_idempotent(
+    db: Session,
+    request: Request,
+    *,
+    idempotency_key: Optional[str],
+    user_id: int,
+    endpoint: str,
+    payload: Any,
+    place: Callable[[Optional[int]], Any],
+    enqueue: Callable[[Optional[int]], Any],
+) -> Any:
+    """
+    Place the order now (`place`) or, in async intake mode, queue it (`enqueue`), at
+    most once per Idempotency-Key; replays get the stored response.
+    """
+    queued = settings.ORDER_INTAKE_MODE == "async"
+
+    def run(key_id: Optional[int]) -> Tuple[int, Any]:
+        if queued:
+            return status.HTTP_202_ACCEPTED, _accepted_body(request, enqueue(key_id))
+        return status.HTTP_200_OK, _order_body(place(key_id))
+
+    if idempotency_key is None:
+        try:
+            status_code, body = run(None)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        return _accepted(body) if status_code == status.HTTP_202_ACCEPTED else body
+
+    try:
+        record, owner = idempotency_service.claim(
+            db,
+            user_id=user_id,
+            key=idempotency_key,
+            endpoint=endpoint,
+            fingerprint=idempotency_service.fingerprint(endpoint, payload),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except IdempotencyConflict as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    record_id = record.id
+    if not owner:
+        if record.response_body is not None:
+            body = json.loads(record.response_body)
+            status_code = record.response_code
+        elif record.intent_id is not None:
+            # The intent committed but its response was never stored
+            body = _accepted_body(request, order_intake_service.get(db, id=record.intent_id))
+            status_code = status.HTTP_202_ACCEPTED
+        else:
+            body = _order_body(order_service.get(db, id=record.order_id))
+            status_code = status.HTTP_200_OK
+        if status_code == status.HTTP_202_ACCEPTED:
+            return _accepted(body, **{"Idempotent-Replayed": "true"})
+        return JSONResponse(content=body, status_code=status_code, headers={"Idempotent-Replayed": "true"})
+
+    try:
+        status_code, body = run(record_id)
+    except ValueError as e:
+        idempotency_service.release(db, record_id)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception:
+        idempotency_service.release(db, record_id)
+        raise
+    idempotency_service.store_response(db, record_id, status_code=status_code, body=body)
+    return _accepted(body) if status_code == status.HTTP_202_ACCEPTED else body
+
+@router.post(
+    "/",
+    response_model=Order,
+    responses={status.HTTP_202_ACCEPTED: {"model": OrderAccepted}},
+)
 def create_order(
     *,
     db: Session = Depends(get_db),
+    request: Request,
     order_in: OrderCreate,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    current_user: Any = Depends(get_current_active_user),
+) -> Any:
+    """
+    Create new order. In async intake mode the order is queued and 202 Accepted
+    points at its status URL.
+    """
+    return _place_idempotent(
+        db,
+        request,
+        idempotency_key=idempotency_key,
+        user_id=current_user.id,
+        endpoint="orders.create",
+        payload=order_in.model_dump(mode="json"),
+        place=lambda key_id: order_service.create(
+            db, obj_in=order_in, user_id=current_user.id, idempotency_key_id=key_id
+        ),
+        enqueue=lambda key_id: order_intake_service.submit(
+            db, obj_in=order_in, user_id=current_user.id, idempotency_key_id=key_id
+        ),
+    )
+
+@router.post(
+    "/from-cart/",
+    response_model=Order,
+    responses={status.HTTP_202_ACCEPTED: {"model": OrderAccepted}},
+)
+def create_order_from_cart(
+    *,
+    db: Session = Depends(get_db),
+    request: Request,
+    shipping_address: str,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255),
+    current_user: Any = Depends(get_current_active_user),
+) -> Any:
+    """
+    Create new order from user's cart. In async intake mode the order is queued and
+    202 Accepted points at its status URL.
+    """
+    return _place_idempotent(
+        db,
+        request,
+        idempotency_key=idempotency_key,
+        user_id=current_user.id,
+        endpoint="orders.create_from_cart",
+        payload={"shipping_address": shipping_address},
+        place=lambda key_id: order_service.create_from_cart(
+            db,
+            user_id=current_user.id,
+            shipping_address=shipping_address,
+            idempotency_key_id=key_id
+        ),
+        enqueue=lambda key_id: order_intake_service.submit_from_cart(
+            db,
+            user_id=current_user.id,
+            shipping_address=shipping_address,
+            idempotency_key_id=key_id
+        ),
+    )
+
+@router.get("/history", response_model=List[OrderSummary])
+def read_order_history(
+    *,
+    response: Response,
+    db: Session = Depends(get_db),
+    cursor: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
     current_user: Any = Depends(get_current_active_user),
 ) -> Any:
     """
-    Create new order.
+    Retrieve the current user's order history, newest first, from the summary read
+    model. Pass the X-Next-Cursor header of the previous page as `cursor`.
     """
     try:
-        order = order_service.create(db, obj_in=order_in)
-        return order
+        summaries, next_cursor = order_service.get_history(
+            db, user_id=current_user.id, cursor=cursor, limit=limit
+        )
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return summaries
 
-@router.post("/from-cart/", response_model=Order)
-def create_order_from_cart(
+@router.get("/intents/{intent_id}", response_model=OrderIntent)
+def read_order_intent(
     *,
     db: Session = Depends(get_db),
-    shipping_address: str,
+    intent_id: int,
     current_user: Any = Depends(get_current_active_user),
 ) -> Any:
     """
-    Create new order from user's cart.
+    Get the status of a queued order; order_id is set once it has been placed.
+    """
+    intent = order_intake_service.get(db, id=intent_id)
+    if not intent:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Order intent not found"
+        )
+    if intent.user_id != current_user.id and not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not enough permissions"
+        )
+    return intent
+
+@router.post("/bulk/status", response_model=OrderBulkResult)
+def bulk_update_order_status(
+    *,
+    db: Session = Depends(get_db),
+    update_in: OrderBulkStatusUpdate,
+    current_user: Any = Depends(get_current_active_admin),
+) -> Any:
+    """
+    Move a list or filter of orders to a new status; reports the outcome per order.
     """
     try:
-        order = order_service.create_from_cart(
-            db,
-            user_id=current_user.id,
-            shipping_address=shipping_address
+        return order_service.bulk_transition(db, selection=update_in, status=update_in.status)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
         )
-        return order
+
+@router.post("/bulk/cancel", response_model=OrderBulkResult)
+def bulk_cancel_orders(
+    *,
+    db: Session = Depends(get_db),
+    selection_in: OrderBulkSelection,
+    current_user: Any = Depends(get_current_active_admin),
+) -> Any:
+    """
+    Cancel a list or filter of orders and restore their stock; reports the outcome per order.
+    """
+    try:
+        return order_service.bulk_cancel(db, selection=selection_in)
     except ValueError as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -104,8 +317,13 @@ def update_order(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Order not found"
         )
-    order = order_service.update(db, db_obj=order, obj_in=order_in)
-    return order
+    try:
+        return order_service.update(db, db_obj=order, obj_in=order_in)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
 
 @router.post("/{order_id}/cancel", response_model=Order)
 def cancel_order(
@@ -1,10 +1,20 @@
-from typing import Any, List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Any, Dict, List, Optional, Union
+import io
+from datetime import datetime
+from fastapi import APIRouter, Depends, File, HTTPException, Query, Request, UploadFile, status, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from app.core.database import get_db
-from app.schemas.product import Product, ProductCreate, ProductUpdate, Category, CategoryCreate, CategoryUpdate
+from app.schemas.product import (
+    Product, ProductCreate, ProductUpdate, ProductSearchResult, Category, CategoryCreate, CategoryUpdate,
+    ProductFilter, ProductListing, ProductImportResult, ProductBatchRequest, ProductBatchItem,
+    ProductStock, StockShardConfig,
+)
 from app.services.product import product_service, category_service
+from app.services.catalog_io import catalog_io_service
+from app.services.stock import stock_counter_service
 from app.api.deps import get_current_active_user, get_current_active_admin
+from app.api.conditional import check_not_modified, latest, make_etag
 
 router = APIRouter()
 
@@ -30,6 +40,8 @@ def create_category(
 
 @router.get("/categories/", response_model=List[Category])
 def read_categories(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     skip: int = 0,
     limit: int = 100,
@@ -38,23 +50,41 @@ def read_categories(
     Retrieve categories.
     """
     categories = category_service.get_multi(db, skip=skip, limit=limit)
+    not_modified = check_not_modified(
+        request,
+        response,
+        etag=make_etag("categories", *(f"{c.id}.{c.version}" for c in categories)),
+        last_modified=latest(*(c.updated_at or c.created_at for c in categories)),
+    )
+    if not_modified:
+        return not_modified
     return categories
 
 @router.get("/categories/{category_id}", response_model=Category)
 def read_category(
     *,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     category_id: int,
 ) -> Any:
     """
     Get category by ID.
     """
-    category = category_service.get(db, id=category_id)
+    category = category_service.get_cached(db, id=category_id)
     if not category:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Category not found",
         )
+    not_modified = check_not_modified(
+        request,
+        response,
+        etag=make_etag("category", category.id, category.version),
+        last_modified=category.updated_at or category.created_at,
+    )
+    if not_modified:
+        return not_modified
     return category
 
 @router.put("/categories/{category_id}", response_model=Category)
@@ -96,6 +126,18 @@ def delete_category(
     category = category_service.remove(db, id=category_id)
     return category
 
+@router.get("/cache/stats", response_model=Dict[str, Dict[str, int]])
+def read_cache_stats(
+    current_user: Any = Depends(get_current_active_admin),
+) -> Any:
+    """
+    Hit/miss/eviction counters of the catalog lookup caches.
+    """
+    return {
+        "products": product_service.cache.stats(),
+        "categories": category_service.cache.stats(),
+    }
+
 # Product endpoints
 @router.post("/", response_model=Product)
 def create_product(
@@ -107,7 +149,7 @@ def create_product(
     """
     Create new product.
     """
-    category = category_service.get(db, id=product_in.category_id)
+    category = category_service.get_cached(db, id=product_in.category_id)
     if not category:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -116,33 +158,199 @@ def create_product(
     product = product_service.create(db, obj_in=product_in)
     return product
 
-@router.get("/", response_model=List[Product])
+@router.get("/", response_model=Union[ProductListing, List[Product]])
 def read_products(
+    response: Response,
     db: Session = Depends(get_db),
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
+    category_id: Optional[int] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    in_stock: Optional[bool] = None,
+    is_active: Optional[bool] = None,
+    sort: str = "id",
+    facets: bool = False,
 ) -> Any:
     """
     Retrieve products.
+
+    Pages are keyed on the sort column and product id: pass the X-Next-Cursor
+    header of the previous page as `cursor`. `skip` is kept for compatibility only.
+    `sort` is one of id, name, price or created_at, prefixed with "-" for descending.
+    With `facets=true` the page is wrapped together with per-category and
+    price-range counts for the same filters.
     """
-    products = product_service.get_multi(db, skip=skip, limit=limit)
+    filters = ProductFilter(
+        category_id=category_id,
+        min_price=min_price,
+        max_price=max_price,
+        in_stock=in_stock,
+        is_active=is_active,
+    )
+    next_cursor = None
+    try:
+        if skip and cursor is None:
+            products = product_service.get_multi(db, skip=skip, limit=limit, filters=filters, sort=sort)
+        else:
+            products, next_cursor = product_service.get_page(
+                db, cursor=cursor, limit=limit, filters=filters, sort=sort
+            )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    if facets:
+        return ProductListing(
+            items=[Product.model_validate(product) for product in products],
+            next_cursor=next_cursor,
+            facets=product_service.get_facets(db, filters=filters),
+        )
     return products
 
+@router.post("/import", response_model=ProductImportResult)
+def import_products(
+    *,
+    db: Session = Depends(get_db),
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|ndjson)$"),
+    current_user: Any = Depends(get_current_active_admin),
+) -> Any:
+    """
+    Bulk import products from a CSV or NDJSON upload.
+
+    Rows are read as a stream and written in batches. Rows carrying an `id` are upserted,
+    and `category` may name the category instead of `category_id`. Bad rows are reported
+    by line number and do not stop the import.
+    """
+    if format is None:
+        filename = (file.filename or "").lower()
+        format = "ndjson" if filename.endswith((".ndjson", ".jsonl")) or "json" in (file.content_type or "") else "csv"
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    if format == "csv":
+        rows = catalog_io_service.iter_csv(stream)
+    else:
+        rows = catalog_io_service.iter_ndjson(stream)
+    try:
+        return catalog_io_service.import_products(db, rows=rows)
+    except UnicodeDecodeError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="File must be UTF-8 encoded",
+        )
+
+@router.get("/export")
+def export_products(
+    *,
+    db: Session = Depends(get_db),
+    format: str = Query("ndjson", pattern="^(csv|ndjson)$"),
+    since: Optional[datetime] = None,
+    current_user: Any = Depends(get_current_active_admin),
+) -> Any:
+    """
+    Stream the full catalog as NDJSON or CSV.
+
+    `since` limits the dump to products created or updated at or after that time.
+    """
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        catalog_io_service.export_products(db, format=format, since=since),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="products.{format}"'},
+    )
+
+MAX_BATCH_IDS = 500
+
+def _resolve_batch(db: Session, ids: List[int]) -> List[ProductBatchItem]:
+    if len(ids) > MAX_BATCH_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BATCH_IDS} ids per request",
+        )
+    found = product_service.get_many(db, ids=ids)
+    return [
+        ProductBatchItem(id=id, found=id in found, product=found.get(id))
+        for id in ids
+    ]
+
+@router.get("/batch", response_model=List[ProductBatchItem])
+def read_products_batch(
+    *,
+    db: Session = Depends(get_db),
+    ids: str = Query(..., description="Comma separated product ids"),
+) -> Any:
+    """
+    Get several products by ID, in request order. Missing ids come back with found=false.
+    """
+    try:
+        id_list = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be a comma separated list of integers",
+        )
+    return _resolve_batch(db, id_list)
+
+@router.post("/batch", response_model=List[ProductBatchItem])
+def read_products_batch_post(
+    *,
+    db: Session = Depends(get_db),
+    batch_in: ProductBatchRequest,
+) -> Any:
+    """
+    Same as GET /batch for id lists too long for a query string.
+    """
+    return _resolve_batch(db, batch_in.ids)
+
+@router.get("/search", response_model=List[ProductSearchResult])
+def search_products(
+    db: Session = Depends(get_db),
+    q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=100),
+) -> Any:
+    """
+    Full-text search over product names and descriptions, best matches first.
+    """
+    results = product_service.search(db, q=q, limit=limit)
+    return [
+        ProductSearchResult(**Product.model_validate(product).model_dump(), score=score)
+        for product, score in results
+    ]
+
 @router.get("/{product_id}", response_model=Product)
 def read_product(
     *,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     product_id: int,
 ) -> Any:
     """
     Get product by ID.
     """
-    product = product_service.get(db, id=product_id)
+    product = product_service.get_cached(db, id=product_id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found",
         )
+    # The representation embeds the category, so its version is part of the validator
+    not_modified = check_not_modified(
+        request,
+        response,
+        etag=make_etag("product", product.id, product.version, product.category.id, product.category.version),
+        last_modified=latest(
+            product.updated_at or product.created_at,
+            product.category.updated_at or product.category.created_at,
+        ),
+    )
+    if not_modified:
+        return not_modified
     return product
 
 @router.put("/{product_id}", response_model=Product)
@@ -163,7 +371,7 @@ def update_product(
             detail="Product not found",
         )
     if product_in.category_id:
-        category = category_service.get(db, id=product_in.category_id)
+        category = category_service.get_cached(db, id=product_in.category_id)
         if not category:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -189,4 +397,39 @@ def delete_product(
             detail="Product not found",
         )
     product = product_service.remove(db, id=product_id)
-    return product 
\ No newline at end of file
+    return product 
+
+@router.put("/{product_id}/stock-shards", response_model=ProductStock)
+def shard_product_stock(
+    *,
+    db: Session = Depends(get_db),
+    product_id: int,
+    config_in: StockShardConfig,
+    current_user: Any = Depends(get_current_active_admin),
+) -> Any:
+    """
+    Split a hot product's stock over several counter rows, or change their number.
+    """
+    try:
+        product = stock_counter_service.enable(db, product_id=product_id, shards=config_in.shards)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    product_service.invalidate(product_id)
+    return ProductStock(product_id=product.id, stock=product.stock, shards=product.stock_shards)
+
+@router.delete("/{product_id}/stock-shards", response_model=ProductStock)
+def unshard_product_stock(
+    *,
+    db: Session = Depends(get_db),
+    product_id: int,
+    current_user: Any = Depends(get_current_active_admin),
+) -> Any:
+    """
+    Fold a sharded product's stock back into a single counter.
+    """
+    try:
+        product = stock_counter_service.disable(db, product_id=product_id)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    product_service.invalidate(product_id)
+    return ProductStock(product_id=product.id, stock=product.stock, shards=product.stock_shards)
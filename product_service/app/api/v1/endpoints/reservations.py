@@ -0,0 +1,106 @@
+from datetime import timedelta
+from typing import Any, List
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from app.core.database import get_db
+from app.schemas.reservation import (
+    ProductAvailability, Reservation, ReservationCreate, ReservationHold, ReservationItem,
+)
+from app.services.cart import cart_service
+from app.services.reservation import reservation_service
+from app.api.deps import get_current_active_user
+
+router = APIRouter()
+
+MAX_AVAILABILITY_IDS = 500
+
+def _reserve(db: Session, user_id: int, items: List[ReservationItem], ttl_seconds) -> Any:
+    try:
+        return reservation_service.reserve(
+            db,
+            user_id=user_id,
+            items=items,
+            ttl=timedelta(seconds=ttl_seconds) if ttl_seconds else None
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+@router.get("/", response_model=List[Reservation])
+def read_reservations(
+    *,
+    db: Session = Depends(get_db),
+    current_user: Any = Depends(get_current_active_user),
+) -> Any:
+    """
+    Get current user's active stock holds.
+    """
+    return reservation_service.get_by_user(db, user_id=current_user.id)
+
+@router.post("/", response_model=List[Reservation])
+def create_reservations(
+    *,
+    db: Session = Depends(get_db),
+    reservation_in: ReservationCreate,
+    current_user: Any = Depends(get_current_active_user),
+) -> Any:
+    """
+    Hold stock for the given products until the holds expire or an order uses them.
+    """
+    return _reserve(db, current_user.id, reservation_in.items, reservation_in.ttl_seconds)
+
+@router.post("/cart", response_model=List[Reservation])
+def reserve_cart(
+    *,
+    db: Session = Depends(get_db),
+    hold_in: ReservationHold,
+    current_user: Any = Depends(get_current_active_user),
+) -> Any:
+    """
+    Hold stock for every line of the current user's cart.
+    """
+    cart = cart_service.get_by_user_id(db, user_id=current_user.id)
+    if not cart or not cart.items:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Cart is empty"
+        )
+    items = [ReservationItem(product_id=item.product_id, quantity=item.quantity) for item in cart.items]
+    return _reserve(db, current_user.id, items, hold_in.ttl_seconds)
+
+@router.delete("/", response_model=None)
+def release_reservations(
+    *,
+    db: Session = Depends(get_db),
+    current_user: Any = Depends(get_current_active_user),
+) -> Any:
+    """
+    Release all of the current user's holds.
+    """
+    return {"released": reservation_service.release(db, user_id=current_user.id)}
+
+@router.get("/availability", response_model=List[ProductAvailability])
+def read_availability(
+    *,
+    db: Session = Depends(get_db),
+    ids: str = Query(..., description="Comma separated product ids"),
+) -> Any:
+    """
+    Get stock, active holds and available stock for several products.
+    """
+    try:
+        id_list = [int(part) for part in ids.split(",") if part.strip()]
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be a comma separated list of integers",
+        )
+    if len(id_list) > MAX_AVAILABILITY_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_AVAILABILITY_IDS} ids per request",
+        )
+    availability = reservation_service.availability(db, product_ids=id_list)
+    return [availability[id] for id in dict.fromkeys(id_list) if id in availability]
@@ -0,0 +1,40 @@
+"""
+Move old delivered and cancelled orders to the archive tables.
+
+    python -m app.commands.archive_orders --after-days 90 --batch-size 500
+"""
+import argparse
+import logging
+from datetime import timedelta
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.schemas.order import OrderArchiveResult
+from app.services.order import order_service
+
+logger = logging.getLogger(__name__)
+
+def archive_orders(
+    after_days: int = settings.ORDER_ARCHIVE_AFTER_DAYS, batch_size: int = settings.ORDER_ARCHIVE_BATCH_SIZE
+) -> OrderArchiveResult:
+    db = SessionLocal()
+    try:
+        result = order_service.archive(db, older_than=timedelta(days=after_days), batch_size=batch_size)
+    finally:
+        db.close()
+    logger.info(
+        "Archived %d orders (%d items) in %d batches",
+        result.orders_archived, result.items_archived, result.batches,
+    )
+    return result
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--after-days", type=int, default=settings.ORDER_ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=settings.ORDER_ARCHIVE_BATCH_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    result = archive_orders(args.after_days, args.batch_size)
+    print(result.model_dump_json())
+
+if __name__ == "__main__":
+    main()
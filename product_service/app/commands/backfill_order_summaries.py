@@ -0,0 +1,22 @@
+"""
+Write order history summaries for orders placed before the read model existed.
+
+    python -m app.commands.backfill_order_summaries --batch-size 500
+"""
+import argparse
+from app.core.database import SessionLocal
+from app.services.order import order_service
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    db = SessionLocal()
+    try:
+        written = order_service.backfill_summaries(db, batch_size=args.batch_size)
+    finally:
+        db.close()
+    print(f"Wrote {written} order summaries")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Delete abandoned carts.
+
+    python -m app.commands.reap_carts --idle-days 30 --batch-size 500
+"""
+import argparse
+import logging
+from datetime import timedelta
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.schemas.cart import CartReapResult
+from app.services.cart import cart_service
+
+logger = logging.getLogger(__name__)
+
+def reap_carts(idle_days: int = settings.CART_IDLE_TTL_DAYS, batch_size: int = settings.CART_REAPER_BATCH_SIZE) -> CartReapResult:
+    db = SessionLocal()
+    try:
+        result = cart_service.reap_idle(db, idle_for=timedelta(days=idle_days), batch_size=batch_size)
+    finally:
+        db.close()
+    logger.info(
+        "Reaped %d carts (%d items) in %d batches, %d carts still active",
+        result.carts_deleted, result.items_deleted, result.batches, result.carts_refreshed,
+    )
+    return result
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--idle-days", type=int, default=settings.CART_IDLE_TTL_DAYS)
+    parser.add_argument("--batch-size", type=int, default=settings.CART_REAPER_BATCH_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    result = reap_carts(args.idle_days, args.batch_size)
+    print(result.model_dump_json())
+
+if __name__ == "__main__":
+    main()
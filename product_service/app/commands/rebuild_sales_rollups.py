@@ -0,0 +1,27 @@
+"""
+Rebuild the daily sales rollups from the order tables.
+
+    python -m app.commands.rebuild_sales_rollups --start 2024-01-01 --end 2024-12-31 --days-per-batch 7
+"""
+import argparse
+from datetime import date
+from app.core.database import SessionLocal
+from app.services.analytics import sales_rollup_service
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--start", type=date.fromisoformat, help="first day (default: day of the first order)")
+    parser.add_argument("--end", type=date.fromisoformat, help="last day (default: today, UTC)")
+    parser.add_argument("--days-per-batch", type=int, default=7)
+    args = parser.parse_args()
+    db = SessionLocal()
+    try:
+        counted = sales_rollup_service.rebuild(
+            db, start=args.start, end=args.end, days_per_batch=args.days_per_batch
+        )
+    finally:
+        db.close()
+    print(f"Rebuilt sales rollups from {counted} orders")
+
+if __name__ == "__main__":
+    main()
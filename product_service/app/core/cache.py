@@ -0,0 +1,189 @@
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+import redis
+
+logger = logging.getLogger(__name__)
+
+class LRUCache:
+    """
+    Bounded in-process cache with least-recently-used eviction and a per-entry TTL.
+    """
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        ttl: float = 60.0,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._timer = timer
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at <= self._timer():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (self._timer() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+class CacheInvalidationBus:
+    """
+    Fans cache invalidations out to every worker over a Redis pub/sub channel.
+
+    Without a Redis connection the bus is local only: TieredCache instances fall back
+    to their in-process LRU tier and invalidations only reach the current process.
+    """
+    def __init__(self, channel: str):
+        self.channel = channel
+        self.redis = None
+        self._caches: Dict[str, "TieredCache"] = {}
+        self._pubsub = None
+        self._thread = None
+
+    def register(self, cache: "TieredCache") -> None:
+        self._caches[cache.namespace] = cache
+
+    def connect(self, redis_client, *, listen: bool = True) -> None:
+        self.close()
+        self.redis = redis_client
+        if listen:
+            self._pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            self._pubsub.subscribe(**{self.channel: self._handle})
+            self._thread = self._pubsub.run_in_thread(sleep_time=0.05, daemon=True)
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._thread.stop()
+            self._thread = None
+        if self._pubsub is not None:
+            self._pubsub.close()
+            self._pubsub = None
+        self.redis = None
+
+    def publish(self, namespace: str, key: Hashable) -> None:
+        if self.redis is None:
+            return
+        try:
+            self.redis.publish(self.channel, json.dumps({"namespace": namespace, "key": key}))
+        except redis.RedisError:
+            logger.warning("Could not publish cache invalidation for %s:%s", namespace, key)
+
+    def _handle(self, message: Dict[str, Any]) -> None:
+        try:
+            payload = json.loads(message["data"])
+            cache = self._caches.get(payload["namespace"])
+        except (ValueError, KeyError, TypeError):
+            return
+        if cache is not None:
+            cache.local.delete(payload["key"])
+
+class TieredCache:
+    """
+    In-process LRUCache in front of a Redis tier shared by all workers.
+
+    Values must be JSON serializable since the shared tier stores them as JSON.
+    """
+    def __init__(self, namespace: str, local: LRUCache, bus: CacheInvalidationBus, shared_ttl: int = 300):
+        self.namespace = namespace
+        self.local = local
+        self.bus = bus
+        self.shared_ttl = shared_ttl
+        self.shared_hits = 0
+        self.shared_misses = 0
+        bus.register(self)
+
+    def _shared_key(self, key: Hashable) -> str:
+        return f"{self.namespace}:{key}"
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        value = self.local.get(key)
+        if value is not None or self.bus.redis is None:
+            return value
+        try:
+            raw = self.bus.redis.get(self._shared_key(key))
+        except redis.RedisError:
+            return None
+        if raw is None:
+            self.shared_misses += 1
+            return None
+        self.shared_hits += 1
+        value = json.loads(raw)
+        self.local.set(key, value)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self.local.set(key, value)
+        if self.bus.redis is None:
+            return
+        try:
+            self.bus.redis.set(self._shared_key(key), json.dumps(value), ex=self.shared_ttl)
+        except redis.RedisError:
+            logger.warning("Could not write %s:%s to the shared cache", self.namespace, key)
+
+    def delete(self, key: Hashable) -> None:
+        self.local.delete(key)
+        if self.bus.redis is None:
+            return
+        try:
+            self.bus.redis.delete(self._shared_key(key))
+        except redis.RedisError:
+            logger.warning("Could not delete %s:%s from the shared cache", self.namespace, key)
+        self.bus.publish(self.namespace, key)
+
+    def clear(self) -> None:
+        self.local.clear()
+        self.shared_hits = self.shared_misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        stats = self.local.stats()
+        stats["shared_hits"] = self.shared_hits
+        stats["shared_misses"] = self.shared_misses
+        return stats
+
+catalog_cache_bus = CacheInvalidationBus("catalog:invalidate")
@@ -10,6 +10,53 @@ class Settings(BaseSettings):
         "DATABASE_URL",
         "sqlite:///./test.db"
     )
+    CATALOG_CACHE_SIZE: int = int(os.getenv("CATALOG_CACHE_SIZE", "1024"))
+    CATALOG_CACHE_TTL: float = float(os.getenv("CATALOG_CACHE_TTL", "60"))
+    CATALOG_SHARED_CACHE_TTL: int = int(os.getenv("CATALOG_SHARED_CACHE_TTL", "300"))
+    REDIS_URL: Optional[str] = os.getenv("REDIS_URL")
+    # sql: every cart change is a durable write; memory/redis: hot tier with write-behind
+    CART_STORAGE: str = os.getenv("CART_STORAGE", "sql")
+    CART_FLUSH_INTERVAL: float = float(os.getenv("CART_FLUSH_INTERVAL", "5"))
+    CART_FLUSH_BATCH_SIZE: int = int(os.getenv("CART_FLUSH_BATCH_SIZE", "200"))
+    # Carts idle longer than this are deleted by the reaper (interval in seconds, 0 disables it)
+    CART_IDLE_TTL_DAYS: int = int(os.getenv("CART_IDLE_TTL_DAYS", "30"))
+    CART_REAPER_INTERVAL: float = float(os.getenv("CART_REAPER_INTERVAL", "3600"))
+    CART_REAPER_BATCH_SIZE: int = int(os.getenv("CART_REAPER_BATCH_SIZE", "500"))
+    # How long a duplicate order request waits for the first one holding its Idempotency-Key
+    IDEMPOTENCY_WAIT_TIMEOUT: float = float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", "10"))
+    IDEMPOTENCY_POLL_INTERVAL: float = float(os.getenv("IDEMPOTENCY_POLL_INTERVAL", "0.05"))
+    # A key left in progress this long (seconds) is taken over by the next retry, e.g.
+    # after the process holding it crashed
+    IDEMPOTENCY_LEASE: float = float(os.getenv("IDEMPOTENCY_LEASE", "60"))
+    # Keys are forgotten after IDEMPOTENCY_KEY_TTL_HOURS (purge interval in seconds, 0 disables it)
+    IDEMPOTENCY_KEY_TTL_HOURS: int = int(os.getenv("IDEMPOTENCY_KEY_TTL_HOURS", "24"))
+    IDEMPOTENCY_PURGE_INTERVAL: float = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL", "3600"))
+    IDEMPOTENCY_PURGE_BATCH_SIZE: int = int(os.getenv("IDEMPOTENCY_PURGE_BATCH_SIZE", "1000"))
+    # Stock holds, in seconds; expired holds are deleted every RESERVATION_RELEASE_INTERVAL
+    RESERVATION_TTL: int = int(os.getenv("RESERVATION_TTL", "900"))
+    RESERVATION_MAX_TTL: int = int(os.getenv("RESERVATION_MAX_TTL", "3600"))
+    RESERVATION_RELEASE_INTERVAL: float = float(os.getenv("RESERVATION_RELEASE_INTERVAL", "60"))
+    RESERVATION_RELEASE_BATCH_SIZE: int = int(os.getenv("RESERVATION_RELEASE_BATCH_SIZE", "1000"))
+    # Seconds between rebalancing sharded stock counters (0 disables)
+    STOCK_CONSOLIDATE_INTERVAL: float = float(os.getenv("STOCK_CONSOLIDATE_INTERVAL", "10"))
+    # sync: orders are placed inside the request; async: 202 Accepted and a worker pool
+    # places queued order intents in batches
+    ORDER_INTAKE_MODE: str = os.getenv("ORDER_INTAKE_MODE", "sync")
+    ORDER_WORKERS: int = int(os.getenv("ORDER_WORKERS", "2"))
+    ORDER_BATCH_SIZE: int = int(os.getenv("ORDER_BATCH_SIZE", "50"))
+    ORDER_POLL_INTERVAL: float = float(os.getenv("ORDER_POLL_INTERVAL", "0.2"))
+    ORDER_INTENT_CLAIM_TIMEOUT: float = float(os.getenv("ORDER_INTENT_CLAIM_TIMEOUT", "60"))
+    # Claims an intent gets before an unexpected error or a dead worker fails it
+    ORDER_INTENT_MAX_ATTEMPTS: int = int(os.getenv("ORDER_INTENT_MAX_ATTEMPTS", "3"))
+    # Delivered/cancelled orders move to the archive tables this long after their last
+    # change (interval in seconds, 0 disables the job)
+    ORDER_ARCHIVE_AFTER_DAYS: int = int(os.getenv("ORDER_ARCHIVE_AFTER_DAYS", "90"))
+    ORDER_ARCHIVE_INTERVAL: float = float(os.getenv("ORDER_ARCHIVE_INTERVAL", "3600"))
+    ORDER_ARCHIVE_BATCH_SIZE: int = int(os.getenv("ORDER_ARCHIVE_BATCH_SIZE", "500"))
+    # Seconds between folding booked sales into the daily rollups (0 disables); the
+    # analytics endpoints lag behind the orders by up to this long
+    SALES_ROLLUP_FOLD_INTERVAL: float = float(os.getenv("SALES_ROLLUP_FOLD_INTERVAL", "5"))
+    SALES_ROLLUP_FOLD_BATCH_SIZE: int = int(os.getenv("SALES_ROLLUP_FOLD_BATCH_SIZE", "1000"))
 
     model_config = SettingsConfigDict(env_file=".env", env_file_encoding="utf-8")
 
@@ -0,0 +1,40 @@
+import logging
+import threading
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+class PeriodicJob:
+    """
+    Runs a callable every `interval` seconds on a daemon thread.
+    """
+    def __init__(self, run: Callable[[], Any], interval: float, *, name: str, run_on_stop: bool = False):
+        self._run_job = run
+        self.interval = interval
+        self.name = name
+        self.run_on_stop = run_on_stop
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self.run_on_stop:
+            self.run_once()
+
+    def run_once(self) -> Any:
+        try:
+            return self._run_job()
+        except Exception:
+            logger.exception("Periodic job %s failed", self.name)
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.run_once()
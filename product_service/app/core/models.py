@@ -1,4 +1,7 @@
-from app.models.product import Product, Category
+from app.models.product import Product, Category, StockShard
 from app.models.cart import Cart, CartItem
-from app.models.order import Order, OrderItem, OrderStatus
-from app.core.database import Base 
\ No newline at end of file
+from app.models.order import Order, OrderItem, OrderStatus, OrderIntent, OrderSummary, ArchivedOrder, ArchivedOrderItem
+from app.models.idempotency import IdempotencyKey
+from app.models.reservation import StockReservation
+from app.models.analytics import DailyProductSales, DailyCategorySales, SalesRollupDelta
+from app.core.database import Base 
@@ -0,0 +1,24 @@
+import base64
+import binascii
+import json
+from typing import Any, Dict
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """
+    Encode the sort key of the last row of a page into an opaque cursor.
+    """
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    """
+    Decode a cursor produced by encode_cursor. Raises ValueError if it was tampered with.
+    """
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except (ValueError, binascii.Error, UnicodeEncodeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, dict):
+        raise ValueError("Invalid cursor")
+    return values
@@ -0,0 +1,8 @@
+from typing import Optional
+import redis
+from app.core.config import settings
+
+def get_redis_client() -> Optional[redis.Redis]:
+    if not settings.REDIS_URL:
+        return None
+    return redis.Redis.from_url(settings.REDIS_URL)
@@ -1,21 +1,153 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api.v1.api import api_router
-from app.core.database import engine
+from app.core.cache import catalog_cache_bus
+from app.commands.archive_orders import archive_orders
+from app.commands.reap_carts import reap_carts
+from app.core.database import SessionLocal, engine
+from app.core.jobs import PeriodicJob
 from app.core.models import Base
+from app.core.redis import get_redis_client
+from app.services.analytics import sales_rollup_service
+from app.services.cart import HotCartService, cart_service
+from app.services.cart_store import WriteBehindFlusher
+from app.services.idempotency import idempotency_service
+from app.services.order_intake import order_intake_service
+from app.services.product import product_service
+from app.services.reservation import reservation_service
+from app.services.stock import stock_counter_service
+from datetime import timedelta
 from typing import Dict
 
 # SQLAlchemy 2.x style for table creation
 with engine.begin() as conn:
     Base.metadata.create_all(bind=conn)
 
+def _flush_carts() -> int:
+    db = SessionLocal()
+    try:
+        return cart_service.flush(db)
+    finally:
+        db.close()
+
+def _release_expired_reservations() -> int:
+    db = SessionLocal()
+    try:
+        return reservation_service.release_expired(db, batch_size=settings.RESERVATION_RELEASE_BATCH_SIZE)
+    finally:
+        db.close()
+
+def _purge_idempotency_keys() -> int:
+    db = SessionLocal()
+    try:
+        return idempotency_service.purge_expired(
+            db,
+            ttl=timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS),
+            batch_size=settings.IDEMPOTENCY_PURGE_BATCH_SIZE,
+        )
+    finally:
+        db.close()
+
+def _consolidate_stock() -> int:
+    db = SessionLocal()
+    try:
+        changed = stock_counter_service.consolidate(db)
+    finally:
+        db.close()
+    product_service.invalidate(*changed)
+    return len(changed)
+
+def _fold_sales_rollups() -> int:
+    db = SessionLocal()
+    try:
+        return sales_rollup_service.fold(db, batch_size=settings.SALES_ROLLUP_FOLD_BATCH_SIZE)
+    finally:
+        db.close()
+
+def _drain_order_intents() -> int:
+    db = SessionLocal()
+    try:
+        return order_intake_service.drain(db, batch_size=settings.ORDER_BATCH_SIZE)
+    finally:
+        db.close()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Share the catalog cache between workers when Redis is configured
+    redis_client = get_redis_client()
+    if redis_client is not None:
+        catalog_cache_bus.connect(redis_client)
+    # Write hot carts behind to the database in the background
+    flusher = None
+    if isinstance(cart_service, HotCartService):
+        flusher = WriteBehindFlusher(_flush_carts, settings.CART_FLUSH_INTERVAL)
+        flusher.start()
+    reaper = None
+    if settings.CART_REAPER_INTERVAL > 0:
+        reaper = PeriodicJob(reap_carts, settings.CART_REAPER_INTERVAL, name="cart-reaper")
+        reaper.start()
+    archiver = None
+    if settings.ORDER_ARCHIVE_INTERVAL > 0:
+        archiver = PeriodicJob(archive_orders, settings.ORDER_ARCHIVE_INTERVAL, name="order-archiver")
+        archiver.start()
+    reservation_releaser = PeriodicJob(
+        _release_expired_reservations, settings.RESERVATION_RELEASE_INTERVAL, name="reservation-releaser"
+    )
+    reservation_releaser.start()
+    idempotency_purger = None
+    if settings.IDEMPOTENCY_PURGE_INTERVAL > 0:
+        idempotency_purger = PeriodicJob(
+            _purge_idempotency_keys, settings.IDEMPOTENCY_PURGE_INTERVAL, name="idempotency-purger"
+        )
+        idempotency_purger.start()
+    stock_consolidator = None
+    if settings.STOCK_CONSOLIDATE_INTERVAL > 0:
+        stock_consolidator = PeriodicJob(
+            _consolidate_stock, settings.STOCK_CONSOLIDATE_INTERVAL, name="stock-consolidator"
+        )
+        stock_consolidator.start()
+    rollup_folder = None
+    if settings.SALES_ROLLUP_FOLD_INTERVAL > 0:
+        rollup_folder = PeriodicJob(
+            _fold_sales_rollups, settings.SALES_ROLLUP_FOLD_INTERVAL, name="sales-rollup-folder"
+        )
+        rollup_folder.start()
+    # Async order intake: a pool of workers places queued order intents
+    order_workers = []
+    if settings.ORDER_INTAKE_MODE == "async":
+        order_workers = [
+            PeriodicJob(_drain_order_intents, settings.ORDER_POLL_INTERVAL, name=f"order-worker-{i}")
+            for i in range(settings.ORDER_WORKERS)
+        ]
+        for worker in order_workers:
+            worker.start()
+    yield
+    for worker in order_workers:
+        worker.stop()
+    if rollup_folder is not None:
+        rollup_folder.stop()
+    if stock_consolidator is not None:
+        stock_consolidator.stop()
+    if idempotency_purger is not None:
+        idempotency_purger.stop()
+    reservation_releaser.stop()
+    if archiver is not None:
+        archiver.stop()
+    if reaper is not None:
+        reaper.stop()
+    if flusher is not None:
+        flusher.stop()
+    catalog_cache_bus.close()
+
 app = FastAPI(
     title="Product Service",
     description="Product management microservice for e-commerce system",
     version="1.0.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # CORS middleware configuration
@@ -25,6 +157,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified", "Idempotent-Replayed", "Location"],
 )
 
 # Include API router
@@ -0,0 +1,67 @@
+from sqlalchemy import Column, Integer, Float, Date, DateTime, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class DailyProductSales(Base):
+    """
+    Sales per product and order day (UTC), folded in from SalesRollupDelta so analytics
+    never scan `orders`/`order_items`. Cancelled and delivered amounts are booked
+    against the day the order was placed.
+    """
+    __tablename__ = "daily_product_sales"
+    __table_args__ = (
+        Index("ix_daily_product_sales_product_day", "product_id", "day"),
+    )
+
+    day = Column(Date, primary_key=True)
+    product_id = Column(Integer, primary_key=True)
+    orders = Column(Integer, nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+    cancelled_units = Column(Integer, nullable=False, default=0)
+    cancelled_revenue = Column(Float, nullable=False, default=0)
+    delivered_units = Column(Integer, nullable=False, default=0)
+    delivered_revenue = Column(Float, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class DailyCategorySales(Base):
+    """
+    Same as DailyProductSales per product category; category 0 collects products
+    without one.
+    """
+    __tablename__ = "daily_category_sales"
+    __table_args__ = (
+        Index("ix_daily_category_sales_category_day", "category_id", "day"),
+    )
+
+    day = Column(Date, primary_key=True)
+    category_id = Column(Integer, primary_key=True)
+    orders = Column(Integer, nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+    cancelled_units = Column(Integer, nullable=False, default=0)
+    cancelled_revenue = Column(Float, nullable=False, default=0)
+    delivered_units = Column(Integer, nullable=False, default=0)
+    delivered_revenue = Column(Float, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class SalesRollupDelta(Base):
+    """
+    Changes to the daily sales tables, appended in the same transaction as the orders.
+    Inserts never wait on other orders; the folding job adds them up into the daily
+    tables in batches. A row belongs to DailyProductSales when product_id is set and
+    to DailyCategorySales otherwise.
+    """
+    __tablename__ = "sales_rollup_deltas"
+
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, nullable=False)
+    product_id = Column(Integer)
+    category_id = Column(Integer)
+    orders = Column(Integer, nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+    cancelled_units = Column(Integer, nullable=False, default=0)
+    cancelled_revenue = Column(Float, nullable=False, default=0)
+    delivered_units = Column(Integer, nullable=False, default=0)
+    delivered_revenue = Column(Float, nullable=False, default=0)
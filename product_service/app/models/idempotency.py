@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, UniqueConstraint
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+    # A key is scoped to the user that sent it
+    __table_args__ = (
+        UniqueConstraint("user_id", "key", name="uq_idempotency_keys_user_key"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False)
+    key = Column(String(255), nullable=False)
+    endpoint = Column(String, nullable=False)
+    request_fingerprint = Column(String(64), nullable=False)
+    status = Column(String(16), nullable=False, default="in_progress")  # in_progress | completed
+    order_id = Column(Integer)  # no FK: the order may be archived
+    intent_id = Column(Integer, ForeignKey("order_intents.id"))  # async intake
+    response_code = Column(Integer)
+    response_body = Column(Text)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Enum
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Enum, Text, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -13,9 +13,15 @@ class OrderStatus(str, enum.Enum):
 
 class Order(Base):
     __tablename__ = "orders"
+    # Finds terminal orders due for archival. Archival deletes rows, so SQLite must not
+    # hand out a deleted max id again (ids stay unique across orders and orders_archive)
+    __table_args__ = (
+        Index("ix_orders_status_updated_at", "status", "updated_at"),
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, nullable=False)  # Foreign key to user service
+    user_id = Column(Integer, nullable=False, index=True)  # Foreign key to user service
     status = Column(Enum(OrderStatus), default=OrderStatus.PENDING)
     total_amount = Column(Float, nullable=False)
     shipping_address = Column(String, nullable=False)
@@ -26,14 +32,101 @@ class Order(Base):
 
 class OrderItem(Base):
     __tablename__ = "order_items"
+    __table_args__ = {"sqlite_autoincrement": True}
 
     id = Column(Integer, primary_key=True, index=True)
     order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
     product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
     quantity = Column(Integer, nullable=False)
     price = Column(Float, nullable=False)  # Price at the time of order
+    # Product category at the time of order (0: none) for the sales rollups; NULL on
+    # rows written before it was recorded
+    category_id = Column(Integer)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     order = relationship("Order", back_populates="items")
-    product = relationship("Product", back_populates="order_items") 
\ No newline at end of file
+    product = relationship("Product", back_populates="order_items")
+
+class ArchivedOrder(Base):
+    """
+    Delivered and cancelled orders moved out of `orders` by the archival job, so the
+    live tables only hold orders that are still in flight. Rows keep their ids.
+    """
+    __tablename__ = "orders_archive"
+    __table_args__ = (
+        Index("ix_orders_archive_user_id", "user_id", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    user_id = Column(Integer, nullable=False)
+    status = Column(Enum(OrderStatus), nullable=False)
+    total_amount = Column(Float, nullable=False)
+    shipping_address = Column(String, nullable=False)
+    created_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))
+    archived_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    items = relationship("ArchivedOrderItem", back_populates="order", order_by="ArchivedOrderItem.id")
+
+class ArchivedOrderItem(Base):
+    __tablename__ = "order_items_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    order_id = Column(Integer, ForeignKey("orders_archive.id"), nullable=False, index=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    price = Column(Float, nullable=False)
+    category_id = Column(Integer)
+    created_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))
+
+    order = relationship("ArchivedOrder", back_populates="items")
+
+class OrderSummary(Base):
+    """
+    Read model behind the order history page: one row per order with what the list
+    shows, written in the same transaction as the order and its status changes.
+    """
+    __tablename__ = "order_summaries"
+    __table_args__ = (
+        Index("ix_order_summaries_user_created", "user_id", "created_at", "order_id"),
+    )
+
+    order_id = Column(Integer, primary_key=True)  # no FK: the order may be archived
+    user_id = Column(Integer, nullable=False)
+    status = Column(Enum(OrderStatus), nullable=False)
+    total_amount = Column(Float, nullable=False)
+    item_count = Column(Integer, nullable=False)
+    product_names = Column(Text, nullable=False)  # JSON list of the first few product names
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+class OrderIntentStatus(str, enum.Enum):
+    QUEUED = "queued"
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class OrderIntent(Base):
+    """
+    An accepted but not yet placed order (async intake). Workers turn queued intents
+    into orders in batches.
+    """
+    __tablename__ = "order_intents"
+    __table_args__ = (
+        Index("ix_order_intents_status_id", "status", "id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False)
+    status = Column(Enum(OrderIntentStatus), nullable=False, default=OrderIntentStatus.QUEUED)
+    shipping_address = Column(String, nullable=False)
+    lines = Column(Text, nullable=False)  # JSON [[product_id, quantity, price or null], ...]
+    cart_id = Column(Integer)  # no FK: the cart may be reaped
+    worker = Column(String(36))  # claim token of the worker processing it
+    attempts = Column(Integer, nullable=False, default=0, server_default="0")
+    order_id = Column(Integer)  # no FK: the order may be archived
+    error = Column(String)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
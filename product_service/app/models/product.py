@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime, Text
+from sqlalchemy import Column, Integer, String, Float, Boolean, ForeignKey, DateTime, Text, Index, event, text
 from sqlalchemy.sql import func
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, object_session
 from app.core.database import Base
 
 class Category(Base):
@@ -9,6 +9,7 @@ class Category(Base):
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, unique=True, index=True, nullable=False)
     description = Column(Text)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -16,6 +17,14 @@ class Category(Base):
 
 class Product(Base):
     __tablename__ = "products"
+    # Back the storefront filters, price sorting and facet GROUP BYs, and
+    # incremental exports
+    __table_args__ = (
+        Index("ix_products_active_category_price", "is_active", "category_id", "price"),
+        Index("ix_products_active_price", "is_active", "price"),
+        Index("ix_products_created_at", "created_at"),
+        Index("ix_products_updated_at", "updated_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True, nullable=False)
@@ -24,9 +33,84 @@ class Product(Base):
     stock = Column(Integer, default=0)
     category_id = Column(Integer, ForeignKey("categories.id"))
     is_active = Column(Boolean, default=True)
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # 0: stock lives in `stock`. N > 0: stock is split over N StockShard rows and `stock`
+    # is a mirror refreshed by consolidation (see app.services.stock)
+    stock_shards = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     category = relationship("Category", back_populates="products")
     cart_items = relationship("CartItem", back_populates="product")
-    order_items = relationship("OrderItem", back_populates="product") 
\ No newline at end of file
+    order_items = relationship("OrderItem", back_populates="product") 
+    shards = relationship("StockShard", cascade="all, delete-orphan")
+
+class StockShard(Base):
+    __tablename__ = "product_stock_shards"
+
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    shard = Column(Integer, primary_key=True)
+    quantity = Column(Integer, nullable=False, default=0)
+
+@event.listens_for(Product, "before_update")
+@event.listens_for(Category, "before_update")
+def bump_version(mapper, connection, target):
+    # Row version backs the catalog ETags; bulk UPDATE statements must bump it themselves
+    if object_session(target).is_modified(target, include_collections=False):
+        target.version = type(target).version + 1
+
+# Full-text search index over product name and description. It lives outside the
+# ORM metadata (FTS5 virtual table / expression GIN index) and is kept in sync by
+# the database itself, so product writes need no extra work.
+SEARCH_VECTOR_SQL = (
+    "to_tsvector('simple', coalesce({prefix}name, '') || ' ' || coalesce({prefix}description, ''))"
+)
+
+_SQLITE_SEARCH_DDL = [
+    """
+    CREATE VIRTUAL TABLE products_fts USING fts5(
+        name, description, content='products', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ai AFTER INSERT ON products BEGIN
+        INSERT INTO products_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_ad AFTER DELETE ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS products_fts_au AFTER UPDATE OF name, description ON products BEGIN
+        INSERT INTO products_fts(products_fts, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO products_fts(rowid, name, description)
+        VALUES (new.id, new.name, new.description);
+    END
+    """,
+    "INSERT INTO products_fts(products_fts) VALUES ('rebuild')",
+]
+
+@event.listens_for(Base.metadata, "after_create")
+def create_search_index(target, connection, **kw):
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'products_fts'")
+        ).first()
+        if not exists:
+            for statement in _SQLITE_SEARCH_DDL:
+                connection.execute(text(statement))
+    elif dialect == "postgresql":
+        connection.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_products_search ON products USING GIN ({SEARCH_VECTOR_SQL.format(prefix='')})"
+        ))
+
+@event.listens_for(Base.metadata, "before_drop")
+def drop_search_index(target, connection, **kw):
+    if connection.dialect.name == "sqlite":
+        connection.execute(text("DROP TABLE IF EXISTS products_fts"))
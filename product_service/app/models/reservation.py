@@ -0,0 +1,23 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Index
+from sqlalchemy.sql import func
+from sqlalchemy.orm import relationship
+from app.core.database import Base
+
+class StockReservation(Base):
+    __tablename__ = "stock_reservations"
+    # (product_id, expires_at) serves the active-holds SUM behind available stock,
+    # expires_at alone the batched release of expired holds
+    __table_args__ = (
+        Index("ix_stock_reservations_product_expires", "product_id", "expires_at"),
+        Index("ix_stock_reservations_expires_at", "expires_at"),
+        Index("ix_stock_reservations_user_product", "user_id", "product_id"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    product_id = Column(Integer, ForeignKey("products.id"), nullable=False)
+    user_id = Column(Integer, nullable=False)  # Foreign key to user service
+    quantity = Column(Integer, nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    product = relationship("Product")
@@ -0,0 +1,34 @@
+from pydantic import BaseModel, computed_field
+from typing import Optional
+from datetime import date
+
+class SalesFigures(BaseModel):
+    # None where orders cannot be summed (an order can span several categories)
+    orders: Optional[int] = None
+    units: int = 0
+    revenue: float = 0
+    cancelled_units: int = 0
+    cancelled_revenue: float = 0
+    delivered_units: int = 0
+    delivered_revenue: float = 0
+
+    @computed_field
+    @property
+    def net_units(self) -> int:
+        return self.units - self.cancelled_units
+
+    @computed_field
+    @property
+    def net_revenue(self) -> float:
+        return round(self.revenue - self.cancelled_revenue, 2)
+
+class DailySales(SalesFigures):
+    day: date
+
+class ProductSales(SalesFigures):
+    product_id: int
+    name: Optional[str] = None
+
+class CategorySales(SalesFigures):
+    category_id: int
+    name: Optional[str] = None
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, conint, confloat, ConfigDict
-from typing import Optional, List
+from typing import Optional, List, Literal
 from datetime import datetime
 
 class CartItemBase(BaseModel):
@@ -12,6 +12,15 @@ class CartItemCreate(CartItemBase):
 class CartItemUpdate(BaseModel):
     quantity: Optional[conint(gt=0)] = None
 
+class CartItemOperation(BaseModel):
+    # add: increase by quantity, set: replace quantity (0 removes), remove: drop the line
+    op: Literal["add", "set", "remove"]
+    product_id: int
+    quantity: Optional[conint(ge=0)] = None
+
+class CartItemBulkUpdate(BaseModel):
+    operations: List[CartItemOperation]
+
 class CartItemInDBBase(CartItemBase):
     id: int
     cart_id: int
@@ -39,4 +48,20 @@ class CartInDBBase(CartBase):
     model_config = ConfigDict(from_attributes=True)
 
 class Cart(CartInDBBase):
-    pass 
\ No newline at end of file
+    # A user without a cart row gets an empty virtual cart with no id
+    id: Optional[int] = None
+    created_at: Optional[datetime] = None 
+
+class CartSummary(BaseModel):
+    cart_id: Optional[int] = None
+    line_count: int = 0
+    item_count: int = 0
+    subtotal: float = 0
+    has_out_of_stock: bool = False
+    has_price_changes: bool = False
+
+class CartReapResult(BaseModel):
+    batches: int = 0
+    carts_deleted: int = 0
+    items_deleted: int = 0
+    carts_refreshed: int = 0
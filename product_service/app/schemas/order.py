@@ -1,7 +1,8 @@
-from pydantic import BaseModel, confloat, conint, ConfigDict
+import json
+from pydantic import BaseModel, confloat, conint, ConfigDict, field_validator
 from typing import Optional, List
 from datetime import datetime
-from app.models.order import OrderStatus
+from app.models.order import OrderStatus, OrderIntentStatus
 
 class OrderItemBase(BaseModel):
     product_id: int
@@ -44,4 +45,68 @@ class OrderInDBBase(OrderBase):
     model_config = ConfigDict(from_attributes=True)
 
 class Order(OrderInDBBase):
-    pass 
\ No newline at end of file
+    pass
+
+class OrderFilter(BaseModel):
+    status: Optional[OrderStatus] = None
+    user_id: Optional[int] = None
+    created_after: Optional[datetime] = None
+    created_before: Optional[datetime] = None
+
+class OrderBulkSelection(BaseModel):
+    # Either explicit ids or a filter; a filter selects at most `limit` orders, oldest first
+    order_ids: Optional[List[int]] = None
+    filter: Optional[OrderFilter] = None
+    limit: conint(ge=1, le=5000) = 1000
+
+class OrderBulkStatusUpdate(OrderBulkSelection):
+    status: OrderStatus
+
+class OrderOutcome(BaseModel):
+    order_id: int
+    ok: bool
+    status: Optional[OrderStatus] = None
+    error: Optional[str] = None
+
+class OrderBulkResult(BaseModel):
+    succeeded: int = 0
+    failed: int = 0
+    outcomes: List[OrderOutcome] = []
+
+class OrderArchiveResult(BaseModel):
+    batches: int = 0
+    orders_archived: int = 0
+    items_archived: int = 0
+
+class OrderSummary(BaseModel):
+    order_id: int
+    status: OrderStatus
+    total_amount: float
+    item_count: int
+    product_names: List[str]
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+    @field_validator("product_names", mode="before")
+    @classmethod
+    def parse_product_names(cls, value):
+        # Stored as a JSON list on the read model
+        return json.loads(value) if isinstance(value, str) else value
+
+class OrderIntent(BaseModel):
+    id: int
+    user_id: int
+    status: OrderIntentStatus
+    order_id: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class OrderAccepted(BaseModel):
+    intent_id: int
+    status: OrderIntentStatus
+    status_url: str
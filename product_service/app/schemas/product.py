@@ -14,6 +14,7 @@ class CategoryUpdate(CategoryBase):
 
 class CategoryInDBBase(CategoryBase):
     id: int
+    version: int = 1
     created_at: datetime
     updated_at: Optional[datetime] = None
 
@@ -43,10 +44,76 @@ class ProductUpdate(BaseModel):
 
 class ProductInDBBase(ProductBase):
     id: int
+    version: int = 1
     created_at: datetime
     updated_at: Optional[datetime] = None
 
     model_config = ConfigDict(from_attributes=True)
 
 class Product(ProductInDBBase):
-    category: Category 
\ No newline at end of file
+    category: Category 
+
+class ProductSearchResult(Product):
+    score: float
+
+class ProductFilter(BaseModel):
+    category_id: Optional[int] = None
+    min_price: Optional[float] = None
+    max_price: Optional[float] = None
+    in_stock: Optional[bool] = None
+    is_active: Optional[bool] = None
+
+class CategoryFacet(BaseModel):
+    category_id: int
+    name: str
+    count: int
+
+class PriceRangeFacet(BaseModel):
+    min_price: float
+    max_price: Optional[float] = None
+    count: int
+
+class ProductFacets(BaseModel):
+    categories: List[CategoryFacet]
+    price_ranges: List[PriceRangeFacet]
+
+class ProductListing(BaseModel):
+    items: List[Product]
+    next_cursor: Optional[str] = None
+    facets: ProductFacets
+
+class ProductImportRow(BaseModel):
+    id: Optional[int] = None
+    name: str
+    description: Optional[str] = None
+    price: confloat(gt=0)
+    stock: conint(ge=0)
+    category_id: Optional[int] = None
+    category: Optional[str] = None
+    is_active: Optional[bool] = True
+
+class ProductImportError(BaseModel):
+    line: int
+    error: str
+
+class ProductImportResult(BaseModel):
+    created: int = 0
+    upserted: int = 0
+    failed: int = 0
+    errors: List[ProductImportError] = []
+
+class ProductBatchRequest(BaseModel):
+    ids: List[int]
+
+class ProductBatchItem(BaseModel):
+    id: int
+    found: bool
+    product: Optional[Product] = None
+
+class StockShardConfig(BaseModel):
+    shards: conint(ge=1, le=64)
+
+class ProductStock(BaseModel):
+    product_id: int
+    stock: int
+    shards: int
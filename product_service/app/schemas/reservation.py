@@ -0,0 +1,32 @@
+from pydantic import BaseModel, conint, ConfigDict
+from typing import Optional, List
+from datetime import datetime
+
+class ReservationItem(BaseModel):
+    product_id: int
+    quantity: conint(gt=0)
+
+class ReservationCreate(BaseModel):
+    items: List[ReservationItem]
+    ttl_seconds: Optional[conint(gt=0)] = None
+
+class ReservationHold(BaseModel):
+    # Hold the lines of the current user's cart
+    ttl_seconds: Optional[conint(gt=0)] = None
+
+class ReservationInDBBase(ReservationItem):
+    id: int
+    user_id: int
+    expires_at: datetime
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+class Reservation(ReservationInDBBase):
+    pass
+
+class ProductAvailability(BaseModel):
+    product_id: int
+    stock: int
+    reserved: int
+    available: int
@@ -0,0 +1,323 @@
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import delete, func, insert
+from sqlalchemy.orm import Session
+from app.core.database import dialect_insert
+from app.models.analytics import DailyCategorySales, DailyProductSales, SalesRollupDelta
+from app.models.order import ArchivedOrder, ArchivedOrderItem, Order, OrderItem, OrderStatus
+from app.models.product import Category, Product
+from app.schemas.analytics import CategorySales, DailySales, ProductSales
+
+METRICS = (
+    "orders", "units", "revenue",
+    "cancelled_units", "cancelled_revenue",
+    "delivered_units", "delivered_revenue",
+)
+# Statuses whose orders are also booked under their own (units, revenue) columns
+STATUS_METRICS = {
+    OrderStatus.CANCELLED: ("cancelled_units", "cancelled_revenue"),
+    OrderStatus.DELIVERED: ("delivered_units", "delivered_revenue"),
+}
+# Category key of products without a category
+UNCATEGORIZED = 0
+MAX_RANGE_DAYS = 366
+
+# (order_id, day, product_id, category_id, quantity, price)
+SalesLine = Tuple[int, date, int, Optional[int], int, float]
+
+def order_day(created_at: datetime) -> date:
+    # Rollups are kept per UTC day of the order
+    if created_at.tzinfo is not None:
+        created_at = created_at.astimezone(timezone.utc)
+    return created_at.date()
+
+class SalesRollupService:
+    """
+    Daily sales per product and per category. The order service books every order,
+    cancellation and status change as rollup deltas inside its own transaction, and
+    `fold` adds those up into the daily tables outside of it, so checkouts never wait
+    on each other's rollup rows. The analytics queries below only read the daily
+    tables and lag behind the orders until the next fold.
+    """
+    def record_order(self, db: Session, *, lines: List[SalesLine]) -> None:
+        # A newly placed order, without committing
+        rows = self._book(lines, "units", "revenue", 1, count_orders=True)
+        self._append(db, rows)
+
+    def record_status_change(
+        self, db: Session, *, order_ids: List[int], old_status: OrderStatus, new_status: OrderStatus
+    ) -> None:
+        """
+        Move the orders' lines between the status columns, without committing. Cheap
+        no-op for changes that do not affect the rollups (e.g. pending -> processing).
+        """
+        old, new = STATUS_METRICS.get(old_status), STATUS_METRICS.get(new_status)
+        if old == new or not order_ids:
+            return
+        lines = self._lines(db, lambda orders: [orders.id.in_(order_ids)])
+        rows = self._empty()
+        if old:
+            self._book(lines, *old, -1, rows=rows)
+        if new:
+            self._book(lines, *new, 1, rows=rows)
+        self._append(db, rows)
+
+    def fold(self, db: Session, *, batch_size: int = 1000) -> int:
+        """
+        Add the pending deltas to the daily tables and delete them, `batch_size` deltas
+        per transaction. Concurrent folds skip each other's locked deltas. Returns the
+        number of deltas folded.
+        """
+        folded = 0
+        while True:
+            try:
+                ids = [
+                    id for id, in db.query(SalesRollupDelta.id)
+                    .order_by(SalesRollupDelta.id)
+                    .limit(batch_size)
+                    .with_for_update(skip_locked=True)
+                ]
+                if not ids:
+                    db.commit()
+                    return folded
+                deltas = db.execute(
+                    delete(SalesRollupDelta)
+                    .where(SalesRollupDelta.id.in_(ids))
+                    .returning(
+                        SalesRollupDelta.day, SalesRollupDelta.product_id, SalesRollupDelta.category_id,
+                        *(getattr(SalesRollupDelta, metric) for metric in METRICS),
+                    )
+                ).all()
+                rows = self._empty()
+                for delta in deltas:
+                    if delta.product_id is not None:
+                        table, key = "product", (delta.day, delta.product_id)
+                    else:
+                        table, key = "category", (delta.day, delta.category_id)
+                    row = rows[table].setdefault(key, dict.fromkeys(METRICS, 0))
+                    for metric in METRICS:
+                        row[metric] += getattr(delta, metric)
+                self._apply(db, rows)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            folded += len(deltas)
+
+    def rebuild(
+        self, db: Session, *, start: Optional[date] = None, end: Optional[date] = None, days_per_batch: int = 7
+    ) -> int:
+        """
+        Recompute the rollups of [start, end] from the live and archived order tables,
+        `days_per_batch` days per transaction, dropping the deltas not folded yet for those days.
+        Defaults to everything from the first order until today. Returns the number of orders counted.
+        """
+        if start is None:
+            first = [db.query(func.min(model.created_at)).scalar() for model in (Order, ArchivedOrder)]
+            if not any(first):
+                return 0
+            start = min(order_day(created_at) for created_at in first if created_at is not None)
+        end = end or datetime.now(timezone.utc).date()
+        counted = 0
+        while start <= end:
+            stop = min(start + timedelta(days=days_per_batch), end + timedelta(days=1))
+            after = datetime.combine(start, time.min, tzinfo=timezone.utc)
+            before = datetime.combine(stop, time.min, tzinfo=timezone.utc)
+
+            def window(orders):
+                return [orders.created_at >= after, orders.created_at < before]
+
+            lines = (
+                self._lines(db, window, with_status=True)
+                + self._lines(db, window, archived=True, with_status=True)
+            )
+            rows = self._book([line[:6] for line in lines], "units", "revenue", 1, count_orders=True)
+            for status, metrics in STATUS_METRICS.items():
+                self._book([line[:6] for line in lines if line[6] == status], *metrics, 1, rows=rows)
+            try:
+                for model in (SalesRollupDelta, DailyProductSales, DailyCategorySales):
+                    db.query(model).filter(model.day >= start, model.day < stop).delete(synchronize_session=False)
+                self._apply(db, rows)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            counted += len({line[0] for line in lines})
+            start = stop
+        return counted
+
+    def _lines(
+        self,
+        db: Session,
+        criteria: Callable[[Any], List[Any]],
+        *,
+        archived: bool = False,
+        with_status: bool = False
+    ) -> List[tuple]:
+        # Order lines of the live or the archive tables; `criteria` maps the orders model to filters
+        orders, items = (ArchivedOrder, ArchivedOrderItem) if archived else (Order, OrderItem)
+        # The category recorded at order time; older rows without one fall back to the
+        # product's current category
+        columns = [
+            orders.id, orders.created_at, items.product_id,
+            func.coalesce(items.category_id, Product.category_id), items.quantity, items.price,
+        ]
+        if with_status:
+            columns.append(orders.status)
+        rows = (
+            db.query(*columns)
+            .join(items, items.order_id == orders.id)
+            .outerjoin(Product, Product.id == items.product_id)
+            .filter(*criteria(orders))
+            .all()
+        )
+        return [(row[0], order_day(row[1]), *row[2:]) for row in rows]
+
+    def _empty(self) -> Dict[str, Dict[tuple, Dict[str, float]]]:
+        return {"product": {}, "category": {}}
+
+    def _book(
+        self,
+        lines: Iterable[SalesLine],
+        units: str,
+        revenue: str,
+        sign: int,
+        *,
+        count_orders: bool = False,
+        rows: Optional[Dict[str, Dict[tuple, Dict[str, float]]]] = None
+    ) -> Dict[str, Dict[tuple, Dict[str, float]]]:
+        rows = rows if rows is not None else self._empty()
+        counted = set()
+        for order_id, day, product_id, category_id, quantity, price in lines:
+            keys = (
+                ("product", (day, product_id)),
+                ("category", (day, category_id if category_id is not None else UNCATEGORIZED)),
+            )
+            for table, key in keys:
+                row = rows[table].setdefault(key, dict.fromkeys(METRICS, 0))
+                row[units] += sign * quantity
+                row[revenue] += sign * quantity * price
+                if count_orders and (table, key, order_id) not in counted:
+                    counted.add((table, key, order_id))
+                    row["orders"] += sign
+        return rows
+
+    def _append(self, db: Session, rows: Dict[str, Dict[tuple, Dict[str, float]]]) -> None:
+        # One executemany INSERT of delta rows; unlike upserts they lock nothing shared
+        deltas = [
+            {"day": day, "product_id": product_id, "category_id": None, **metrics}
+            for (day, product_id), metrics in rows["product"].items()
+        ] + [
+            {"day": day, "product_id": None, "category_id": category_id, **metrics}
+            for (day, category_id), metrics in rows["category"].items()
+        ]
+        if deltas:
+            db.execute(insert(SalesRollupDelta.__table__), deltas)
+
+    def _apply(self, db: Session, rows: Dict[str, Dict[tuple, Dict[str, float]]]) -> None:
+        # One executemany upsert per table that adds the deltas to the stored figures
+        for model, key_column, table in (
+            (DailyProductSales, "product_id", "product"),
+            (DailyCategorySales, "category_id", "category"),
+        ):
+            if not rows[table]:
+                continue
+            stmt = dialect_insert(db, model.__table__)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["day", key_column],
+                set_={
+                    **{metric: model.__table__.c[metric] + stmt.excluded[metric] for metric in METRICS},
+                    "updated_at": func.now(),
+                },
+            )
+            # Sorted keys keep concurrent folds locking rollup rows in the same order
+            db.execute(stmt, [
+                {"day": day, key_column: key, **rows[table][day, key]} for day, key in sorted(rows[table])
+            ])
+
+    def _range(self, start: Optional[date], end: Optional[date]) -> Tuple[date, date]:
+        end = end or datetime.now(timezone.utc).date()
+        start = start or end - timedelta(days=29)
+        if start > end:
+            raise ValueError("start must not be after end")
+        if (end - start).days >= MAX_RANGE_DAYS:
+            raise ValueError(f"Date range is limited to {MAX_RANGE_DAYS} days")
+        return start, end
+
+    def _sums(self, model, *, with_orders: bool = True) -> List[Any]:
+        return [
+            func.sum(getattr(model, metric)).label(metric)
+            for metric in METRICS
+            if with_orders or metric != "orders"
+        ]
+
+    def daily(
+        self,
+        db: Session,
+        *,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        category_id: Optional[int] = None,
+        product_id: Optional[int] = None
+    ) -> List[DailySales]:
+        """
+        Per-day figures of the whole shop, one category or one product.
+        """
+        start, end = self._range(start, end)
+        model = DailyProductSales if product_id is not None else DailyCategorySales
+        # Orders of different categories overlap, so they only add up within one
+        with_orders = product_id is not None or category_id is not None
+        query = db.query(model.day, *self._sums(model, with_orders=with_orders)).filter(
+            model.day >= start, model.day <= end
+        )
+        if product_id is not None:
+            query = query.filter(DailyProductSales.product_id == product_id)
+        elif category_id is not None:
+            query = query.filter(DailyCategorySales.category_id == category_id)
+        rows = query.group_by(model.day).order_by(model.day).all()
+        return [DailySales(**row._asdict()) for row in rows]
+
+    def by_product(
+        self, db: Session, *, start: Optional[date] = None, end: Optional[date] = None, limit: int = 20
+    ) -> List[ProductSales]:
+        """
+        Best selling products of the range by revenue.
+        """
+        start, end = self._range(start, end)
+        totals = (
+            db.query(DailyProductSales.product_id, *self._sums(DailyProductSales))
+            .filter(DailyProductSales.day >= start, DailyProductSales.day <= end)
+            .group_by(DailyProductSales.product_id)
+            .subquery()
+        )
+        rows = (
+            db.query(totals, Product.name)
+            .outerjoin(Product, Product.id == totals.c.product_id)
+            .order_by(totals.c.revenue.desc(), totals.c.product_id)
+            .limit(limit)
+            .all()
+        )
+        return [ProductSales(**row._asdict()) for row in rows]
+
+    def by_category(
+        self, db: Session, *, start: Optional[date] = None, end: Optional[date] = None
+    ) -> List[CategorySales]:
+        """
+        Figures per category over the range, by revenue.
+        """
+        start, end = self._range(start, end)
+        totals = (
+            db.query(DailyCategorySales.category_id, *self._sums(DailyCategorySales))
+            .filter(DailyCategorySales.day >= start, DailyCategorySales.day <= end)
+            .group_by(DailyCategorySales.category_id)
+            .subquery()
+        )
+        rows = (
+            db.query(totals, Category.name)
+            .outerjoin(Category, Category.id == totals.c.category_id)
+            .order_by(totals.c.revenue.desc(), totals.c.category_id)
+            .all()
+        )
+        return [CategorySales(**row._asdict()) for row in rows]
+
+sales_rollup_service = SalesRollupService()
@@ -1,15 +1,38 @@
-from typing import Any, Dict, List, Optional, Union
-from sqlalchemy.orm import Session
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple, Union
+from sqlalchemy import case, delete, func, literal, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session, aliased, selectinload
+from app.core.config import settings
+from app.core.database import dialect_insert
+from app.core.redis import get_redis_client
 from app.models.cart import Cart, CartItem
 from app.models.product import Product
-from app.schemas.cart import CartCreate, CartItemCreate, CartItemUpdate
+from app.schemas.cart import (
+    CartCreate, CartItemCreate, CartItemUpdate, CartItemOperation,
+    Cart as CartSchema, CartItem as CartItemSchema, CartSummary, CartReapResult,
+)
+from app.services.cart_store import InMemoryCartStore, RedisCartStore
+from app.services.product import product_service
+from app.services.stock import stock_counter_service
 
 class CartService:
     def get(self, db: Session, id: Any) -> Optional[Cart]:
-        return db.query(Cart).filter(Cart.id == id).first()
+        return (
+            db.query(Cart)
+            .options(selectinload(Cart.items))
+            .filter(Cart.id == id)
+            .first()
+        )
 
     def get_by_user(self, db: Session, user_id: int) -> Optional[Cart]:
-        return db.query(Cart).filter(Cart.user_id == user_id).first()
+        return (
+            db.query(Cart)
+            .options(selectinload(Cart.items))
+            .filter(Cart.user_id == user_id)
+            .first()
+        )
 
     def get_by_user_id(self, db: Session, user_id: int) -> Optional[Cart]:
         # Alias for compatibility
@@ -28,9 +51,19 @@ class CartService:
 
     def get_or_create(self, db: Session, *, user_id: int) -> Cart:
         cart = self.get_by_user(db, user_id=user_id)
-        if not cart:
-            cart = self.create(db, user_id=user_id)
-        return cart
+        if cart:
+            return cart
+        # Concurrent first adds race here; the unique user_id turns the loser into a no-op
+        stmt = dialect_insert(db, Cart).values(user_id=user_id)
+        db.execute(stmt.on_conflict_do_nothing(index_elements=["user_id"]))
+        db.commit()
+        return self.get_by_user(db, user_id=user_id)
+
+    def get_or_empty(self, db: Session, *, user_id: int) -> Union[Cart, CartSchema]:
+        cart = self.get_by_user(db, user_id=user_id)
+        if cart:
+            return cart
+        return CartSchema(user_id=user_id)
 
     def add_item(
         self,
@@ -45,34 +78,33 @@ class CartService:
             item_in = CartItemCreate(product_id=product_id, quantity=quantity)
         elif item_in is None:
             raise ValueError("Either item_in or (product_id and quantity) must be provided")
-        product = db.query(Product).filter(Product.id == item_in.product_id).first()
-        if not product:
-            raise ValueError("Product not found")
-        if product.stock < item_in.quantity:
+        # Insert the line or bump its quantity in one statement. The stock check is part
+        # of it: the SELECT yields no row and the conflict UPDATE is skipped when the
+        # product is missing or cannot cover the resulting quantity. Sharded products
+        # are checked against their shards, not the products.stock mirror.
+        stock_expr = stock_counter_service.stock_expression()
+        stock = select(stock_expr).where(Product.id == item_in.product_id).scalar_subquery()
+        source = select(
+            literal(cart_id), Product.id, literal(item_in.quantity), Product.price
+        ).where(Product.id == item_in.product_id, stock_expr >= item_in.quantity)
+        stmt = dialect_insert(db, CartItem).from_select(
+            ["cart_id", "product_id", "quantity", "price"], source
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["cart_id", "product_id"],
+            set_={"quantity": CartItem.quantity + item_in.quantity, "updated_at": func.now()},
+            where=stock >= CartItem.quantity + item_in.quantity,
+        ).returning(CartItem)
+        cart_item = db.scalars(stmt, execution_options={"populate_existing": True}).first()
+        if cart_item is None:
+            db.rollback()
+            if not db.query(Product.id).filter(Product.id == item_in.product_id).first():
+                raise ValueError("Product not found")
             raise ValueError("Not enough stock")
-
-        # Aynı üründen varsa miktarı artır
-        cart_item = db.query(CartItem).filter(
-            CartItem.cart_id == cart_id,
-            CartItem.product_id == item_in.product_id
-        ).first()
-        if cart_item:
-            cart_item.quantity += item_in.quantity
-            db.add(cart_item)
-            db.commit()
-            db.refresh(cart_item)
-            return cart_item
-        else:
-            cart_item = CartItem(
-                cart_id=cart_id,
-                product_id=item_in.product_id,
-                quantity=item_in.quantity,
-                price=product.price
-            )
-            db.add(cart_item)
-            db.commit()
-            db.refresh(cart_item)
-            return cart_item
+        # RETURNING already loaded the row; keep it from being expired by the commit
+        db.expunge(cart_item)
+        db.commit()
+        return cart_item
 
     def update_item(
         self,
@@ -80,8 +112,11 @@ class CartService:
         *,
         cart_id: int,
         item_id: int,
-        item_in: CartItemUpdate
+        item_in: Optional[CartItemUpdate] = None,
+        quantity: Optional[int] = None
     ) -> CartItem:
+        if item_in is None:
+            item_in = CartItemUpdate(quantity=quantity)
         cart_item = (
             db.query(CartItem)
             .filter(CartItem.cart_id == cart_id, CartItem.id == item_id)
@@ -91,8 +126,7 @@ class CartService:
             raise ValueError("Cart item not found")
 
         if item_in.quantity:
-            product = db.query(Product).filter(Product.id == cart_item.product_id).first()
-            if product.stock < item_in.quantity:
+            if self._stock(db, [cart_item.product_id]).get(cart_item.product_id, 0) < item_in.quantity:
                 raise ValueError("Not enough stock")
             cart_item.quantity = item_in.quantity
 
@@ -113,8 +147,516 @@ class CartService:
         db.commit()
         return cart_item
 
+    def apply_operations(
+        self, db: Session, *, cart_id: int, operations: List[CartItemOperation]
+    ) -> Cart:
+        # Resolve everything up front, apply the operations in memory and write the
+        # net result in one transaction; any invalid operation rejects the whole batch.
+        product_ids = {op.product_id for op in operations}
+        products = {
+            product.id: product
+            for product in db.query(Product).filter(Product.id.in_(product_ids))
+        }
+        items = {
+            item.product_id: item
+            for item in db.query(CartItem).filter(CartItem.cart_id == cart_id)
+        }
+        quantities = {product_id: item.quantity for product_id, item in items.items()}
+        stock = self._stock(db, product_ids)
+
+        for op in operations:
+            if op.op == "remove":
+                quantities.pop(op.product_id, None)
+                continue
+            if op.quantity is None or (op.op == "add" and op.quantity == 0):
+                raise ValueError(f"Operation {op.op} on product {op.product_id} needs a positive quantity")
+            if op.product_id not in products:
+                raise ValueError(f"Product {op.product_id} not found")
+            if op.op == "add":
+                quantities[op.product_id] = quantities.get(op.product_id, 0) + op.quantity
+            elif op.quantity == 0:
+                quantities.pop(op.product_id, None)
+            else:
+                quantities[op.product_id] = op.quantity
+
+        for product_id in product_ids:
+            quantity = quantities.get(product_id)
+            item = items.get(product_id)
+            if quantity is None:
+                if item is not None:
+                    db.delete(item)
+                continue
+            if stock[product_id] < quantity:
+                raise ValueError(f"Not enough stock for product {products[product_id].name}")
+            if item is None:
+                db.add(CartItem(
+                    cart_id=cart_id,
+                    product_id=product_id,
+                    quantity=quantity,
+                    price=products[product_id].price,
+                ))
+            elif item.quantity != quantity:
+                item.quantity = quantity
+        db.commit()
+        return self.get(db, id=cart_id)
+
     def clear_cart(self, db: Session, *, cart_id: int) -> None:
         db.query(CartItem).filter(CartItem.cart_id == cart_id).delete()
         db.commit()
 
-cart_service = CartService() 
\ No newline at end of file
+    def summary(self, db: Session, *, user_id: int) -> CartSummary:
+        # One aggregate row over the user's lines joined to the live products; no ORM
+        # objects are loaded
+        unavailable = (
+            Product.id.is_(None)
+            | Product.is_active.is_(False)
+            | (stock_counter_service.stock_expression() < CartItem.quantity)
+        )
+        row = (
+            db.query(
+                func.min(Cart.id).label("cart_id"),
+                func.count(CartItem.id).label("line_count"),
+                func.coalesce(func.sum(CartItem.quantity), 0).label("item_count"),
+                func.coalesce(func.sum(CartItem.price * CartItem.quantity), 0).label("subtotal"),
+                func.coalesce(func.max(case((CartItem.id.isnot(None) & unavailable, 1), else_=0)), 0)
+                .label("has_out_of_stock"),
+                func.coalesce(func.max(case((Product.price != CartItem.price, 1), else_=0)), 0)
+                .label("has_price_changes"),
+            )
+            .select_from(Cart)
+            .outerjoin(CartItem, CartItem.cart_id == Cart.id)
+            .outerjoin(Product, Product.id == CartItem.product_id)
+            .filter(Cart.user_id == user_id)
+            .one()
+        )
+        return CartSummary(
+            cart_id=row.cart_id,
+            line_count=row.line_count,
+            item_count=row.item_count,
+            subtotal=row.subtotal,
+            has_out_of_stock=bool(row.has_out_of_stock),
+            has_price_changes=bool(row.has_price_changes),
+        )
+
+    def _stock(self, db: Session, product_ids) -> Dict[int, int]:
+        # Current stock for the checks that gate cart writes; sharded products sum
+        # their shards instead of reading the products.stock mirror
+        return dict(
+            db.query(Product.id, stock_counter_service.stock_expression())
+            .filter(Product.id.in_(list(product_ids)))
+            .all()
+        )
+
+    def reap_idle(self, db: Session, *, idle_for: timedelta, batch_size: int = 500) -> CartReapResult:
+        """
+        Delete carts with no activity for `idle_for`, `batch_size` carts per transaction.
+
+        Item writes do not touch carts.updated_at, so a stale cart whose lines changed
+        recently is not deleted; its updated_at is moved up to the last line activity
+        instead, which takes it out of later scans until it really goes idle.
+
+        Candidate carts and their lines are locked (FOR UPDATE, skipping carts in use)
+        and the DELETEs repeat the idleness condition, so a line written while the
+        batch runs keeps its cart.
+        """
+        cutoff = datetime.now(timezone.utc) - idle_for
+        result = CartReapResult()
+        item_activity = func.max(func.coalesce(CartItem.updated_at, CartItem.created_at))
+        recent = aliased(CartItem)
+        while True:
+            candidates = (
+                db.query(Cart.id, Cart.user_id)
+                .filter(Cart.updated_at < cutoff)
+                .order_by(Cart.updated_at, Cart.id)
+                .limit(batch_size)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            if not candidates:
+                break
+            ids = [cart_id for cart_id, _ in candidates]
+            # Line inserts wait on the cart locks (FK), line updates on these
+            db.query(CartItem.id).filter(CartItem.cart_id.in_(ids)).with_for_update().all()
+            active = {
+                cart_id
+                for cart_id, in (
+                    db.query(CartItem.cart_id)
+                    .filter(CartItem.cart_id.in_(ids))
+                    .group_by(CartItem.cart_id)
+                    .having(item_activity >= cutoff)
+                )
+            }
+            idle_ids = [cart_id for cart_id in ids if cart_id not in active]
+            deleted: List[Tuple[int, int]] = []
+            if idle_ids:
+                result.items_deleted += db.execute(
+                    delete(CartItem)
+                    .where(
+                        CartItem.cart_id.in_(idle_ids),
+                        ~select(recent.id).where(
+                            recent.cart_id == CartItem.cart_id,
+                            func.coalesce(recent.updated_at, recent.created_at) >= cutoff,
+                        ).exists(),
+                    )
+                    .execution_options(synchronize_session=False)
+                ).rowcount
+                # Only carts that are still stale and now empty go
+                deleted = [
+                    (cart_id, user_id) for cart_id, user_id in db.execute(
+                        delete(Cart)
+                        .where(
+                            Cart.id.in_(idle_ids),
+                            Cart.updated_at < cutoff,
+                            ~select(CartItem.id).where(CartItem.cart_id == Cart.id).exists(),
+                        )
+                        .returning(Cart.id, Cart.user_id)
+                        .execution_options(synchronize_session=False)
+                    )
+                ]
+                result.carts_deleted += len(deleted)
+            if active:
+                last_activity = (
+                    select(item_activity)
+                    .where(CartItem.cart_id == Cart.id)
+                    .scalar_subquery()
+                )
+                result.carts_refreshed += (
+                    db.query(Cart)
+                    .filter(Cart.id.in_(active))
+                    .update({Cart.updated_at: last_activity}, synchronize_session=False)
+                )
+            db.commit()
+            self.evict(deleted)
+            result.batches += 1
+        return result
+
+    def evict(self, carts: List[Tuple[int, int]]) -> None:
+        # Hook for storage backends that keep copies of carts changed directly in SQL
+        pass
+
+    def flush(self, db: Session, *, cart_ids: Optional[List[int]] = None) -> int:
+        # SQL carts are always durable; hot storage backends override this
+        return 0
+
+class HotCartService(CartService):
+    """
+    Keeps active carts in a key-value tier (Redis or in-process) and writes them
+    behind to carts/cart_items in batches.
+
+    Cart rows are still created in SQL so carts keep their ids, but line changes
+    only touch the key-value tier until flush() persists them. Lines are keyed by
+    product, so the item id exposed by this backend is the product id.
+    """
+    def __init__(self, store, flush_batch_size: int = 200):
+        self.store = store
+        self.flush_batch_size = flush_batch_size
+
+    def _cart_key(self, cart_id: int) -> str:
+        return f"cart:{cart_id}"
+
+    def _user_key(self, user_id: int) -> str:
+        return f"cart:user:{user_id}"
+
+    def _now(self) -> str:
+        return datetime.now(timezone.utc).isoformat()
+
+    def _from_db(self, cart: Cart) -> Dict[str, Any]:
+        return {
+            "id": cart.id,
+            "user_id": cart.user_id,
+            "created_at": cart.created_at.isoformat(),
+            "updated_at": cart.updated_at.isoformat() if cart.updated_at else None,
+            "items": {
+                str(item.product_id): {
+                    "quantity": item.quantity,
+                    "price": item.price,
+                    "created_at": item.created_at.isoformat(),
+                    "updated_at": item.updated_at.isoformat() if item.updated_at else None,
+                }
+                for item in cart.items
+            },
+        }
+
+    def _load(self, db: Session, cart_id: int) -> Optional[Dict[str, Any]]:
+        raw = self.store.get(self._cart_key(cart_id))
+        if raw is not None:
+            return json.loads(raw)
+        cart = super().get(db, id=cart_id)
+        if cart is None:
+            return None
+        data = self._from_db(cart)
+        self._save(data, dirty=False)
+        return data
+
+    def _save(self, data: Dict[str, Any], *, dirty: bool = True) -> None:
+        self.store.set(self._cart_key(data["id"]), json.dumps(data))
+        self.store.set(self._user_key(data["user_id"]), str(data["id"]))
+        if dirty:
+            self.store.mark_dirty(data["id"])
+
+    def _item_view(self, data: Dict[str, Any], product_id: str) -> CartItemSchema:
+        line = data["items"][product_id]
+        return CartItemSchema(id=int(product_id), cart_id=data["id"], product_id=int(product_id), **line)
+
+    def _cart_view(self, data: Dict[str, Any]) -> CartSchema:
+        return CartSchema(
+            id=data["id"],
+            user_id=data["user_id"],
+            created_at=data["created_at"],
+            updated_at=data["updated_at"],
+            items=[self._item_view(data, product_id) for product_id in data["items"]],
+        )
+
+    def get(self, db: Session, id: Any) -> Optional[CartSchema]:
+        data = self._load(db, id)
+        return self._cart_view(data) if data else None
+
+    def get_by_user(self, db: Session, user_id: int) -> Optional[CartSchema]:
+        cart_id = self.store.get(self._user_key(user_id))
+        if cart_id is None:
+            cart = super().get_by_user(db, user_id)
+            if cart is None:
+                return None
+            cart_id = cart.id
+        return self.get(db, id=int(cart_id))
+
+    def create(self, db: Session, *, obj_in: Optional[CartCreate] = None, user_id: Optional[int] = None) -> CartSchema:
+        cart = super().create(db, obj_in=obj_in, user_id=user_id)
+        data = self._from_db(cart)
+        self._save(data, dirty=False)
+        return self._cart_view(data)
+
+    def _change(self, db: Session, cart_id: int, apply) -> Any:
+        with self.store.lock(self._cart_key(cart_id)):
+            data = self._load(db, cart_id)
+            if data is None:
+                raise ValueError("Cart not found")
+            result = apply(data)
+            data["updated_at"] = self._now()
+            self._save(data)
+        return result
+
+    def _product(self, db: Session, product_id: int):
+        product = product_service.get_cached(db, id=product_id)
+        if not product:
+            raise ValueError("Product not found")
+        return product
+
+    def add_item(
+        self,
+        db: Session,
+        *,
+        cart_id: int,
+        item_in: Optional[CartItemCreate] = None,
+        product_id: Optional[int] = None,
+        quantity: Optional[int] = None
+    ) -> CartItemSchema:
+        if item_in is None and product_id is not None and quantity is not None:
+            item_in = CartItemCreate(product_id=product_id, quantity=quantity)
+        elif item_in is None:
+            raise ValueError("Either item_in or (product_id and quantity) must be provided")
+        product = self._product(db, item_in.product_id)
+        stock = self._stock(db, [product.id])[product.id]
+
+        def apply(data):
+            key = str(item_in.product_id)
+            line = data["items"].get(key)
+            new_quantity = item_in.quantity + (line["quantity"] if line else 0)
+            if stock < new_quantity:
+                raise ValueError("Not enough stock")
+            if line:
+                line.update(quantity=new_quantity, updated_at=self._now())
+            else:
+                data["items"][key] = {
+                    "quantity": new_quantity,
+                    "price": product.price,
+                    "created_at": self._now(),
+                    "updated_at": None,
+                }
+            return self._item_view(data, key)
+
+        return self._change(db, cart_id, apply)
+
+    def update_item(
+        self,
+        db: Session,
+        *,
+        cart_id: int,
+        item_id: int,
+        item_in: Optional[CartItemUpdate] = None,
+        quantity: Optional[int] = None
+    ) -> CartItemSchema:
+        if item_in is None:
+            item_in = CartItemUpdate(quantity=quantity)
+
+        def apply(data):
+            key = str(item_id)
+            line = data["items"].get(key)
+            if line is None:
+                raise ValueError("Cart item not found")
+            if item_in.quantity:
+                self._product(db, item_id)
+                if self._stock(db, [item_id]).get(item_id, 0) < item_in.quantity:
+                    raise ValueError("Not enough stock")
+                line.update(quantity=item_in.quantity, updated_at=self._now())
+            return self._item_view(data, key)
+
+        return self._change(db, cart_id, apply)
+
+    def remove_item(self, db: Session, *, cart_id: int, item_id: int) -> CartItemSchema:
+        def apply(data):
+            key = str(item_id)
+            if key not in data["items"]:
+                raise ValueError("Cart item not found")
+            removed = self._item_view(data, key)
+            del data["items"][key]
+            return removed
+
+        return self._change(db, cart_id, apply)
+
+    def apply_operations(
+        self, db: Session, *, cart_id: int, operations: List[CartItemOperation]
+    ) -> CartSchema:
+        products = product_service.get_many(db, ids=[op.product_id for op in operations])
+        stock = self._stock(db, products)
+
+        def apply(data):
+            items = {key: dict(line) for key, line in data["items"].items()}
+            for op in operations:
+                key = str(op.product_id)
+                if op.op == "remove":
+                    items.pop(key, None)
+                    continue
+                if op.quantity is None or (op.op == "add" and op.quantity == 0):
+                    raise ValueError(f"Operation {op.op} on product {op.product_id} needs a positive quantity")
+                if op.product_id not in products:
+                    raise ValueError(f"Product {op.product_id} not found")
+                current = items.get(key, {}).get("quantity", 0)
+                quantity = current + op.quantity if op.op == "add" else op.quantity
+                if quantity == 0:
+                    items.pop(key, None)
+                elif key in items:
+                    items[key].update(quantity=quantity, updated_at=self._now())
+                else:
+                    items[key] = {
+                        "quantity": quantity,
+                        "price": products[op.product_id].price,
+                        "created_at": self._now(),
+                        "updated_at": None,
+                    }
+            for key, line in items.items():
+                product = products.get(int(key))
+                if product is not None and stock.get(product.id, product.stock) < line["quantity"]:
+                    raise ValueError(f"Not enough stock for product {product.name}")
+            data["items"] = items
+            return data
+
+        return self._cart_view(self._change(db, cart_id, apply))
+
+    def summary(self, db: Session, *, user_id: int) -> CartSummary:
+        cart = self.get_by_user(db, user_id)
+        if cart is None:
+            return CartSummary()
+        products = product_service.get_many(db, ids=[item.product_id for item in cart.items])
+        stock = self._stock(db, products) if products else {}
+        summary = CartSummary(cart_id=cart.id, line_count=len(cart.items))
+        for item in cart.items:
+            product = products.get(item.product_id)
+            summary.item_count += item.quantity
+            summary.subtotal += item.price * item.quantity
+            if product is None or not product.is_active or stock.get(product.id, 0) < item.quantity:
+                summary.has_out_of_stock = True
+            if product is not None and product.price != item.price:
+                summary.has_price_changes = True
+        return summary
+
+    def clear_cart(self, db: Session, *, cart_id: int) -> None:
+        def apply(data):
+            data["items"] = {}
+
+        self._change(db, cart_id, apply)
+        # Nothing left to write behind: clear the rows right away
+        super().clear_cart(db, cart_id=cart_id)
+        self.store.discard_dirty(cart_id)
+
+    def reap_idle(self, db: Session, *, idle_for: timedelta, batch_size: int = 500) -> CartReapResult:
+        # Pending hot-tier changes are activity too
+        self.flush(db)
+        return super().reap_idle(db, idle_for=idle_for, batch_size=batch_size)
+
+    def evict(self, carts: List[Tuple[int, int]]) -> None:
+        for cart_id, user_id in carts:
+            self.store.delete(self._cart_key(cart_id))
+            self.store.delete(self._user_key(user_id))
+            self.store.discard_dirty(cart_id)
+
+    def flush(self, db: Session, *, cart_ids: Optional[List[int]] = None) -> int:
+        """
+        Persist dirty carts to SQL, one transaction per batch. With `cart_ids` only those
+        carts are written (synchronously, e.g. at checkout).
+        """
+        flushed = 0
+        while True:
+            if cart_ids is not None:
+                batch = list(cart_ids)
+                for cart_id in batch:
+                    self.store.discard_dirty(cart_id)
+            else:
+                batch = self.store.pop_dirty(self.flush_batch_size)
+            if not batch:
+                break
+            try:
+                for cart_id in batch:
+                    raw = self.store.get(self._cart_key(cart_id))
+                    if raw is not None:
+                        self._persist(db, json.loads(raw))
+                db.commit()
+            except SQLAlchemyError:
+                db.rollback()
+                for cart_id in batch:
+                    self.store.mark_dirty(cart_id)
+                raise
+            flushed += len(batch)
+            if cart_ids is not None:
+                break
+        return flushed
+
+    def _persist(self, db: Session, data: Dict[str, Any]) -> None:
+        product_ids = [int(key) for key in data["items"]]
+        stale = db.query(CartItem).filter(CartItem.cart_id == data["id"])
+        if product_ids:
+            stale = stale.filter(CartItem.product_id.notin_(product_ids))
+        stale.delete(synchronize_session=False)
+        if not product_ids:
+            return
+        stmt = dialect_insert(db, CartItem.__table__)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["cart_id", "product_id"],
+            set_={"quantity": stmt.excluded.quantity, "updated_at": func.now()},
+            where=CartItem.__table__.c.quantity != stmt.excluded.quantity,
+        )
+        db.execute(stmt, [
+            {
+                "cart_id": data["id"],
+                "product_id": int(key),
+                "quantity": line["quantity"],
+                "price": line["price"],
+            }
+            for key, line in data["items"].items()
+        ])
+
+def _build_cart_service() -> CartService:
+    if settings.CART_STORAGE == "sql":
+        return CartService()
+    if settings.CART_STORAGE == "memory":
+        store = InMemoryCartStore()
+    elif settings.CART_STORAGE == "redis":
+        client = get_redis_client()
+        if client is None:
+            raise ValueError("CART_STORAGE=redis requires REDIS_URL")
+        store = RedisCartStore(client)
+    else:
+        raise ValueError(f"Unknown CART_STORAGE {settings.CART_STORAGE!r}")
+    return HotCartService(store, flush_batch_size=settings.CART_FLUSH_BATCH_SIZE)
+
+cart_service = _build_cart_service() 
\ No newline at end of file
@@ -0,0 +1,86 @@
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+import redis
+from app.core.jobs import PeriodicJob
+
+class InMemoryCartStore:
+    """
+    Process-local key-value tier for hot carts. Used for tests and single-worker setups.
+    """
+    def __init__(self):
+        self._data: Dict[str, str] = {}
+        self._dirty: set = set()
+        self._locks: Dict[str, threading.Lock] = {}
+        self._guard = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        return self._data.get(key)
+
+    def set(self, key: str, value: str) -> None:
+        self._data[key] = value
+
+    def delete(self, key: str) -> None:
+        self._data.pop(key, None)
+
+    def mark_dirty(self, cart_id: int) -> None:
+        with self._guard:
+            self._dirty.add(cart_id)
+
+    def pop_dirty(self, count: int) -> List[int]:
+        with self._guard:
+            batch = [self._dirty.pop() for _ in range(min(count, len(self._dirty)))]
+        return batch
+
+    def discard_dirty(self, cart_id: int) -> None:
+        with self._guard:
+            self._dirty.discard(cart_id)
+
+    @contextmanager
+    def lock(self, key: str) -> Iterator[None]:
+        with self._guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            yield
+
+class RedisCartStore:
+    """
+    Redis-backed key-value tier shared by every worker.
+    """
+    DIRTY_KEY = "cart:dirty"
+
+    def __init__(self, client: redis.Redis, ttl: int = 7 * 24 * 3600):
+        self.client = client
+        self.ttl = ttl
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.client.get(key)
+        return value.decode("utf-8") if isinstance(value, bytes) else value
+
+    def set(self, key: str, value: str) -> None:
+        self.client.set(key, value, ex=self.ttl)
+
+    def delete(self, key: str) -> None:
+        self.client.delete(key)
+
+    def mark_dirty(self, cart_id: int) -> None:
+        self.client.sadd(self.DIRTY_KEY, cart_id)
+
+    def pop_dirty(self, count: int) -> List[int]:
+        return [int(value) for value in self.client.spop(self.DIRTY_KEY, count) or []]
+
+    def discard_dirty(self, cart_id: int) -> None:
+        self.client.srem(self.DIRTY_KEY, cart_id)
+
+    @contextmanager
+    def lock(self, key: str) -> Iterator[None]:
+        with self.client.lock(f"{key}:lock", timeout=5, blocking_timeout=5):
+            yield
+
+class WriteBehindFlusher(PeriodicJob):
+    """
+    Background thread that periodically persists dirty hot carts. Stopping it flushes
+    the carts changed since the previous tick.
+    """
+    def __init__(self, flush: Callable[[], int], interval: float):
+        super().__init__(flush, interval, name="cart-flusher", run_on_stop=True)
@@ -0,0 +1,205 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy import case, func, insert, or_, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.core.database import dialect_insert
+from app.models.product import Product, Category
+from app.schemas.product import ProductImportRow, ProductImportError, ProductImportResult
+from app.services.product import product_service
+
+# Same columns the importer understands, so an export can be re-imported as is
+EXPORT_FIELDS = [
+    "id", "name", "description", "price", "stock", "category_id", "category",
+    "is_active", "created_at", "updated_at",
+]
+
+# Only this many row errors are echoed back; the rest are counted in `failed`
+MAX_REPORTED_ERRORS = 1000
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        "{}: {}".format(".".join(str(part) for part in err["loc"]) or "row", err["msg"])
+        for err in error.errors()
+    )
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+class CatalogIOService:
+    def iter_csv(self, stream: IO[str]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        reader = csv.DictReader(stream)
+        for row in reader:
+            # Empty cells mean "not given" so defaults and optional fields apply
+            yield reader.line_num, {key: value for key, value in row.items() if key and value != ""}
+
+    def iter_ndjson(self, stream: IO[str]) -> Iterator[Tuple[int, Any]]:
+        for line_num, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_num, json.loads(line)
+            except ValueError:
+                yield line_num, None
+
+    def _chunks(self, rows: Iterable[Tuple[int, Any]], size: int) -> Iterator[List[Tuple[int, Any]]]:
+        chunk = []
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def import_products(
+        self, db: Session, *, rows: Iterable[Tuple[int, Any]], chunk_size: int = 1000
+    ) -> ProductImportResult:
+        result = ProductImportResult()
+
+        def fail(line: int, message: str) -> None:
+            result.failed += 1
+            if len(result.errors) < MAX_REPORTED_ERRORS:
+                result.errors.append(ProductImportError(line=line, error=message))
+
+        # One lookup map for the whole import instead of a query per row
+        category_ids = set()
+        category_by_name = {}
+        for id, name in db.query(Category.id, Category.name):
+            category_ids.add(id)
+            category_by_name[name] = id
+
+        for chunk in self._chunks(rows, chunk_size):
+            new_rows, upsert_rows = [], []
+            for line, raw in chunk:
+                if not isinstance(raw, dict):
+                    fail(line, "Row is not a JSON object")
+                    continue
+                try:
+                    row = ProductImportRow.model_validate(raw)
+                except ValidationError as e:
+                    fail(line, _validation_message(e))
+                    continue
+                category_id = row.category_id
+                if category_id is None and row.category is not None:
+                    category_id = category_by_name.get(row.category)
+                if category_id not in category_ids:
+                    fail(line, "Category not found")
+                    continue
+                values = row.model_dump(exclude={"id", "category"})
+                values["category_id"] = category_id
+                if values["is_active"] is None:
+                    values["is_active"] = True
+                if row.id is None:
+                    new_rows.append((line, values))
+                else:
+                    values["id"] = row.id
+                    upsert_rows.append((line, values))
+
+            created, upserted = self._write_chunk(db, new_rows, upsert_rows, fail)
+            db.commit()
+            product_service.invalidate(*(values["id"] for _, values in upsert_rows))
+            result.created += created
+            result.upserted += upserted
+        return result
+
+    def _upsert_statement(self, db: Session):
+        stmt = dialect_insert(db, Product.__table__)
+        return stmt.on_conflict_do_update(
+            index_elements=[Product.id],
+            set_={
+                "name": stmt.excluded.name,
+                "description": stmt.excluded.description,
+                "price": stmt.excluded.price,
+                # Sharded stock is set through the product API, which rebalances the shards
+                "stock": case((Product.stock_shards > 0, Product.stock), else_=stmt.excluded.stock),
+                "category_id": stmt.excluded.category_id,
+                "is_active": stmt.excluded.is_active,
+                "version": Product.version + 1,
+                "updated_at": func.now(),
+            },
+        )
+
+    def _write_chunk(self, db: Session, new_rows, upsert_rows, fail) -> Tuple[int, int]:
+        statements = [
+            (insert(Product.__table__), new_rows),
+            (self._upsert_statement(db), upsert_rows),
+        ]
+        counts = []
+        for stmt, rows in statements:
+            if not rows:
+                counts.append(0)
+                continue
+            try:
+                with db.begin_nested():
+                    db.execute(stmt, [values for _, values in rows])
+                counts.append(len(rows))
+            except SQLAlchemyError:
+                # Isolate the offending rows instead of dropping the whole chunk
+                written = 0
+                for line, values in rows:
+                    try:
+                        with db.begin_nested():
+                            db.execute(stmt, [values])
+                        written += 1
+                    except SQLAlchemyError as e:
+                        fail(line, str(e.orig) if getattr(e, "orig", None) else str(e))
+                counts.append(written)
+        return counts[0], counts[1]
+
+    def export_products(
+        self,
+        db: Session,
+        *,
+        format: str = "ndjson",
+        since: Optional[datetime] = None,
+        chunk_size: int = 1000,
+    ) -> Iterator[str]:
+        """
+        Yield the catalog as NDJSON or CSV text, one chunk per batch of rows.
+
+        Rows are read with yield_per (a server-side cursor where the driver supports it)
+        and serialized straight from the result rows, so memory use does not depend on
+        catalog size.
+        """
+        stmt = (
+            select(
+                Product.id, Product.name, Product.description, Product.price, Product.stock,
+                Product.category_id, Category.name.label("category"), Product.is_active,
+                Product.created_at, Product.updated_at,
+            )
+            .outerjoin(Category, Category.id == Product.category_id)
+            .order_by(Product.id)
+            .execution_options(yield_per=chunk_size)
+        )
+        if since is not None:
+            stmt = stmt.where(or_(Product.updated_at >= since, Product.created_at >= since))
+
+        if format == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(EXPORT_FIELDS)
+            yield buffer.getvalue()
+
+        for partition in db.execute(stmt).partitions():
+            if format == "csv":
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                for row in partition:
+                    writer.writerow(
+                        value.isoformat() if isinstance(value, datetime) else value for value in row
+                    )
+                yield buffer.getvalue()
+            else:
+                yield "".join(
+                    json.dumps(dict(zip(EXPORT_FIELDS, row)), default=_json_default) + "\n"
+                    for row in partition
+                )
+
+catalog_io_service = CatalogIOService()
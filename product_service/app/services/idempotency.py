@@ -0,0 +1,129 @@
+import hashlib
+import json
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import dialect_insert
+from app.models.idempotency import IdempotencyKey
+
+class IdempotencyConflict(Exception):
+    """
+    Another request with the same key is still being processed.
+    """
+
+class IdempotencyService:
+    def fingerprint(self, endpoint: str, payload: Any) -> str:
+        body = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha256(f"{endpoint}\n{body}".encode("utf-8")).hexdigest()
+
+    def _find(self, db: Session, *, user_id: int, key: str) -> Optional[IdempotencyKey]:
+        return (
+            db.query(IdempotencyKey)
+            .populate_existing()
+            .filter(IdempotencyKey.user_id == user_id, IdempotencyKey.key == key)
+            .first()
+        )
+
+    def claim(
+        self, db: Session, *, user_id: int, key: str, endpoint: str, fingerprint: str
+    ) -> Tuple[IdempotencyKey, bool]:
+        """
+        Claim `key` for this request. Returns (record, True) when the caller owns it and
+        must do the work, or (record, False) with a completed record to replay. A
+        duplicate arriving while the first request is in flight waits for it to finish;
+        one that finds the key in progress past IDEMPOTENCY_LEASE takes it over.
+        """
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT_TIMEOUT
+        while True:
+            stmt = dialect_insert(db, IdempotencyKey).values(
+                user_id=user_id,
+                key=key,
+                endpoint=endpoint,
+                request_fingerprint=fingerprint,
+                status="in_progress",
+            )
+            claimed = db.execute(stmt.on_conflict_do_nothing(index_elements=["user_id", "key"])).rowcount
+            db.commit()
+            record = self._find(db, user_id=user_id, key=key)
+            if record is None:
+                # Released by a failed request between our insert and read; try again
+                continue
+            if claimed:
+                return record, True
+            if record.request_fingerprint != fingerprint:
+                raise ValueError("Idempotency-Key was already used for a different request")
+            if record.status == "completed":
+                return record, False
+            if self._take_over(db, record.id):
+                return record, True
+            if time.monotonic() >= deadline:
+                raise IdempotencyConflict("A request with this Idempotency-Key is still in progress")
+            # Do not hold a snapshot open while polling
+            db.rollback()
+            time.sleep(settings.IDEMPOTENCY_POLL_INTERVAL)
+
+    def _take_over(self, db: Session, record_id: int) -> bool:
+        # Renew an abandoned in-progress claim for this request; the conditional UPDATE
+        # lets only one of several concurrent retries win it
+        now = datetime.now(timezone.utc)
+        taken = db.query(IdempotencyKey).filter(
+            IdempotencyKey.id == record_id,
+            IdempotencyKey.status == "in_progress",
+            IdempotencyKey.created_at < now - timedelta(seconds=settings.IDEMPOTENCY_LEASE),
+        ).update({IdempotencyKey.created_at: now}, synchronize_session=False)
+        db.commit()
+        return taken == 1
+
+    def complete(
+        self, db: Session, record_id: int, *, order_id: Optional[int] = None, intent_id: Optional[int] = None
+    ) -> None:
+        # Called inside the order (or order intent) transaction, so a committed order
+        # always has its key
+        db.query(IdempotencyKey).filter(IdempotencyKey.id == record_id).update(
+            {
+                IdempotencyKey.status: "completed",
+                IdempotencyKey.order_id: order_id,
+                IdempotencyKey.intent_id: intent_id,
+            },
+            synchronize_session=False,
+        )
+
+    def store_response(self, db: Session, record_id: int, *, status_code: int, body: Any) -> None:
+        db.query(IdempotencyKey).filter(IdempotencyKey.id == record_id).update(
+            {IdempotencyKey.response_code: status_code, IdempotencyKey.response_body: json.dumps(body)},
+            synchronize_session=False,
+        )
+        db.commit()
+
+    def release(self, db: Session, record_id: int) -> None:
+        # A failed request frees its key so the client can retry it
+        db.rollback()
+        db.query(IdempotencyKey).filter(IdempotencyKey.id == record_id).delete(synchronize_session=False)
+        db.commit()
+
+    def purge_expired(self, db: Session, *, ttl: timedelta, batch_size: int = 1000) -> int:
+        """
+        Delete keys older than `ttl`, `batch_size` rows per transaction. A retry after
+        that is treated as a new request.
+        """
+        cutoff = datetime.now(timezone.utc) - ttl
+        purged = 0
+        while True:
+            ids = [
+                id for id, in db.query(IdempotencyKey.id)
+                .filter(IdempotencyKey.created_at < cutoff)
+                .order_by(IdempotencyKey.created_at)
+                .limit(batch_size)
+            ]
+            if not ids:
+                return purged
+            purged += (
+                db.query(IdempotencyKey)
+                .filter(IdempotencyKey.id.in_(ids))
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+
+idempotency_service = IdempotencyService()
@@ -1,114 +1,363 @@
-from typing import Any, Dict, List, Optional, Union
-from sqlalchemy.orm import Session
-from app.models.order import Order, OrderItem, OrderStatus
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple, Union
+from sqlalchemy import and_, case, func, insert, or_, select, union_all, update
+from sqlalchemy.orm import Session, aliased, selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from app.core.pagination import decode_cursor, encode_cursor
+from app.models.cart import CartItem
+from app.models.order import ArchivedOrder, ArchivedOrderItem, Order, OrderItem, OrderStatus, OrderSummary
 from app.models.product import Product
-from app.schemas.order import OrderCreate, OrderUpdate
+from app.schemas.order import OrderArchiveResult, OrderBulkResult, OrderBulkSelection, OrderCreate, OrderOutcome, OrderUpdate
+from app.services.analytics import UNCATEGORIZED, order_day, sales_rollup_service
 from app.services.cart import cart_service
+from app.services.idempotency import idempotency_service
+from app.services.product import product_service
+from app.services.reservation import reservation_service
+from app.services.stock import stock_counter_service
+
+# Product names shown per order in the history list
+SUMMARY_PRODUCT_NAMES = 3
+# Status changes an order may go through; cancelling also puts the stock back
+ORDER_TRANSITIONS = {
+    OrderStatus.PENDING: {OrderStatus.PROCESSING, OrderStatus.CANCELLED},
+    OrderStatus.PROCESSING: {OrderStatus.SHIPPED},
+    OrderStatus.SHIPPED: {OrderStatus.DELIVERED},
+    OrderStatus.DELIVERED: set(),
+    OrderStatus.CANCELLED: set(),
+}
+MAX_BULK_ORDERS = 5000
+
+# Orders that can no longer change and are moved to the archive tables
+ARCHIVED_STATUSES = [OrderStatus.DELIVERED, OrderStatus.CANCELLED]
+
+def _union(live, archive):
+    # Live and archived rows of a table, as one subquery with the live table's columns
+    return union_all(
+        select(*live.__table__.c),
+        select(*(archive.__table__.c[column.name] for column in live.__table__.c)),
+    ).subquery()
 
 class OrderService:
-    def get(self, db: Session, id: Any) -> Optional[Order]:
-        return db.query(Order).filter(Order.id == id).first()
+    def get(self, db: Session, id: Any) -> Optional[Union[Order, ArchivedOrder]]:
+        """
+        A live order, or the archived one when it has been moved out of `orders`.
+        """
+        order = (
+            db.query(Order)
+            .options(selectinload(Order.items))
+            .filter(Order.id == id)
+            .first()
+        )
+        if order is not None:
+            return order
+        return (
+            db.query(ArchivedOrder)
+            .options(selectinload(ArchivedOrder.items))
+            .filter(ArchivedOrder.id == id)
+            .first()
+        )
 
     def get_by_user(
         self, db: Session, *, user_id: int, skip: int = 0, limit: int = 100
     ) -> List[Order]:
-        return (
-            db.query(Order)
-            .filter(Order.user_id == user_id)
+        """
+        A user's orders, live and archived, by id. Archived rows are loaded as read-only
+        Order objects through UNION ALL subqueries, still one query for the orders and
+        one for their items.
+        """
+        orders_view = aliased(Order, _union(Order, ArchivedOrder))
+        orders = (
+            db.query(orders_view)
+            .filter(orders_view.user_id == user_id)
+            .order_by(orders_view.id)
             .offset(skip)
             .limit(limit)
             .all()
         )
+        if not orders:
+            return orders
+        items_view = aliased(OrderItem, _union(OrderItem, ArchivedOrderItem))
+        items: Dict[int, List[OrderItem]] = {order.id: [] for order in orders}
+        for item in (
+            db.query(items_view)
+            .filter(items_view.order_id.in_(items))
+            .order_by(items_view.id)
+        ):
+            items[item.order_id].append(item)
+        for order in orders:
+            set_committed_value(order, "items", items[order.id])
+        return orders
 
-    def create(self, db: Session, *, obj_in: OrderCreate) -> Order:
-        # Calculate total amount
-        total_amount = 0
-        order_items = []
-
-        for item in obj_in.items:
-            product = db.query(Product).filter(Product.id == item.product_id).first()
-            if not product:
-                raise ValueError(f"Product {item.product_id} not found")
-            if product.stock < item.quantity:
-                raise ValueError(f"Not enough stock for product {product.name}")
-            
-            total_amount += product.price * item.quantity
-            order_items.append(
-                OrderItem(
-                    product_id=item.product_id,
-                    quantity=item.quantity,
-                    price=product.price
-                )
-            )
-            # Update product stock
-            product.stock -= item.quantity
-            db.add(product)
-            db.commit()
-            db.refresh(product)
-
-        # Create order
-        db_obj = Order(
-            user_id=obj_in.user_id,
-            status=OrderStatus.PENDING,
-            total_amount=total_amount,
+    def create(
+        self, db: Session, *, obj_in: OrderCreate, user_id: int, idempotency_key_id: Optional[int] = None
+    ) -> Order:
+        # The order (and whose stock holds it converts) belongs to the authenticated
+        # user, not to the user_id in the request body
+        return self._place_order(
+            db,
+            user_id=user_id,
             shipping_address=obj_in.shipping_address,
-            items=order_items
+            lines=[(item.product_id, item.quantity, None) for item in obj_in.items],
+            idempotency_key_id=idempotency_key_id,
         )
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
 
     def create_from_cart(
-        self, db: Session, *, user_id: int, shipping_address: str
+        self, db: Session, *, user_id: int, shipping_address: str, idempotency_key_id: Optional[int] = None
     ) -> Order:
         # Get user's cart
         cart = cart_service.get_by_user(db, user_id=user_id)
         if not cart or not cart.items:
             raise ValueError("Cart is empty")
+        # Checkout must see the durable cart: write back any pending hot-tier changes first
+        cart_service.flush(db, cart_ids=[cart.id])
 
-        # Calculate total amount and prepare order items
-        total_amount = 0
-        order_items = []
-
-        for cart_item in cart.items:
-            product = db.query(Product).filter(Product.id == cart_item.product_id).first()
-            if not product:
-                raise ValueError(f"Product {cart_item.product_id} not found")
-            if product.stock < cart_item.quantity:
-                raise ValueError(f"Not enough stock for product {product.name}")
-            
-            total_amount += cart_item.price * cart_item.quantity
-            order_items.append(
-                OrderItem(
-                    product_id=cart_item.product_id,
-                    quantity=cart_item.quantity,
-                    price=cart_item.price
-                )
+        # Lines keep the price they were added to the cart with
+        order = self._place_order(
+            db,
+            user_id=user_id,
+            shipping_address=shipping_address,
+            lines=[(item.product_id, item.quantity, item.price) for item in cart.items],
+            cart_id=cart.id,
+            idempotency_key_id=idempotency_key_id,
+        )
+        cart_service.evict([(cart.id, user_id)])
+        return order
+
+    def _place_order(
+        self,
+        db: Session,
+        *,
+        user_id: int,
+        shipping_address: str,
+        lines: List[Tuple[int, int, Optional[float]]],
+        cart_id: Optional[int] = None,
+        idempotency_key_id: Optional[int] = None
+    ) -> Order:
+        """
+        Write the order (and complete the idempotency key) in one transaction.
+        """
+        try:
+            db_obj = self.write_order(
+                db, user_id=user_id, shipping_address=shipping_address, lines=lines, cart_id=cart_id
             )
-            # Update product stock
-            product.stock -= cart_item.quantity
-            db.add(product)
+            if idempotency_key_id is not None:
+                idempotency_service.complete(db, idempotency_key_id, order_id=db_obj.id)
             db.commit()
-            db.refresh(product)
+        except Exception:
+            db.rollback()
+            raise
+        product_service.invalidate(*(product_id for product_id, _, _ in lines))
+        db.refresh(db_obj)
+        return db_obj
+
+    def write_order(
+        self,
+        db: Session,
+        *,
+        user_id: int,
+        shipping_address: str,
+        lines: List[Tuple[int, int, Optional[float]]],
+        cart_id: Optional[int] = None
+    ) -> Order:
+        """
+        Reserve stock, write the order and its items and drop the ordered lines from the
+        cart, without committing. `lines` are (product_id, quantity, price); a None
+        price means the current product price. Raises ValueError, after which the
+        caller must roll back.
+        """
+        quantities: Dict[int, int] = {}
+        for product_id, quantity, _ in lines:
+            quantities[product_id] = quantities.get(product_id, 0) + quantity
+        products = {
+            row.id: row
+            for row in db.query(
+                Product.id, Product.name, Product.price, Product.stock, Product.stock_shards, Product.category_id
+            )
+            .filter(Product.id.in_(quantities))
+        }
+        for product_id, quantity in quantities.items():
+            if product_id not in products:
+                raise ValueError(f"Product {product_id} not found")
+            # The stock of sharded products is only a mirror; their shards decide below
+            if not products[product_id].stock_shards and products[product_id].stock < quantity:
+                raise ValueError(f"Not enough stock for product {products[product_id].name}")
+
+        self._reserve_stock(db, quantities, products, holder_id=user_id)
+        reservation_service.consume(db, user_id=user_id, product_ids=quantities)
 
-        # Create order
+        items = [
+            {
+                "product_id": product_id,
+                "quantity": quantity,
+                "price": price if price is not None else products[product_id].price,
+                "category_id": products[product_id].category_id or UNCATEGORIZED,
+            }
+            for product_id, quantity, price in lines
+        ]
         db_obj = Order(
             user_id=user_id,
             status=OrderStatus.PENDING,
-            total_amount=total_amount,
+            total_amount=sum(item["price"] * item["quantity"] for item in items),
             shipping_address=shipping_address,
-            items=order_items
+            created_at=datetime.now(timezone.utc)
         )
         db.add(db_obj)
-        
-        # Clear cart
-        cart_service.clear_cart(db, cart_id=cart.id)
-        
-        db.commit()
-        db.refresh(db_obj)
+        db.flush()
+        # One executemany for all lines instead of an INSERT ... RETURNING per line
+        db.execute(insert(OrderItem.__table__), [dict(item, order_id=db_obj.id) for item in items])
+        db.add(self._summary(db_obj, items, [products[item["product_id"]].name for item in items]))
+        sales_rollup_service.record_order(db, lines=[
+            (
+                db_obj.id, order_day(db_obj.created_at), item["product_id"],
+                item["category_id"], item["quantity"], item["price"],
+            )
+            for item in items
+        ])
+        if cart_id is not None:
+            db.query(CartItem).filter(
+                CartItem.cart_id == cart_id, CartItem.product_id.in_(quantities)
+            ).delete(synchronize_session=False)
         return db_obj
 
+    def _summary(self, order: Order, items: List[Dict[str, Any]], names: List[str]) -> OrderSummary:
+        return OrderSummary(
+            order_id=order.id,
+            user_id=order.user_id,
+            status=order.status,
+            total_amount=order.total_amount,
+            item_count=sum(item["quantity"] for item in items),
+            product_names=json.dumps(list(dict.fromkeys(names))[:SUMMARY_PRODUCT_NAMES]),
+            created_at=order.created_at,
+        )
+
+    def _set_summary_status(self, db: Session, order_ids: List[int], status: OrderStatus) -> None:
+        # Keep the history read model in step, inside the caller's transaction
+        db.query(OrderSummary).filter(OrderSummary.order_id.in_(order_ids)).update(
+            {OrderSummary.status: status}, synchronize_session=False
+        )
+
+    def get_history(
+        self, db: Session, *, user_id: int, cursor: Optional[str] = None, limit: int = 20
+    ) -> Tuple[List[OrderSummary], Optional[str]]:
+        """
+        Newest-first page of a user's order summaries, keyed on (created_at, order_id).
+        """
+        query = (
+            db.query(OrderSummary)
+            .filter(OrderSummary.user_id == user_id)
+            .order_by(OrderSummary.created_at.desc(), OrderSummary.order_id.desc())
+        )
+        if cursor:
+            position = decode_cursor(cursor)
+            try:
+                after_created = datetime.fromisoformat(position["created_at"])
+                after_id = int(position["id"])
+            except (KeyError, TypeError, ValueError):
+                raise ValueError("Invalid cursor")
+            query = query.filter(or_(
+                OrderSummary.created_at < after_created,
+                and_(OrderSummary.created_at == after_created, OrderSummary.order_id < after_id),
+            ))
+        rows = query.limit(limit + 1).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor({"created_at": rows[-1].created_at.isoformat(), "id": rows[-1].order_id})
+        return rows, next_cursor
+
+    def backfill_summaries(self, db: Session, *, batch_size: int = 500) -> int:
+        """
+        Write summaries for orders that have none (orders placed before the read model
+        existed), one transaction per batch.
+        """
+        written = 0
+        while True:
+            orders = (
+                db.query(Order)
+                .outerjoin(OrderSummary, OrderSummary.order_id == Order.id)
+                .filter(OrderSummary.order_id.is_(None))
+                .options(selectinload(Order.items).joinedload(OrderItem.product))
+                .order_by(Order.id)
+                .limit(batch_size)
+                .all()
+            )
+            if not orders:
+                return written
+            for order in orders:
+                items = [{"product_id": item.product_id, "quantity": item.quantity} for item in order.items]
+                names = [item.product.name for item in order.items if item.product is not None]
+                db.add(self._summary(order, items, names))
+            db.commit()
+            written += len(orders)
+
+    def _reserve_stock(self, db: Session, quantities: Dict[int, int], products: Dict[int, Any], *, holder_id: int) -> None:
+        """
+        Decrement stock for an order without committing; raises ValueError if any line
+        cannot be covered.
+        """
+        plain = {pid: q for pid, q in quantities.items() if not products[pid].stock_shards}
+        if plain:
+            # One conditional UPDATE for every line; a concurrent checkout that got to the
+            # stock first, or other users' holds, make it match fewer rows and the whole
+            # order is rolled back. The buyer's own holds turn into this decrement.
+            reserved = self._adjust_stock(db, {pid: -q for pid, q in plain.items()}, holder_id=holder_id)
+            if reserved != len(plain):
+                raise ValueError(self._stock_error(db, plain, holder_id=holder_id))
+        for product_id, quantity in quantities.items():
+            shards = products[product_id].stock_shards
+            if not shards:
+                continue
+            taken = stock_counter_service.take(db, product_id=product_id, quantity=quantity, shards=shards)
+            # Holds on sharded products are checked after the decrement rather than
+            # inside it, so two racing checkouts can still eat into them
+            if not taken or (
+                stock_counter_service.total(db, product_id=product_id)
+                < reservation_service.held(db, product_id=product_id, exclude_user_id=holder_id)
+            ):
+                raise ValueError(f"Not enough stock for product {products[product_id].name}")
+
+    def _restock(self, db: Session, quantities: Dict[int, int]) -> None:
+        # Put stock back (cancellations) without committing
+        shards = dict(
+            db.query(Product.id, Product.stock_shards)
+            .filter(Product.id.in_(quantities), Product.stock_shards > 0)
+            .all()
+        )
+        plain = {pid: q for pid, q in quantities.items() if pid not in shards}
+        if plain:
+            self._adjust_stock(db, plain)
+        for product_id, count in shards.items():
+            stock_counter_service.give(db, product_id=product_id, quantity=quantities[product_id], shards=count)
+
+    def _adjust_stock(self, db: Session, deltas: Dict[int, int], *, holder_id: Optional[int] = None) -> int:
+        """
+        Apply per-product stock deltas in a single UPDATE without letting stock go
+        negative. With `holder_id`, active holds of other users must stay covered too.
+        Returns the number of products updated.
+        """
+        products = Product.__table__
+        delta = case(deltas, value=products.c.id)
+        remaining = products.c.stock + delta
+        if holder_id is not None:
+            remaining = remaining - reservation_service.held_quantity(
+                products.c.id, now=datetime.now(timezone.utc), exclude_user_id=holder_id
+            )
+        result = db.execute(
+            update(products)
+            .where(products.c.id.in_(deltas), remaining >= 0)
+            .values(stock=products.c.stock + delta, version=products.c.version + 1)
+        )
+        return result.rowcount
+
+    def _stock_error(self, db: Session, quantities: Dict[int, int], *, holder_id: int) -> str:
+        availability = reservation_service.availability(db, product_ids=quantities, exclude_user_id=holder_id)
+        for product_id, quantity in quantities.items():
+            if availability[product_id].available < quantity:
+                name = db.query(Product.name).filter(Product.id == product_id).scalar()
+                return f"Not enough stock for product {name}"
+        return "Not enough stock"
+
     def update(
         self,
         db: Session,
@@ -116,14 +365,31 @@ class OrderService:
         db_obj: Order,
         obj_in: Union[OrderUpdate, Dict[str, Any]]
     ) -> Order:
+        if isinstance(db_obj, ArchivedOrder):
+            raise ValueError("Archived orders cannot be changed")
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
             update_data = obj_in.model_dump(exclude_unset=True)
+        status = update_data.pop("status", None)
+        if status is not None and status != db_obj.status and status not in ORDER_TRANSITIONS[db_obj.status]:
+            raise ValueError(f"Cannot change status from {db_obj.status.value} to {status.value}")
         for field in update_data:
             setattr(db_obj, field, update_data[field])
         db.add(db_obj)
-        db.commit()
+        restocked: List[int] = []
+        try:
+            # Status changes take the same guarded paths as cancel and the bulk endpoints
+            if status == OrderStatus.CANCELLED and db_obj.status != status:
+                restocked = self._cancel(db, db_obj)
+            elif status is not None and status != db_obj.status:
+                if not self._transition(db, [db_obj.id], status):
+                    raise ValueError("Order status changed concurrently, retry")
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        product_service.invalidate(*restocked)
         db.refresh(db_obj)
         return db_obj
 
@@ -131,22 +397,186 @@ class OrderService:
         order = self.get(db, id=order_id)
         if not order:
             raise ValueError("Order not found")
-        if order.status != OrderStatus.PENDING:
+        try:
+            restocked = self._cancel(db, order)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        product_service.invalidate(*restocked)
+        db.refresh(order)
+        return order
+
+    def _cancel(self, db: Session, order: Order) -> List[int]:
+        # Cancel a pending order and restore its stock, without committing
+        if isinstance(order, ArchivedOrder) or order.status != OrderStatus.PENDING:
+            raise ValueError("Can only cancel pending orders")
+        if not self._transition(db, [order.id], OrderStatus.CANCELLED):
             raise ValueError("Can only cancel pending orders")
 
         # Restore product stock
+        restock: Dict[int, int] = {}
         for item in order.items:
-            product = db.query(Product).filter(Product.id == item.product_id).first()
-            if product:
-                product.stock += item.quantity
-                db.add(product)
-                db.commit()
-                db.refresh(product)
+            restock[item.product_id] = restock.get(item.product_id, 0) + item.quantity
+        self._restock(db, restock)
+        return list(restock)
 
-        order.status = OrderStatus.CANCELLED
-        db.add(order)
-        db.commit()
-        db.refresh(order)
-        return order
+    def bulk_transition(
+        self, db: Session, *, selection: OrderBulkSelection, status: OrderStatus
+    ) -> OrderBulkResult:
+        """
+        Move the selected orders to `status` with one UPDATE that only matches orders
+        whose current status allows it.
+        """
+        if status == OrderStatus.CANCELLED:
+            raise ValueError("Use bulk cancel to cancel orders")
+        ids = self._select(db, selection)
+        try:
+            changed = self._transition(db, ids, status)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return self._outcomes(db, ids, changed, status)
+
+    def bulk_cancel(self, db: Session, *, selection: OrderBulkSelection) -> OrderBulkResult:
+        """
+        Cancel the selected orders and put their stock back, summed per product, in
+        one transaction.
+        """
+        ids = self._select(db, selection)
+        try:
+            changed = self._transition(db, ids, OrderStatus.CANCELLED)
+            restock = dict(
+                db.query(OrderItem.product_id, func.sum(OrderItem.quantity))
+                .filter(OrderItem.order_id.in_(changed))
+                .group_by(OrderItem.product_id)
+                .all()
+            ) if changed else {}
+            if restock:
+                self._restock(db, restock)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        product_service.invalidate(*restock)
+        return self._outcomes(db, ids, changed, OrderStatus.CANCELLED)
+
+    def _select(self, db: Session, selection: OrderBulkSelection) -> List[int]:
+        if selection.order_ids is not None:
+            if len(selection.order_ids) > MAX_BULK_ORDERS:
+                raise ValueError(f"At most {MAX_BULK_ORDERS} orders per request")
+            return list(dict.fromkeys(selection.order_ids))
+        if selection.filter is None:
+            raise ValueError("Either order_ids or filter is required")
+        criteria = selection.filter
+        query = db.query(Order.id)
+        if criteria.status is not None:
+            query = query.filter(Order.status == criteria.status)
+        if criteria.user_id is not None:
+            query = query.filter(Order.user_id == criteria.user_id)
+        if criteria.created_after is not None:
+            query = query.filter(Order.created_at >= criteria.created_after)
+        if criteria.created_before is not None:
+            query = query.filter(Order.created_at < criteria.created_before)
+        return [id for id, in query.order_by(Order.id).limit(selection.limit)]
+
+    def _transition(self, db: Session, ids: List[int], status: OrderStatus) -> List[int]:
+        allowed_from = [current for current, targets in ORDER_TRANSITIONS.items() if status in targets]
+        if not ids or not allowed_from:
+            return []
+        changed = [
+            id for id, in db.execute(
+                update(Order)
+                .where(Order.id.in_(ids), Order.status.in_(allowed_from))
+                .values(status=status)
+                .returning(Order.id)
+                .execution_options(synchronize_session=False)
+            )
+        ]
+        if changed:
+            self._set_summary_status(db, changed, status)
+            # None of the statuses an order can move on from books anything in the
+            # rollups, so any of them stands for all
+            sales_rollup_service.record_status_change(
+                db, order_ids=changed, old_status=allowed_from[0], new_status=status
+            )
+        return changed
+
+    def _outcomes(self, db: Session, ids: List[int], changed: List[int], status: OrderStatus) -> OrderBulkResult:
+        changed_ids = set(changed)
+        unchanged = [id for id in ids if id not in changed_ids]
+        current = dict(
+            db.query(Order.id, Order.status).filter(Order.id.in_(unchanged)).all()
+        ) if unchanged else {}
+        result = OrderBulkResult()
+        for id in ids:
+            if id in changed_ids:
+                outcome = OrderOutcome(order_id=id, ok=True, status=status)
+            elif id not in current:
+                outcome = OrderOutcome(order_id=id, ok=False, error="Order not found")
+            else:
+                outcome = OrderOutcome(
+                    order_id=id,
+                    ok=False,
+                    status=current[id],
+                    error=f"Cannot change status from {current[id].value} to {status.value}",
+                )
+            result.outcomes.append(outcome)
+        result.succeeded = len(changed_ids)
+        result.failed = len(ids) - len(changed_ids)
+        return result
+
+    def archive(self, db: Session, *, older_than: timedelta, batch_size: int = 500) -> OrderArchiveResult:
+        """
+        Move delivered and cancelled orders whose last change is older than `older_than`
+        to the archive tables, `batch_size` orders (with their items) per transaction.
+        """
+        cutoff = datetime.now(timezone.utc) - older_than
+        order_columns = [column.name for column in Order.__table__.c]
+        item_columns = [column.name for column in OrderItem.__table__.c]
+        result = OrderArchiveResult()
+        while True:
+            ids = [
+                id for id, in (
+                    db.query(Order.id)
+                    .filter(
+                        Order.status.in_(ARCHIVED_STATUSES),
+                        or_(
+                            Order.updated_at < cutoff,
+                            and_(Order.updated_at.is_(None), Order.created_at < cutoff),
+                        ),
+                    )
+                    .order_by(Order.id)
+                    .limit(batch_size)
+                    .with_for_update(skip_locked=True)
+                )
+            ]
+            if not ids:
+                return result
+            try:
+                db.execute(insert(ArchivedOrder.__table__).from_select(
+                    order_columns, select(*Order.__table__.c).where(Order.id.in_(ids))
+                ))
+                db.execute(insert(ArchivedOrderItem.__table__).from_select(
+                    item_columns, select(*OrderItem.__table__.c).where(OrderItem.order_id.in_(ids))
+                ))
+                result.items_archived += (
+                    db.query(OrderItem)
+                    .filter(OrderItem.order_id.in_(ids))
+                    .delete(synchronize_session=False)
+                )
+                result.orders_archived += (
+                    db.query(Order)
+                    .filter(Order.id.in_(ids))
+                    .delete(synchronize_session=False)
+                )
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            result.batches += 1
+            if len(ids) < batch_size:
+                return result
 
 order_service = OrderService() 
\ No newline at end of file
@@ -0,0 +1,217 @@
+import json
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.order import OrderIntent, OrderIntentStatus
+from app.models.product import Product
+from app.schemas.order import OrderCreate
+from app.services.cart import cart_service
+from app.services.idempotency import idempotency_service
+from app.services.order import order_service
+from app.services.product import product_service
+
+logger = logging.getLogger(__name__)
+
+class ClaimLost(Exception):
+    """
+    The intent was requeued and claimed by another worker while this one placed it.
+    """
+
+class OrderIntakeService:
+    """
+    Async order intake: requests are validated and stored as OrderIntent rows, and
+    workers place them in batches with one commit per batch.
+    """
+    def get(self, db: Session, id: int) -> Optional[OrderIntent]:
+        return db.query(OrderIntent).filter(OrderIntent.id == id).first()
+
+    def submit(
+        self, db: Session, *, obj_in: OrderCreate, user_id: int, idempotency_key_id: Optional[int] = None
+    ) -> OrderIntent:
+        lines = [(item.product_id, item.quantity, None) for item in obj_in.items]
+        self._validate(db, lines)
+        return self._enqueue(
+            db,
+            user_id=user_id,
+            shipping_address=obj_in.shipping_address,
+            lines=lines,
+            idempotency_key_id=idempotency_key_id,
+        )
+
+    def submit_from_cart(
+        self, db: Session, *, user_id: int, shipping_address: str, idempotency_key_id: Optional[int] = None
+    ) -> OrderIntent:
+        cart = cart_service.get_by_user(db, user_id=user_id)
+        if not cart or not cart.items:
+            raise ValueError("Cart is empty")
+        cart_service.flush(db, cart_ids=[cart.id])
+        # The intent snapshots the cart; lines added later stay in the cart
+        lines = [(item.product_id, item.quantity, item.price) for item in cart.items]
+        return self._enqueue(
+            db,
+            user_id=user_id,
+            shipping_address=shipping_address,
+            lines=lines,
+            cart_id=cart.id,
+            idempotency_key_id=idempotency_key_id,
+        )
+
+    def _validate(self, db: Session, lines: List[Tuple[int, int, Optional[float]]]) -> None:
+        # Cheap up-front checks; stock is only decided when the intent is placed
+        product_ids = {product_id for product_id, _, _ in lines}
+        found = {id for id, in db.query(Product.id).filter(Product.id.in_(product_ids))}
+        for product_id in product_ids:
+            if product_id not in found:
+                raise ValueError(f"Product {product_id} not found")
+
+    def _enqueue(
+        self,
+        db: Session,
+        *,
+        user_id: int,
+        shipping_address: str,
+        lines: List[Tuple[int, int, Optional[float]]],
+        cart_id: Optional[int] = None,
+        idempotency_key_id: Optional[int] = None
+    ) -> OrderIntent:
+        intent = OrderIntent(
+            user_id=user_id,
+            status=OrderIntentStatus.QUEUED,
+            shipping_address=shipping_address,
+            lines=json.dumps(lines),
+            cart_id=cart_id,
+        )
+        db.add(intent)
+        db.flush()
+        if idempotency_key_id is not None:
+            idempotency_service.complete(db, idempotency_key_id, intent_id=intent.id)
+        db.commit()
+        db.refresh(intent)
+        return intent
+
+    def claim_batch(self, db: Session, *, batch_size: int, token: str) -> List[OrderIntent]:
+        """
+        Mark up to `batch_size` queued intents with the claim `token`. The conditional
+        UPDATE lets several workers claim concurrently without taking the same intent.
+        """
+        # A batch commits its orders together with the intent statuses, so intents a
+        # dead worker left in processing have no order yet and can be queued again
+        stale = datetime.now(timezone.utc) - timedelta(seconds=settings.ORDER_INTENT_CLAIM_TIMEOUT)
+        if self._release(
+            db, OrderIntent.status == OrderIntentStatus.PROCESSING, OrderIntent.updated_at < stale
+        ):
+            db.commit()
+        ids = [
+            id for id, in db.query(OrderIntent.id)
+            .filter(OrderIntent.status == OrderIntentStatus.QUEUED)
+            .order_by(OrderIntent.id)
+            .limit(batch_size)
+        ]
+        if not ids:
+            return []
+        db.query(OrderIntent).filter(
+            OrderIntent.id.in_(ids), OrderIntent.status == OrderIntentStatus.QUEUED
+        ).update(
+            {
+                OrderIntent.status: OrderIntentStatus.PROCESSING,
+                OrderIntent.worker: token,
+                OrderIntent.attempts: OrderIntent.attempts + 1,
+            },
+            synchronize_session=False,
+        )
+        db.commit()
+        return db.query(OrderIntent).filter(OrderIntent.worker == token).order_by(OrderIntent.id).all()
+
+    def process_batch(self, db: Session, *, batch_size: int) -> int:
+        """
+        Place one batch of intents: each in its own savepoint, all in one commit.
+        Returns the number of intents processed.
+
+        An intent that outlived ORDER_INTENT_CLAIM_TIMEOUT may have been requeued and
+        claimed by another worker meanwhile; its outcome is only written while it still
+        carries our token, and its order is rolled back otherwise. An intent that hits
+        an unexpected error goes back to the queue on its own, and fails once it has
+        been claimed ORDER_INTENT_MAX_ATTEMPTS times.
+        """
+        token = str(uuid.uuid4())
+        intents = self.claim_batch(db, batch_size=batch_size, token=token)
+        if not intents:
+            return 0
+        ids = [intent.id for intent in intents]
+        touched = set()
+        carts = []
+        try:
+            for intent in intents:
+                lines = [tuple(line) for line in json.loads(intent.lines)]
+                try:
+                    with db.begin_nested():
+                        order = order_service.write_order(
+                            db,
+                            user_id=intent.user_id,
+                            shipping_address=intent.shipping_address,
+                            lines=lines,
+                            cart_id=intent.cart_id,
+                        )
+                        if not self._finish(
+                            db, intent.id, token, status=OrderIntentStatus.COMPLETED, order_id=order.id
+                        ):
+                            raise ClaimLost(intent.id)
+                except ClaimLost:
+                    continue
+                except ValueError as e:
+                    self._finish(db, intent.id, token, status=OrderIntentStatus.FAILED, error=str(e))
+                    continue
+                except Exception:
+                    logger.exception("Could not place order intent %s", intent.id)
+                    self._release(db, OrderIntent.id == intent.id, OrderIntent.worker == token)
+                    continue
+                touched.update(product_id for product_id, _, _ in lines)
+                if intent.cart_id is not None:
+                    carts.append((intent.cart_id, intent.user_id))
+            db.commit()
+        except Exception:
+            db.rollback()
+            # Hand the batch back to the queue
+            self._release(db, OrderIntent.id.in_(ids), OrderIntent.worker == token)
+            db.commit()
+            raise
+        product_service.invalidate(*touched)
+        cart_service.evict(carts)
+        return len(intents)
+
+    def _finish(self, db: Session, intent_id: int, token: str, **values: Any) -> bool:
+        # Record the outcome only if the intent is still claimed with our token
+        return db.query(OrderIntent).filter(
+            OrderIntent.id == intent_id,
+            OrderIntent.worker == token,
+            OrderIntent.status == OrderIntentStatus.PROCESSING,
+        ).update(values, synchronize_session=False) == 1
+
+    def _release(self, db: Session, *criteria: Any) -> int:
+        # Unfinished intents go back to the queue until they run out of attempts
+        claimed = db.query(OrderIntent).filter(OrderIntent.status == OrderIntentStatus.PROCESSING, *criteria)
+        failed = claimed.filter(OrderIntent.attempts >= settings.ORDER_INTENT_MAX_ATTEMPTS).update(
+            {
+                OrderIntent.status: OrderIntentStatus.FAILED,
+                OrderIntent.error: "Order could not be placed, please try again",
+            },
+            synchronize_session=False,
+        )
+        requeued = claimed.filter(OrderIntent.attempts < settings.ORDER_INTENT_MAX_ATTEMPTS).update(
+            {OrderIntent.status: OrderIntentStatus.QUEUED, OrderIntent.worker: None},
+            synchronize_session=False,
+        )
+        return failed + requeued
+
+    def drain(self, db: Session, *, batch_size: int) -> int:
+        processed = 0
+        while True:
+            count = self.process_batch(db, batch_size=batch_size)
+            if not count:
+                return processed
+            processed += count
+
+order_intake_service = OrderIntakeService()
@@ -1,16 +1,229 @@
-from typing import Any, Dict, List, Optional, Union
-from sqlalchemy.orm import Session
-from app.models.product import Product, Category
-from app.schemas.product import ProductCreate, ProductUpdate, CategoryCreate, CategoryUpdate
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple, Union
+from sqlalchemy import and_, case, column, func, literal_column, or_, table, text
+from sqlalchemy.orm import Session, joinedload, selectinload
+from app.core.cache import LRUCache, TieredCache, catalog_cache_bus
+from app.core.config import settings
+from app.core.pagination import encode_cursor, decode_cursor
+from app.models.product import Product, Category, SEARCH_VECTOR_SQL
+from app.schemas.product import (
+    ProductCreate, ProductUpdate, CategoryCreate, CategoryUpdate,
+    Product as ProductSchema, ProductInDBBase, Category as CategorySchema,
+    ProductFilter, ProductFacets, CategoryFacet, PriceRangeFacet,
+)
+from app.services.stock import stock_counter_service
+
+SORT_FIELDS = ("id", "name", "price", "created_at")
+# Lower bounds of the price facet buckets; the last bucket is open-ended
+PRICE_BUCKETS = [0, 25, 50, 100, 250, 500, 1000]
 
 class ProductService:
+    def __init__(self):
+        # Holds product rows without the embedded category so category edits
+        # only have to invalidate the category cache.
+        self.cache = TieredCache(
+            "catalog:product",
+            LRUCache(maxsize=settings.CATALOG_CACHE_SIZE, ttl=settings.CATALOG_CACHE_TTL),
+            catalog_cache_bus,
+            shared_ttl=settings.CATALOG_SHARED_CACHE_TTL,
+        )
+
     def get(self, db: Session, id: Any) -> Optional[Product]:
-        return db.query(Product).filter(Product.id == id).first()
+        return (
+            db.query(Product)
+            .options(joinedload(Product.category))
+            .filter(Product.id == id)
+            .first()
+        )
+
+    def get_cached(self, db: Session, id: int) -> Optional[ProductSchema]:
+        data = self.cache.get(id)
+        if data is None:
+            product = db.query(Product).filter(Product.id == id).first()
+            if not product:
+                return None
+            data = ProductInDBBase.model_validate(product).model_dump(mode="json")
+            self.cache.set(id, data)
+        category = category_service.get_cached(db, id=data["category_id"])
+        return ProductSchema(**data, category=category)
+
+    def invalidate(self, *ids: int) -> None:
+        for id in ids:
+            self.cache.delete(id)
+
+    def get_many(self, db: Session, *, ids: List[int]) -> Dict[int, Product]:
+        # One IN query for the products and one for their distinct categories
+        if not ids:
+            return {}
+        products = (
+            db.query(Product)
+            .options(selectinload(Product.category))
+            .filter(Product.id.in_(set(ids)))
+            .all()
+        )
+        return {product.id: product for product in products}
+
+    def _filtered(self, db: Session, filters: Optional[ProductFilter], *exclude: str):
+        query = db.query(Product)
+        if filters is None:
+            return query
+        if filters.category_id is not None and "category_id" not in exclude:
+            query = query.filter(Product.category_id == filters.category_id)
+        if "price" not in exclude:
+            if filters.min_price is not None:
+                query = query.filter(Product.price >= filters.min_price)
+            if filters.max_price is not None:
+                query = query.filter(Product.price <= filters.max_price)
+        if filters.in_stock is not None:
+            query = query.filter(Product.stock > 0 if filters.in_stock else Product.stock <= 0)
+        if filters.is_active is not None:
+            query = query.filter(Product.is_active.is_(filters.is_active))
+        return query
+
+    def _sort_key(self, sort: str):
+        field = sort.lstrip("-")
+        if field not in SORT_FIELDS:
+            raise ValueError(f"Cannot sort by {field}")
+        return field, getattr(Product, field), sort.startswith("-")
 
     def get_multi(
-        self, db: Session, *, skip: int = 0, limit: int = 100
+        self,
+        db: Session,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        filters: Optional[ProductFilter] = None,
+        sort: str = "id",
     ) -> List[Product]:
-        return db.query(Product).offset(skip).limit(limit).all()
+        field, sort_column, descending = self._sort_key(sort)
+        order = [sort_column.desc(), Product.id.desc()] if descending else [sort_column, Product.id]
+        return (
+            self._filtered(db, filters)
+            .options(joinedload(Product.category))
+            .order_by(*order)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+
+    def get_page(
+        self,
+        db: Session,
+        *,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        filters: Optional[ProductFilter] = None,
+        sort: str = "id",
+    ) -> Tuple[List[Product], Optional[str]]:
+        # Keyset pagination: seek past the last (sort key, id) instead of scanning skipped rows
+        field, sort_column, descending = self._sort_key(sort)
+        order = [sort_column.desc(), Product.id.desc()] if descending else [sort_column, Product.id]
+        query = self._filtered(db, filters).options(joinedload(Product.category)).order_by(*order)
+        if cursor:
+            position = decode_cursor(cursor)
+            after_id, after_key = position.get("id"), position.get("key")
+            if position.get("sort", "id") != sort or not isinstance(after_id, int):
+                raise ValueError("Invalid cursor")
+            if field == "id":
+                query = query.filter(Product.id < after_id if descending else Product.id > after_id)
+            else:
+                if after_key is None:
+                    raise ValueError("Invalid cursor")
+                if field == "created_at":
+                    try:
+                        after_key = datetime.fromisoformat(after_key)
+                    except TypeError:
+                        raise ValueError("Invalid cursor")
+                if descending:
+                    query = query.filter(or_(
+                        sort_column < after_key,
+                        and_(sort_column == after_key, Product.id < after_id),
+                    ))
+                else:
+                    query = query.filter(or_(
+                        sort_column > after_key,
+                        and_(sort_column == after_key, Product.id > after_id),
+                    ))
+        products = query.limit(limit + 1).all()
+        next_cursor = None
+        if len(products) > limit:
+            products = products[:limit]
+            last = products[-1]
+            position = {"id": last.id}
+            if sort != "id":
+                position["sort"] = sort
+            if field != "id":
+                key = getattr(last, field)
+                position["key"] = key.isoformat() if isinstance(key, datetime) else key
+            next_cursor = encode_cursor(position)
+        return products, next_cursor
+
+    def get_facets(self, db: Session, *, filters: Optional[ProductFilter] = None) -> ProductFacets:
+        # Each facet ignores its own filter so clients can see the alternatives
+        category_rows = (
+            self._filtered(db, filters, "category_id")
+            .join(Category, Category.id == Product.category_id)
+            .with_entities(Category.id, Category.name, func.count(Product.id))
+            .group_by(Category.id, Category.name)
+            .order_by(Category.name)
+            .all()
+        )
+        bucket = case(
+            *[(Product.price < upper, index) for index, upper in enumerate(PRICE_BUCKETS[1:])],
+            else_=len(PRICE_BUCKETS) - 1,
+        )
+        bucket_counts = dict(
+            self._filtered(db, filters, "price")
+            .with_entities(bucket, func.count(Product.id))
+            .group_by(bucket)
+            .all()
+        )
+        price_ranges = [
+            PriceRangeFacet(
+                min_price=lower,
+                max_price=PRICE_BUCKETS[index + 1] if index + 1 < len(PRICE_BUCKETS) else None,
+                count=bucket_counts.get(index, 0),
+            )
+            for index, lower in enumerate(PRICE_BUCKETS)
+        ]
+        return ProductFacets(
+            categories=[
+                CategoryFacet(category_id=id, name=name, count=count)
+                for id, name, count in category_rows
+            ],
+            price_ranges=price_ranges,
+        )
+
+    def search(
+        self, db: Session, *, q: str, limit: int = 20
+    ) -> List[Tuple[Product, float]]:
+        # Every word must match, either exactly or as a prefix
+        terms = re.findall(r"\w+", q)
+        if not terms:
+            return []
+        if db.bind.dialect.name == "postgresql":
+            vector = literal_column(SEARCH_VECTOR_SQL.format(prefix="products."))
+            ts_query = func.to_tsquery("simple", " & ".join(f"{term}:*" for term in terms))
+            score = func.ts_rank(vector, ts_query)
+            query = db.query(Product, score.label("score")).filter(vector.op("@@")(ts_query))
+        else:
+            fts = table("products_fts", column("rowid"))
+            match = " ".join('"{}"*'.format(term) for term in terms)
+            # bm25() is lower-is-better, flip it so higher scores rank first
+            score = -func.bm25(literal_column("products_fts"))
+            query = (
+                db.query(Product, score.label("score"))
+                .join(fts, fts.c.rowid == Product.id)
+                .filter(text("products_fts MATCH :match").bindparams(match=match))
+            )
+        return (
+            query.options(joinedload(Product.category))
+            .filter(Product.is_active.is_(True))
+            .order_by(score.desc(), Product.id)
+            .limit(limit)
+            .all()
+        )
 
     def create(self, db: Session, *, obj_in: ProductCreate) -> Product:
         db_obj = Product(
@@ -40,7 +253,13 @@ class ProductService:
         for field in update_data:
             setattr(db_obj, field, update_data[field])
         db.add(db_obj)
+        if db_obj.stock_shards and "stock" in update_data:
+            # A new stock level for a sharded product is spread over its shards
+            stock_counter_service.redistribute(
+                db, product_id=db_obj.id, shards=db_obj.stock_shards, total=db_obj.stock
+            )
         db.commit()
+        self.invalidate(db_obj.id)
         db.refresh(db_obj)
         return db_obj
 
@@ -48,12 +267,35 @@ class ProductService:
         obj = db.query(Product).get(id)
         db.delete(obj)
         db.commit()
+        self.invalidate(id)
         return obj
 
 class CategoryService:
+    def __init__(self):
+        self.cache = TieredCache(
+            "catalog:category",
+            LRUCache(maxsize=settings.CATALOG_CACHE_SIZE, ttl=settings.CATALOG_CACHE_TTL),
+            catalog_cache_bus,
+            shared_ttl=settings.CATALOG_SHARED_CACHE_TTL,
+        )
+
     def get(self, db: Session, id: Any) -> Optional[Category]:
         return db.query(Category).filter(Category.id == id).first()
 
+    def get_cached(self, db: Session, id: int) -> Optional[CategorySchema]:
+        data = self.cache.get(id)
+        if data is None:
+            db_obj = self.get(db, id=id)
+            if not db_obj:
+                return None
+            data = CategorySchema.model_validate(db_obj).model_dump(mode="json")
+            self.cache.set(id, data)
+        return CategorySchema(**data)
+
+    def invalidate(self, *ids: int) -> None:
+        for id in ids:
+            self.cache.delete(id)
+
     def get_by_name(self, db: Session, name: str) -> Optional[Category]:
         return db.query(Category).filter(Category.name == name).first()
 
@@ -87,6 +329,7 @@ class CategoryService:
             setattr(db_obj, field, update_data[field])
         db.add(db_obj)
         db.commit()
+        self.invalidate(db_obj.id)
         db.refresh(db_obj)
         return db_obj
 
@@ -94,6 +337,7 @@ class CategoryService:
         obj = db.query(Category).get(id)
         db.delete(obj)
         db.commit()
+        self.invalidate(id)
         return obj
 
 product_service = ProductService()
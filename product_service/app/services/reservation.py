@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.models.product import Product
+from app.models.reservation import StockReservation
+from app.schemas.reservation import ProductAvailability, ReservationItem
+from app.services.stock import stock_counter_service
+
+class ReservationService:
+    """
+    Time-limited stock holds. A hold keeps `quantity` units of a product out of
+    everybody else's available stock until it expires, is released, or is converted
+    into a stock decrement by checkout.
+    """
+    def _now(self) -> datetime:
+        return datetime.now(timezone.utc)
+
+    def held_quantity(self, product_id_column, *, now: datetime, exclude_user_id: Optional[int] = None):
+        """
+        Scalar subquery of the active holds on `product_id_column`, for correlating into
+        product queries and stock UPDATEs.
+        """
+        stmt = select(func.coalesce(func.sum(StockReservation.quantity), 0)).where(
+            StockReservation.product_id == product_id_column,
+            StockReservation.expires_at > now,
+        )
+        if exclude_user_id is not None:
+            stmt = stmt.where(StockReservation.user_id != exclude_user_id)
+        return stmt.scalar_subquery()
+
+    def held(self, db: Session, *, product_id: int, exclude_user_id: Optional[int] = None) -> int:
+        return db.query(self.held_quantity(product_id, now=self._now(), exclude_user_id=exclude_user_id)).scalar()
+
+    def availability(
+        self, db: Session, *, product_ids: Iterable[int], exclude_user_id: Optional[int] = None
+    ) -> Dict[int, ProductAvailability]:
+        held = self.held_quantity(Product.id, now=self._now(), exclude_user_id=exclude_user_id).label("reserved")
+        stock = stock_counter_service.stock_expression().label("stock")
+        rows = db.query(Product.id, stock, held).filter(Product.id.in_(set(product_ids)))
+        return {
+            row.id: ProductAvailability(
+                product_id=row.id,
+                stock=row.stock,
+                reserved=row.reserved,
+                available=row.stock - row.reserved,
+            )
+            for row in rows
+        }
+
+    def get_by_user(self, db: Session, *, user_id: int) -> List[StockReservation]:
+        return (
+            db.query(StockReservation)
+            .filter(StockReservation.user_id == user_id, StockReservation.expires_at > self._now())
+            .order_by(StockReservation.id)
+            .all()
+        )
+
+    def reserve(
+        self,
+        db: Session,
+        *,
+        user_id: int,
+        items: List[ReservationItem],
+        ttl: Optional[timedelta] = None
+    ) -> List[StockReservation]:
+        """
+        Place or refresh the user's holds on `items` in one transaction. A new hold for
+        a product replaces the user's previous one; all-or-nothing on stock.
+        """
+        ttl = ttl or timedelta(seconds=settings.RESERVATION_TTL)
+        if ttl > timedelta(seconds=settings.RESERVATION_MAX_TTL):
+            raise ValueError(f"Reservations cannot be held longer than {settings.RESERVATION_MAX_TTL} seconds")
+        quantities: Dict[int, int] = {}
+        for item in items:
+            quantities[item.product_id] = quantities.get(item.product_id, 0) + item.quantity
+        try:
+            # Lock the product rows so concurrent holds and checkouts on them serialize
+            names = dict(
+                db.query(Product.id, Product.name)
+                .filter(Product.id.in_(quantities))
+                .order_by(Product.id)
+                .with_for_update()
+                .all()
+            )
+            for product_id in quantities:
+                if product_id not in names:
+                    raise ValueError(f"Product {product_id} not found")
+            available = self.availability(db, product_ids=quantities, exclude_user_id=user_id)
+            for product_id, quantity in quantities.items():
+                if available[product_id].available < quantity:
+                    raise ValueError(f"Not enough stock for product {names[product_id]}")
+            self.consume(db, user_id=user_id, product_ids=quantities)
+            expires_at = self._now() + ttl
+            holds = [
+                StockReservation(product_id=product_id, user_id=user_id, quantity=quantity, expires_at=expires_at)
+                for product_id, quantity in quantities.items()
+            ]
+            db.add_all(holds)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return self.get_by_user(db, user_id=user_id)
+
+    def consume(self, db: Session, *, user_id: int, product_ids: Iterable[int]) -> int:
+        """
+        Drop the user's holds on `product_ids` without committing; checkout calls this in
+        the transaction that decrements the stock the holds were protecting.
+        """
+        return (
+            db.query(StockReservation)
+            .filter(StockReservation.user_id == user_id, StockReservation.product_id.in_(set(product_ids)))
+            .delete(synchronize_session=False)
+        )
+
+    def release(self, db: Session, *, user_id: int) -> int:
+        released = (
+            db.query(StockReservation)
+            .filter(StockReservation.user_id == user_id)
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        return released
+
+    def release_expired(self, db: Session, *, batch_size: int = 1000) -> int:
+        """
+        Delete expired holds, `batch_size` rows per transaction. Expired holds already
+        stop counting against stock; this only reclaims the rows.
+        """
+        now = self._now()
+        released = 0
+        while True:
+            ids = [
+                id for id, in db.query(StockReservation.id)
+                .filter(StockReservation.expires_at <= now)
+                .order_by(StockReservation.expires_at)
+                .limit(batch_size)
+            ]
+            if not ids:
+                return released
+            released += (
+                db.query(StockReservation)
+                .filter(StockReservation.id.in_(ids))
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+
+reservation_service = ReservationService()
@@ -0,0 +1,158 @@
+import random
+from typing import List, Optional
+from sqlalchemy import case, func, select
+from sqlalchemy.orm import Session
+from app.models.product import Product, StockShard
+
+class StockCounterService:
+    """
+    Opt-in sharded stock for hot SKUs.
+
+    A sharded product keeps its stock in `stock_shards` StockShard rows. Checkouts
+    decrement one randomly chosen shard, so concurrent buyers of the same SKU mostly
+    lock different rows instead of queueing on products.stock. The total is the sum of
+    the shards; products.stock is only a mirror for listings and filters, refreshed by
+    consolidate(), which also rebalances drained shards.
+    """
+    def stock_expression(self):
+        # Authoritative stock of Product rows in queries: summed shards when sharded
+        shard_total = (
+            select(func.coalesce(func.sum(StockShard.quantity), 0))
+            .where(StockShard.product_id == Product.id)
+            .scalar_subquery()
+        )
+        return case((Product.stock_shards > 0, shard_total), else_=Product.stock)
+
+    def total(self, db: Session, *, product_id: int) -> int:
+        return (
+            db.query(func.coalesce(func.sum(StockShard.quantity), 0))
+            .filter(StockShard.product_id == product_id)
+            .scalar()
+        )
+
+    def _split(self, total: int, shards: int) -> List[int]:
+        base, extra = divmod(max(total, 0), shards)
+        return [base + (1 if i < extra else 0) for i in range(shards)]
+
+    def redistribute(self, db: Session, *, product_id: int, shards: int, total: Optional[int] = None) -> int:
+        """
+        Spread `total` (default: what the shards hold now) evenly over `shards` shard
+        rows and mirror it to products.stock, without committing. Returns the total.
+        """
+        existing = {
+            row.shard: row
+            for row in db.query(StockShard)
+            .filter(StockShard.product_id == product_id)
+            .order_by(StockShard.shard)
+            .with_for_update()
+        }
+        if total is None:
+            total = sum(row.quantity for row in existing.values())
+        for shard, quantity in enumerate(self._split(total, shards)):
+            row = existing.pop(shard, None)
+            if row is None:
+                db.add(StockShard(product_id=product_id, shard=shard, quantity=quantity))
+            else:
+                row.quantity = quantity
+        for row in existing.values():
+            db.delete(row)
+        db.query(Product).filter(Product.id == product_id).update(
+            {Product.stock: total, Product.stock_shards: shards}, synchronize_session=False
+        )
+        return total
+
+    def enable(self, db: Session, *, product_id: int, shards: int) -> Product:
+        if shards < 1:
+            raise ValueError("A sharded product needs at least one shard")
+        product = db.query(Product).filter(Product.id == product_id).with_for_update().first()
+        if not product:
+            raise ValueError("Product not found")
+        total = None if product.stock_shards else product.stock
+        self.redistribute(db, product_id=product_id, shards=shards, total=total)
+        db.commit()
+        db.refresh(product)
+        return product
+
+    def disable(self, db: Session, *, product_id: int) -> Product:
+        product = db.query(Product).filter(Product.id == product_id).with_for_update().first()
+        if not product:
+            raise ValueError("Product not found")
+        if product.stock_shards:
+            rows = (
+                db.query(StockShard)
+                .filter(StockShard.product_id == product_id)
+                .with_for_update()
+                .all()
+            )
+            total = sum(row.quantity for row in rows)
+            db.query(StockShard).filter(StockShard.product_id == product_id).delete(synchronize_session=False)
+            product.stock = total
+            product.stock_shards = 0
+            db.commit()
+            db.refresh(product)
+        return product
+
+    def take(self, db: Session, *, product_id: int, quantity: int, shards: int) -> bool:
+        """
+        Decrement `quantity` from a random shard, falling back to its siblings and, when
+        no single shard holds enough, to draining several. Does not commit; returns
+        False (with nothing taken) if the shards together hold less than `quantity`.
+        """
+        start = random.randrange(shards)
+        for offset in range(shards):
+            taken = (
+                db.query(StockShard)
+                .filter(
+                    StockShard.product_id == product_id,
+                    StockShard.shard == (start + offset) % shards,
+                    StockShard.quantity >= quantity,
+                )
+                .update({StockShard.quantity: StockShard.quantity - quantity}, synchronize_session=False)
+            )
+            if taken:
+                return True
+        rows = (
+            db.query(StockShard)
+            .filter(StockShard.product_id == product_id, StockShard.quantity > 0)
+            .order_by(StockShard.quantity.desc())
+            .with_for_update()
+            .all()
+        )
+        if sum(row.quantity for row in rows) < quantity:
+            return False
+        remaining = quantity
+        for row in rows:
+            step = min(row.quantity, remaining)
+            row.quantity -= step
+            remaining -= step
+            if not remaining:
+                break
+        db.flush()
+        return True
+
+    def give(self, db: Session, *, product_id: int, quantity: int, shards: int) -> None:
+        # Returned stock goes to a random shard; consolidation evens it out later
+        db.query(StockShard).filter(
+            StockShard.product_id == product_id, StockShard.shard == random.randrange(shards)
+        ).update({StockShard.quantity: StockShard.quantity + quantity}, synchronize_session=False)
+
+    def consolidate(self, db: Session, *, product_ids: Optional[List[int]] = None) -> List[int]:
+        """
+        Rebalance the shards of every sharded product (one short transaction each) and
+        refresh the products.stock mirror. Returns the ids whose mirror changed.
+        """
+        query = db.query(Product.id, Product.stock, Product.stock_shards).filter(Product.stock_shards > 0)
+        if product_ids is not None:
+            query = query.filter(Product.id.in_(product_ids))
+        changed = []
+        for product_id, mirror, shards in query.all():
+            total = self.redistribute(db, product_id=product_id, shards=shards)
+            if total != mirror:
+                db.query(Product).filter(Product.id == product_id).update(
+                    {Product.version: Product.version + 1}, synchronize_session=False
+                )
+                changed.append(product_id)
+            db.commit()
+        return changed
+
+stock_counter_service = StockCounterService()
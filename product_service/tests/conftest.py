@@ -1,12 +1,13 @@
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 
 from app.core.database import Base, get_db
 from app.main import app
 from app.core.config import settings
+from app.services.product import product_service, category_service
 
 import sys
 import os
@@ -33,6 +34,12 @@ def db():
         db.close()
         Base.metadata.drop_all(bind=engine)
 
+@pytest.fixture(scope="function", autouse=True)
+def clear_catalog_cache():
+    yield
+    product_service.cache.clear()
+    category_service.cache.clear()
+
 @pytest.fixture(scope="function")
 def client(db):
     def override_get_db():
@@ -56,6 +63,30 @@ def admin_headers(admin_user):
     token = create_access_token(subject=str(admin_user.id))  # ID kullan  
     return {"Authorization": f"Bearer {token}"}
 
+@pytest.fixture(scope="function")
+def query_counter(db):
+    """
+    Collects the SQL statements sent to the test engine. Identity map is cleared first
+    so lazy loads are not hidden by objects left over from fixture setup.
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    db.expunge_all()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    yield statements
+    event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+@pytest.fixture(scope="function")
+def user_token_headers():
+    return {"Authorization": "Bearer user-token"}
+
+@pytest.fixture(scope="function")
+def admin_token_headers():
+    return {"Authorization": "Bearer admin-token"}
+
 @pytest.fixture(scope="function")
 def test_category(db):
     from app.models.product import Category
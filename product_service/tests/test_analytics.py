@@ -0,0 +1,141 @@
+import re
+import pytest
+from fastapi import status
+from app.models.analytics import DailyCategorySales, DailyProductSales
+
+@pytest.fixture
+def sales(client, db, user_token_headers, admin_token_headers, test_product):
+    from app.models.product import Product
+    from app.services.analytics import sales_rollup_service
+    loose = Product(name="Loose Product", price=5.0, stock=10)
+    db.add(loose)
+    db.commit()
+    product_ids = [test_product["id"], loose.id]
+    order_ids = []
+    for items in ([(product_ids[0], 2)], [(product_ids[0], 1), (product_ids[1], 3)], [(product_ids[1], 1)]):
+        response = client.post(
+            "/api/v1/orders/",
+            headers=user_token_headers,
+            json={
+                "user_id": 2,
+                "shipping_address": "Test Address",
+                "items": [{"product_id": product_id, "quantity": quantity} for product_id, quantity in items]
+            }
+        )
+        assert response.status_code == status.HTTP_200_OK, response.text
+        order_ids.append(response.json()["id"])
+    client.post(f"/api/v1/orders/{order_ids[0]}/cancel", headers=user_token_headers)
+    for next_status in ("processing", "shipped", "delivered"):
+        client.put(f"/api/v1/orders/{order_ids[1]}", headers=admin_token_headers, json={"status": next_status})
+    client.post("/api/v1/orders/bulk/status", headers=admin_token_headers, json={"order_ids": [order_ids[2]], "status": "processing"})
+    assert sales_rollup_service.fold(db, batch_size=3) > 0
+    return product_ids
+
+def test_sales_rollups_follow_orders(client, admin_token_headers, test_product, sales, request):
+    statements = request.getfixturevalue("query_counter")
+    response = client.get("/api/v1/analytics/sales/daily", headers=admin_token_headers)
+    assert response.status_code == status.HTTP_200_OK, response.text
+    [day] = response.json()
+    assert (day["orders"], day["units"], day["revenue"]) == (None, 7, 320.0)
+    assert (day["cancelled_units"], day["cancelled_revenue"], day["net_revenue"]) == (2, 200.0, 120.0)
+    assert (day["delivered_units"], day["delivered_revenue"]) == (4, 115.0)
+
+    response = client.get("/api/v1/analytics/sales/products", headers=admin_token_headers)
+    rows = {row["product_id"]: row for row in response.json()}
+    assert [row["product_id"] for row in response.json()] == sales
+    assert (rows[sales[0]]["name"], rows[sales[0]]["orders"], rows[sales[0]]["net_units"]) == ("Test Product", 2, 1)
+    assert (rows[sales[1]]["orders"], rows[sales[1]]["units"], rows[sales[1]]["delivered_units"]) == (2, 4, 3)
+
+    response = client.get("/api/v1/analytics/sales/categories", headers=admin_token_headers)
+    rows = {row["category_id"]: row for row in response.json()}
+    assert (rows[test_product["category_id"]]["name"], rows[test_product["category_id"]]["revenue"]) == ("Test Category", 300.0)
+    assert (rows[0]["name"], rows[0]["orders"], rows[0]["units"]) == (None, 2, 4)
+
+    response = client.get(f"/api/v1/analytics/sales/products/{sales[1]}", headers=admin_token_headers)
+    assert [(row["orders"], row["revenue"]) for row in response.json()] == [(2, 20.0)]
+    # Analytics only read the rollups
+    assert not [s for s in statements if "order_items" in s or re.search(r"\b(FROM|JOIN) orders\b", s)]
+
+def test_sales_rollup_date_range(client, admin_token_headers, user_token_headers, sales):
+    response = client.get(
+        "/api/v1/analytics/sales/daily",
+        headers=admin_token_headers,
+        params={"start": "2020-01-01", "end": "2020-01-31"}
+    )
+    assert response.json() == []
+    response = client.get(
+        "/api/v1/analytics/sales/daily",
+        headers=admin_token_headers,
+        params={"start": "2020-02-01", "end": "2020-01-31"}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    response = client.get("/api/v1/analytics/sales/daily", headers=user_token_headers)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+def test_rebuild_sales_rollups(db, sales):
+    from app.models.product import Category, Product
+    from app.services.analytics import sales_rollup_service
+
+    def snapshot():
+        db.expire_all()
+        return {
+            model.__tablename__: sorted(
+                tuple(getattr(row, column.name) for column in model.__table__.columns if column.name != "updated_at")
+                for row in db.query(model)
+            )
+            for model in (DailyProductSales, DailyCategorySales)
+        }
+
+    incremental = snapshot()
+    # Orders stay booked under the category their products had when they were placed
+    moved = Category(name="Moved Category")
+    db.add(moved)
+    db.flush()
+    db.query(Product).update({Product.category_id: moved.id})
+    db.query(DailyProductSales).delete()
+    db.query(DailyCategorySales).update({DailyCategorySales.revenue: 0})
+    db.commit()
+    assert sales_rollup_service.rebuild(db, days_per_batch=1) == 3
+    assert snapshot() == incremental
+
+def test_checkout_appends_rollup_deltas(client, db, user_token_headers, test_product, request):
+    from app.models.analytics import SalesRollupDelta
+    from app.models.product import Product
+    from app.services.analytics import sales_rollup_service
+    loose = Product(name="Loose Product", price=5.0, stock=10)
+    db.add(loose)
+    db.commit()
+    loose_id = loose.id
+    statements = request.getfixturevalue("query_counter")
+    for items in ([(test_product["id"], 1), (loose_id, 1)], [(loose_id, 2)]):
+        response = client.post(
+            "/api/v1/orders/",
+            headers=user_token_headers,
+            json={
+                "user_id": 2,
+                "shipping_address": "Test Address",
+                "items": [{"product_id": product_id, "quantity": quantity} for product_id, quantity in items]
+            }
+        )
+        assert response.status_code == status.HTTP_200_OK, response.text
+    # Checkouts only append deltas; the shared daily rows are written by the fold
+    assert not [s for s in statements if "daily_" in s]
+    assert db.query(SalesRollupDelta).count() == 6
+
+    assert sales_rollup_service.fold(db, batch_size=4) == 6
+    assert db.query(SalesRollupDelta).count() == 0
+    assert sorted(db.query(DailyProductSales.product_id, DailyProductSales.orders, DailyProductSales.units)) == [
+        (test_product["id"], 1, 1), (loose_id, 2, 3)
+    ]
+    assert sorted(db.query(DailyCategorySales.category_id, DailyCategorySales.orders, DailyCategorySales.revenue)) == [
+        (0, 2, 15.0), (test_product["category_id"], 1, 100.0)
+    ]
+
+    # A rebuild counts the orders whose deltas are still pending and drops those deltas
+    client.post(f"/api/v1/orders/{response.json()['id']}/cancel", headers=user_token_headers)
+    assert db.query(SalesRollupDelta).count() == 2
+    assert sales_rollup_service.rebuild(db) == 2
+    assert db.query(SalesRollupDelta).count() == 0
+    db.expire_all()
+    uncategorized = db.query(DailyCategorySales).filter(DailyCategorySales.category_id == 0).one()
+    assert (uncategorized.orders, uncategorized.cancelled_units, uncategorized.cancelled_revenue) == (2, 2, 10.0)
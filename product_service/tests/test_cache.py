@@ -0,0 +1,133 @@
+import time
+import pytest
+from fastapi import status
+from app.core.cache import LRUCache, TieredCache, CacheInvalidationBus, catalog_cache_bus
+from app.services.product import product_service, category_service
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2, ttl=60)
+    cache.set(1, "a")
+    cache.set(2, "b")
+    assert cache.get(1) == "a"
+    cache.set(3, "c")
+    assert cache.get(2) is None
+    assert cache.get(1) == "a"
+    assert cache.get(3) == "c"
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["hits"] == 3
+    assert stats["misses"] == 1
+
+def test_lru_cache_expires_entries():
+    timer = FakeTimer()
+    cache = LRUCache(maxsize=10, ttl=5, timer=timer)
+    cache.set("key", "value")
+    timer.now = 4.9
+    assert cache.get("key") == "value"
+    timer.now = 5.0
+    assert cache.get("key") is None
+    assert cache.stats()["expirations"] == 1
+
+def test_product_detail_is_served_from_cache(client, test_product, request):
+    client.get(f"/api/v1/products/{test_product['id']}")
+    statements = request.getfixturevalue("query_counter")
+    response = client.get(f"/api/v1/products/{test_product['id']}")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["category"]["name"] == "Test Category"
+    assert statements == []
+    assert product_service.cache.stats()["hits"] == 1
+    assert category_service.cache.stats()["hits"] == 1
+
+def test_product_update_invalidates_cache(client, admin_token_headers, test_product):
+    client.get(f"/api/v1/products/{test_product['id']}")
+    client.put(
+        f"/api/v1/products/{test_product['id']}",
+        headers=admin_token_headers,
+        json={"price": 55.0}
+    )
+    response = client.get(f"/api/v1/products/{test_product['id']}")
+    assert response.json()["price"] == 55.0
+
+def test_category_update_invalidates_embedded_category(client, admin_token_headers, test_product):
+    client.get(f"/api/v1/products/{test_product['id']}")
+    client.put(
+        f"/api/v1/products/categories/{test_product['category_id']}",
+        headers=admin_token_headers,
+        json={"name": "Renamed Category"}
+    )
+    response = client.get(f"/api/v1/products/{test_product['id']}")
+    assert response.json()["category"]["name"] == "Renamed Category"
+
+def test_order_invalidates_cached_stock(client, user_token_headers, test_product):
+    client.get(f"/api/v1/products/{test_product['id']}")
+    client.post(
+        "/api/v1/orders/",
+        headers=user_token_headers,
+        json={
+            "user_id": 2,
+            "shipping_address": "Test Address",
+            "items": [{"product_id": test_product["id"], "quantity": 3}]
+        }
+    )
+    response = client.get(f"/api/v1/products/{test_product['id']}")
+    assert response.json()["stock"] == test_product["stock"] - 3
+
+def test_cache_stats_requires_admin(client, user_token_headers, admin_token_headers):
+    response = client.get("/api/v1/products/cache/stats", headers=user_token_headers)
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+    response = client.get("/api/v1/products/cache/stats", headers=admin_token_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert set(response.json()) == {"products", "categories"}
+
+@pytest.fixture
+def redis_server():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    catalog_cache_bus.connect(fakeredis.FakeRedis(server=server))
+    yield server
+    catalog_cache_bus.close()
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return predicate()
+
+def test_shared_tier_serves_other_workers(client, test_product, redis_server):
+    client.get(f"/api/v1/products/{test_product['id']}")
+    product_service.cache.local.clear()
+    category_service.cache.local.clear()
+
+    response = client.get(f"/api/v1/products/{test_product['id']}")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["name"] == test_product["name"]
+    assert product_service.cache.stats()["shared_hits"] == 1
+    assert category_service.cache.stats()["shared_hits"] == 1
+
+def test_product_update_invalidates_other_workers(client, admin_token_headers, test_product, redis_server):
+    import fakeredis
+    other_bus = CacheInvalidationBus(catalog_cache_bus.channel)
+    other_cache = TieredCache("catalog:product", LRUCache(), other_bus)
+    other_bus.connect(fakeredis.FakeRedis(server=redis_server))
+    try:
+        client.get(f"/api/v1/products/{test_product['id']}")
+        assert other_cache.get(test_product["id"])["price"] == test_product["price"]
+
+        client.put(
+            f"/api/v1/products/{test_product['id']}",
+            headers=admin_token_headers,
+            json={"price": 42.0}
+        )
+        assert wait_for(lambda: other_cache.local.get(test_product["id"]) is None)
+        assert other_cache.get(test_product["id"]) is None
+    finally:
+        other_bus.close()
@@ -87,4 +87,292 @@ def test_clear_cart(client, user_token_headers, test_product, test_cart):
     )
     assert response.status_code == status.HTTP_200_OK, response.text
     data = response.json()
-    assert data["items"] == [] 
\ No newline at end of file
+    assert data["items"] == []
+
+
+def test_list_cart_query_count(client, db, user_token_headers, test_category, request):
+    from app.models.product import Product
+    category_id = test_category.id
+    for i in range(5):
+        product = Product(name=f"Product {i}", price=10.0, stock=10, category_id=category_id)
+        db.add(product)
+        db.commit()
+        client.post(
+            "/api/v1/cart/items/",
+            headers=user_token_headers,
+            json={"product_id": product.id, "quantity": 1}
+        )
+
+    statements = request.getfixturevalue("query_counter")
+    response = client.get("/api/v1/cart/", headers=user_token_headers)
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert len(response.json()["items"]) == 5
+    assert len(statements) == 2
+
+def test_add_item_single_statement(client, db, user_token_headers, test_product, request):
+    client.post(
+        "/api/v1/cart/items/",
+        headers=user_token_headers,
+        json={"product_id": test_product["id"], "quantity": 1}
+    )
+    statements = request.getfixturevalue("query_counter")
+    response = client.post(
+        "/api/v1/cart/items/",
+        headers=user_token_headers,
+        json={"product_id": test_product["id"], "quantity": 2}
+    )
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json()["quantity"] == 3
+    writes = [s for s in statements if s.lstrip().upper().startswith("INSERT")]
+    assert len(writes) == 1
+    assert "ON CONFLICT" in writes[0]
+
+def test_add_item_checks_cumulative_stock(client, user_token_headers, test_product):
+    response = client.post(
+        "/api/v1/cart/items/",
+        headers=user_token_headers,
+        json={"product_id": test_product["id"], "quantity": test_product["stock"]}
+    )
+    assert response.status_code == status.HTTP_200_OK, response.text
+    response = client.post(
+        "/api/v1/cart/items/",
+        headers=user_token_headers,
+        json={"product_id": test_product["id"], "quantity": 1}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Not enough stock"
+
+def test_add_unknown_product(client, user_token_headers, test_cart):
+    response = client.post(
+        "/api/v1/cart/items/",
+        headers=user_token_headers,
+        json={"product_id": 999, "quantity": 1}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Product not found"
+
+def test_bulk_update_cart_items(client, db, user_token_headers, test_product, test_category):
+    from app.models.product import Product
+    other = Product(name="Other", price=5.0, stock=3, category_id=test_category.id)
+    db.add(other)
+    db.commit()
+    other_id = other.id
+    client.post(
+        "/api/v1/cart/items/",
+        headers=user_token_headers,
+        json={"product_id": test_product["id"], "quantity": 1}
+    )
+
+    response = client.patch(
+        "/api/v1/cart/items",
+        headers=user_token_headers,
+        json={"operations": [
+            {"op": "add", "product_id": test_product["id"], "quantity": 2},
+            {"op": "add", "product_id": other_id, "quantity": 1},
+            {"op": "set", "product_id": other_id, "quantity": 3},
+        ]}
+    )
+    assert response.status_code == status.HTTP_200_OK, response.text
+    quantities = {item["product_id"]: item["quantity"] for item in response.json()["items"]}
+    assert quantities == {test_product["id"]: 3, other_id: 3}
+
+    response = client.patch(
+        "/api/v1/cart/items",
+        headers=user_token_headers,
+        json={"operations": [{"op": "remove", "product_id": test_product["id"]}]}
+    )
+    assert [item["product_id"] for item in response.json()["items"]] == [other_id]
+
+def test_bulk_update_cart_items_is_atomic(client, user_token_headers, test_product):
+    response = client.patch(
+        "/api/v1/cart/items",
+        headers=user_token_headers,
+        json={"operations": [
+            {"op": "add", "product_id": test_product["id"], "quantity": 1},
+            {"op": "add", "product_id": 999, "quantity": 1},
+        ]}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Product 999 not found"
+    response = client.get("/api/v1/cart/", headers=user_token_headers)
+    assert response.json()["items"] == []
+
+    response = client.patch(
+        "/api/v1/cart/items",
+        headers=user_token_headers,
+        json={"operations": [{"op": "set", "product_id": test_product["id"], "quantity": test_product["stock"] + 1}]}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+@pytest.fixture
+def hot_cart_service(monkeypatch):
+    from app.api.v1.endpoints import cart as cart_endpoints
+    from app.services import cart as cart_module, order as order_module
+    from app.services.cart import HotCartService
+    from app.services.cart_store import InMemoryCartStore
+    service = HotCartService(InMemoryCartStore())
+    for module in (cart_endpoints, cart_module, order_module):
+        monkeypatch.setattr(module, "cart_service", service)
+    return service
+
+def test_hot_cart_writes_behind(client, db, user_token_headers, test_product, hot_cart_service):
+    from app.models.cart import CartItem
+    product_id = test_product["id"]
+    for quantity in (1, 2):
+        response = client.post(
+            "/api/v1/cart/items/",
+            headers=user_token_headers,
+            json={"product_id": product_id, "quantity": quantity}
+        )
+        assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json()["quantity"] == 3
+    assert db.query(CartItem).count() == 0
+
+    response = client.get("/api/v1/cart/", headers=user_token_headers)
+    assert response.json()["items"][0]["quantity"] == 3
+
+    assert hot_cart_service.flush(db) == 1
+    items = db.query(CartItem).all()
+    assert [(item.product_id, item.quantity) for item in items] == [(product_id, 3)]
+    assert hot_cart_service.flush(db) == 0
+
+    response = client.delete(f"/api/v1/cart/items/{product_id}", headers=user_token_headers)
+    assert response.status_code == status.HTTP_200_OK, response.text
+    hot_cart_service.flush(db)
+    db.expire_all()
+    assert db.query(CartItem).count() == 0
+
+def test_hot_cart_checkout_flushes(client, db, user_token_headers, test_product, hot_cart_service):
+    response = client.post(
+        "/api/v1/cart/items/",
+        headers=user_token_headers,
+        json={"product_id": test_product["id"], "quantity": 2}
+    )
+    assert response.status_code == status.HTTP_200_OK, response.text
+
+    response = client.post(
+        "/api/v1/orders/from-cart/",
+        headers=user_token_headers,
+        params={"shipping_address": "Test Address"}
+    )
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json()["items"][0]["quantity"] == 2
+    response = client.get("/api/v1/cart/", headers=user_token_headers)
+    assert response.json()["items"] == []
+
+def test_cart_summary(client, db, user_token_headers, test_product, request):
+    response = client.get("/api/v1/cart/summary", headers=user_token_headers)
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json()["item_count"] == 0
+
+    client.post(
+        "/api/v1/cart/items/",
+        headers=user_token_headers,
+        json={"product_id": test_product["id"], "quantity": 3}
+    )
+    statements = request.getfixturevalue("query_counter")
+    response = client.get("/api/v1/cart/summary", headers=user_token_headers)
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert len(statements) == 1
+    data = response.json()
+    assert data["line_count"] == 1
+    assert data["item_count"] == 3
+    assert data["subtotal"] == 3 * test_product["price"]
+    assert data["has_out_of_stock"] is False
+    assert data["has_price_changes"] is False
+
+    client.put(
+        f"/api/v1/products/{test_product['id']}",
+        headers={"Authorization": "Bearer admin-token"},
+        json={"price": 120.0, "stock": 2}
+    )
+    data = client.get("/api/v1/cart/summary", headers=user_token_headers).json()
+    assert data["subtotal"] == 3 * test_product["price"]
+    assert data["has_out_of_stock"] is True
+    assert data["has_price_changes"] is True
+
+def test_read_cart_is_virtual_until_first_add(client, db, user_token_headers, test_product, request):
+    from app.models.cart import Cart
+    from app.services.cart import cart_service
+    product_id = test_product["id"]
+    statements = request.getfixturevalue("query_counter")
+    response = client.get("/api/v1/cart/", headers=user_token_headers)
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json()["id"] is None
+    assert response.json()["items"] == []
+    assert not any(statement.lstrip().upper().startswith("INSERT") for statement in statements)
+    assert db.query(Cart).count() == 0
+
+    client.post(
+        "/api/v1/cart/items/",
+        headers=user_token_headers,
+        json={"product_id": product_id, "quantity": 1}
+    )
+    cart_id = client.get("/api/v1/cart/", headers=user_token_headers).json()["id"]
+    assert cart_id is not None
+    assert cart_service.get_or_create(db, user_id=2).id == cart_id
+    assert db.query(Cart).filter(Cart.user_id == 2).count() == 1
+
+def test_reap_idle_carts(db, test_product):
+    from datetime import datetime, timedelta, timezone
+    from app.models.cart import Cart, CartItem
+    from app.services.cart import cart_service
+    old = datetime.now(timezone.utc) - timedelta(days=40)
+    abandoned = [Cart(user_id=user_id, updated_at=old) for user_id in (10, 11, 12)]
+    revived = Cart(user_id=13, updated_at=old)
+    fresh = Cart(user_id=14)
+    db.add_all(abandoned + [revived, fresh])
+    db.flush()
+    db.add_all([
+        CartItem(cart_id=abandoned[0].id, product_id=test_product["id"], quantity=1, price=100.0, created_at=old),
+        CartItem(cart_id=revived.id, product_id=test_product["id"], quantity=1, price=100.0),
+    ])
+    db.commit()
+
+    result = cart_service.reap_idle(db, idle_for=timedelta(days=30), batch_size=2)
+    assert result.carts_deleted == 3
+    assert result.items_deleted == 1
+    assert result.carts_refreshed == 1
+    assert sorted(user_id for user_id, in db.query(Cart.user_id)) == [13, 14]
+
+    result = cart_service.reap_idle(db, idle_for=timedelta(days=30))
+    assert result.batches == 0
+
+def test_reap_idle_keeps_lines_written_during_the_batch(db, test_product):
+    from datetime import datetime, timedelta, timezone
+    from sqlalchemy import event
+    from app.models.cart import Cart, CartItem
+    from app.services.cart import cart_service
+    old = datetime.now(timezone.utc) - timedelta(days=40)
+    cart = Cart(user_id=10, updated_at=old)
+    db.add(cart)
+    db.flush()
+    item = CartItem(cart_id=cart.id, product_id=test_product["id"], quantity=1, price=100.0, created_at=old)
+    db.add(item)
+    db.commit()
+    item_id = item.id
+
+    def touch_line(conn, cursor, statement, parameters, context, executemany):
+        # The customer changes the line right after the activity check
+        if "HAVING" in statement:
+            now = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")
+            cursor.connection.execute("UPDATE cart_items SET quantity = 2, updated_at = ? WHERE id = ?", (now, item_id))
+
+    engine = db.get_bind()
+    event.listen(engine, "after_cursor_execute", touch_line)
+    try:
+        result = cart_service.reap_idle(db, idle_for=timedelta(days=30))
+    finally:
+        event.remove(engine, "after_cursor_execute", touch_line)
+    assert (result.carts_deleted, result.items_deleted) == (0, 0)
+    db.expire_all()
+    assert db.query(CartItem.quantity).filter(CartItem.id == item_id).scalar() == 2
+    assert db.query(Cart).count() == 1
+
+def test_redis_cart_storage_requires_redis_url(monkeypatch):
+    from app.core.config import settings
+    from app.services.cart import _build_cart_service
+    monkeypatch.setattr(settings, "CART_STORAGE", "redis")
+    monkeypatch.setattr(settings, "REDIS_URL", None)
+    with pytest.raises(ValueError, match="REDIS_URL"):
+        _build_cart_service()
@@ -156,4 +156,511 @@ def test_cancel_order(client, user_token_headers, test_product):
     product = client.get(
         f"/api/v1/products/{test_product['id']}"
     ).json()
-    assert product["stock"] == test_product["stock"]  # Stock should be back to original 
\ No newline at end of file
+    assert product["stock"] == test_product["stock"]  # Stock should be back to original
+
+
+def test_get_orders_query_count(client, user_token_headers, test_product, request):
+    for _ in range(3):
+        response = client.post(
+            "/api/v1/orders/",
+            headers=user_token_headers,
+            json={
+                "user_id": 2,
+                "shipping_address": "Test Address",
+                "items": [{"product_id": test_product["id"], "quantity": 1}]
+            }
+        )
+        assert response.status_code == status.HTTP_200_OK, response.text
+
+    statements = request.getfixturevalue("query_counter")
+    response = client.get("/api/v1/orders/", headers=user_token_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()) == 3
+    assert all(len(order["items"]) == 1 for order in response.json())
+    assert len(statements) == 2
+
+@pytest.fixture
+def order_products(db, test_category):
+    from app.models.product import Product
+    products = [Product(name=f"Line {i}", price=10.0 + i, stock=5, category_id=test_category.id) for i in range(3)]
+    db.add_all(products)
+    db.commit()
+    return [product.id for product in products]
+
+def test_create_order_statements_do_not_grow_with_lines(client, user_token_headers, order_products, request):
+    statements = request.getfixturevalue("query_counter")
+    counts = []
+    for product_ids in (order_products[:1], order_products):
+        statements.clear()
+        response = client.post(
+            "/api/v1/orders/",
+            headers=user_token_headers,
+            json={
+                "user_id": 2,
+                "shipping_address": "Test Address",
+                "items": [{"product_id": product_id, "quantity": 2} for product_id in product_ids]
+            }
+        )
+        assert response.status_code == status.HTTP_200_OK, response.text
+        assert len(response.json()["items"]) == len(product_ids)
+        assert sum(statement.lstrip().upper().startswith("UPDATE") for statement in statements) == 1
+        counts.append(list(statements))
+    assert len(counts[0]) == len(counts[1]), counts
+
+def test_create_order_is_atomic(client, db, user_token_headers, order_products):
+    from app.models.product import Product
+    response = client.post(
+        "/api/v1/orders/",
+        headers=user_token_headers,
+        json={
+            "user_id": 2,
+            "shipping_address": "Test Address",
+            "items": [
+                {"product_id": order_products[0], "quantity": 1},
+                {"product_id": order_products[1], "quantity": 6},
+            ]
+        }
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST, response.text
+    assert response.json()["detail"] == "Not enough stock for product Line 1"
+    assert db.query(Order).count() == 0
+    assert db.query(Product.stock).filter(Product.id == order_products[0]).scalar() == 5
+
+def test_create_order_idempotency_key_replays(client, db, user_token_headers, order_products):
+    from app.models.product import Product
+    headers = dict(user_token_headers, **{"Idempotency-Key": "order-1"})
+    payload = {
+        "user_id": 2,
+        "shipping_address": "Test Address",
+        "items": [{"product_id": order_products[0], "quantity": 2}]
+    }
+    first = client.post("/api/v1/orders/", headers=headers, json=payload)
+    assert first.status_code == status.HTTP_200_OK, first.text
+    second = client.post("/api/v1/orders/", headers=headers, json=payload)
+    assert second.status_code == status.HTTP_200_OK, second.text
+    assert second.headers["Idempotent-Replayed"] == "true"
+    assert second.json() == first.json()
+    assert db.query(Order).count() == 1
+    assert db.query(Product.stock).filter(Product.id == order_products[0]).scalar() == 3
+
+    payload["items"][0]["quantity"] = 1
+    response = client.post("/api/v1/orders/", headers=headers, json=payload)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_failed_order_releases_idempotency_key(client, db, user_token_headers, order_products):
+    from app.models.idempotency import IdempotencyKey
+    response = client.post(
+        "/api/v1/orders/",
+        headers=dict(user_token_headers, **{"Idempotency-Key": "order-2"}),
+        json={
+            "user_id": 2,
+            "shipping_address": "Test Address",
+            "items": [{"product_id": order_products[0], "quantity": 6}]
+        }
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert db.query(IdempotencyKey).count() == 0
+
+def test_duplicate_order_waits_for_first(client, db, user_token_headers, monkeypatch):
+    from app.models.idempotency import IdempotencyKey
+    from app.services import idempotency
+    endpoint = "orders.create_from_cart"
+    record = IdempotencyKey(
+        user_id=2,
+        key="order-3",
+        endpoint=endpoint,
+        request_fingerprint=idempotency.idempotency_service.fingerprint(endpoint, {"shipping_address": "Test Address"}),
+    )
+    db.add(record)
+    db.commit()
+    record_id = record.id
+
+    def first_request_finishes(seconds):
+        db.query(IdempotencyKey).filter(IdempotencyKey.id == record_id).update(
+            {"status": "completed", "response_code": 200, "response_body": '{"id": 42}'}
+        )
+        db.commit()
+
+    monkeypatch.setattr(idempotency.time, "sleep", first_request_finishes)
+    headers = dict(user_token_headers, **{"Idempotency-Key": "order-3"})
+    response = client.post("/api/v1/orders/from-cart/", headers=headers, params={"shipping_address": "Test Address"})
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json() == {"id": 42}
+
+    db.query(IdempotencyKey).filter(IdempotencyKey.id == record_id).update({"status": "in_progress"})
+    db.commit()
+    monkeypatch.setattr(idempotency.settings, "IDEMPOTENCY_WAIT_TIMEOUT", 0)
+    response = client.post("/api/v1/orders/from-cart/", headers=headers, params={"shipping_address": "Test Address"})
+    assert response.status_code == status.HTTP_409_CONFLICT
+
+def test_abandoned_idempotency_key_is_taken_over(client, db, user_token_headers, order_products):
+    from datetime import datetime, timedelta, timezone
+    from app.models.idempotency import IdempotencyKey
+    from app.services.idempotency import idempotency_service
+    endpoint = "orders.create"
+    payload = {"user_id": 2, "shipping_address": "Test Address", "items": [{"product_id": order_products[0], "quantity": 1}]}
+    # Claimed by a process that crashed before finishing or releasing the key
+    db.add(IdempotencyKey(
+        user_id=2,
+        key="order-4",
+        endpoint=endpoint,
+        request_fingerprint=idempotency_service.fingerprint(endpoint, payload),
+        created_at=datetime.now(timezone.utc) - timedelta(minutes=5),
+    ))
+    db.commit()
+    headers = dict(user_token_headers, **{"Idempotency-Key": "order-4"})
+    response = client.post("/api/v1/orders/", headers=headers, json=payload)
+    assert response.status_code == status.HTTP_200_OK, response.text
+    replay = client.post("/api/v1/orders/", headers=headers, json=payload)
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert replay.json()["id"] == response.json()["id"]
+
+    assert idempotency_service.purge_expired(db, ttl=timedelta(hours=1)) == 0
+    assert idempotency_service.purge_expired(db, ttl=timedelta(0), batch_size=1) == 1
+    assert db.query(IdempotencyKey).count() == 0
+
+@pytest.fixture
+def async_intake(monkeypatch):
+    from app.core.config import settings
+    monkeypatch.setattr(settings, "ORDER_INTAKE_MODE", "async")
+
+def test_async_order_intake(client, db, user_token_headers, order_products, async_intake):
+    from app.models.product import Product
+    from app.services.order_intake import order_intake_service
+    payloads = [
+        [{"product_id": order_products[0], "quantity": 2}],
+        [{"product_id": order_products[1], "quantity": 6}],
+    ]
+    status_urls = []
+    for items in payloads:
+        response = client.post(
+            "/api/v1/orders/",
+            headers=user_token_headers,
+            json={"user_id": 2, "shipping_address": "Test Address", "items": items}
+        )
+        assert response.status_code == status.HTTP_202_ACCEPTED, response.text
+        assert response.json()["status"] == "queued"
+        assert response.headers["Location"] == response.json()["status_url"]
+        status_urls.append(response.json()["status_url"])
+    assert db.query(Order).count() == 0
+
+    assert order_intake_service.drain(db, batch_size=10) == 2
+    placed = client.get(status_urls[0], headers=user_token_headers).json()
+    assert placed["status"] == "completed"
+    order = client.get(f"/api/v1/orders/{placed['order_id']}", headers=user_token_headers).json()
+    assert order["items"][0]["quantity"] == 2
+    failed = client.get(status_urls[1], headers=user_token_headers).json()
+    assert failed["status"] == "failed"
+    assert failed["error"] == "Not enough stock for product Line 1"
+    db.expire_all()
+    assert db.query(Product.stock).filter(Product.id == order_products[1]).scalar() == 5
+
+def test_async_intent_stolen_by_another_worker(client, db, user_token_headers, order_products, async_intake, monkeypatch):
+    from app.models.order import OrderIntent, OrderIntentStatus
+    from app.models.product import Product
+    from app.services.order_intake import order_intake_service
+    response = client.post(
+        "/api/v1/orders/",
+        headers=user_token_headers,
+        json={"user_id": 2, "shipping_address": "Test Address", "items": [{"product_id": order_products[0], "quantity": 2}]}
+    )
+    intent_id = response.json()["intent_id"]
+    claim_batch = order_intake_service.claim_batch
+
+    def slow_claim(db, **kwargs):
+        intents = claim_batch(db, **kwargs)
+        # The claim times out and another worker takes the intent before we finish
+        db.query(OrderIntent).update({OrderIntent.worker: "other-worker"}, synchronize_session=False)
+        db.commit()
+        return intents
+
+    monkeypatch.setattr(order_intake_service, "claim_batch", slow_claim)
+    assert order_intake_service.process_batch(db, batch_size=10) == 1
+    db.expire_all()
+    intent = db.get(OrderIntent, intent_id)
+    assert (intent.status, intent.worker, intent.order_id) == (OrderIntentStatus.PROCESSING, "other-worker", None)
+    assert db.query(Order).count() == 0
+    assert db.query(Product.stock).filter(Product.id == order_products[0]).scalar() == 5
+
+def test_async_intent_fails_after_max_attempts(client, db, user_token_headers, order_products, async_intake, monkeypatch):
+    from app.core.config import settings
+    from app.models.order import OrderIntent, OrderIntentStatus
+    from app.services.order import order_service
+    from app.services.order_intake import order_intake_service
+    for product_id in order_products:
+        client.post(
+            "/api/v1/orders/",
+            headers=user_token_headers,
+            json={"user_id": 2, "shipping_address": "Test Address", "items": [{"product_id": product_id, "quantity": 1}]}
+        )
+    write_order = order_service.write_order
+
+    def flaky_write_order(db, *, lines, **kwargs):
+        if lines[0][0] == order_products[1]:
+            raise RuntimeError("deadlock detected")
+        return write_order(db, lines=lines, **kwargs)
+
+    monkeypatch.setattr(order_service, "write_order", flaky_write_order)
+    assert order_intake_service.process_batch(db, batch_size=10) == 3
+    db.expire_all()
+    intents = db.query(OrderIntent).order_by(OrderIntent.id).all()
+    assert [intent.status for intent in intents] == [
+        OrderIntentStatus.COMPLETED, OrderIntentStatus.QUEUED, OrderIntentStatus.COMPLETED
+    ]
+    assert db.query(Order).count() == 2
+
+    assert order_intake_service.drain(db, batch_size=10) == settings.ORDER_INTENT_MAX_ATTEMPTS - 1
+    db.refresh(intents[1])
+    assert (intents[1].status, intents[1].attempts) == (OrderIntentStatus.FAILED, settings.ORDER_INTENT_MAX_ATTEMPTS)
+    assert intents[1].order_id is None
+
+def test_async_order_intake_rejects_invalid_requests(client, user_token_headers, async_intake):
+    response = client.post(
+        "/api/v1/orders/",
+        headers=user_token_headers,
+        json={"user_id": 2, "shipping_address": "Test Address", "items": [{"product_id": 999, "quantity": 1}]}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    response = client.post("/api/v1/orders/from-cart/", headers=user_token_headers, params={"shipping_address": "Test Address"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Cart is empty"
+
+def test_cart_of_async_checkout_can_be_reaped(client, db, user_token_headers, order_products, async_intake):
+    from datetime import datetime, timedelta, timezone
+    from sqlalchemy import text
+    from app.models.cart import Cart, CartItem
+    from app.models.order import OrderIntent, OrderIntentStatus
+    from app.services.cart import cart_service
+    from app.services.order_intake import order_intake_service
+    db.execute(text("PRAGMA foreign_keys=ON"))
+    try:
+        client.post("/api/v1/cart/items/", headers=user_token_headers, json={"product_id": order_products[0], "quantity": 1})
+        response = client.post("/api/v1/orders/from-cart/", headers=user_token_headers, params={"shipping_address": "Test Address"})
+        assert response.status_code == status.HTTP_202_ACCEPTED, response.text
+        assert order_intake_service.drain(db, batch_size=10) == 1
+        assert db.query(OrderIntent.status).scalar() == OrderIntentStatus.COMPLETED
+
+        # The emptied cart goes idle and is reaped while the intent still points at it
+        old = datetime.now(timezone.utc) - timedelta(days=40)
+        db.query(Cart).update({Cart.updated_at: old}, synchronize_session=False)
+        db.commit()
+        result = cart_service.reap_idle(db, idle_for=timedelta(days=30))
+        assert result.carts_deleted == 1
+        assert db.query(Cart).count() == db.query(CartItem).count() == 0
+    finally:
+        db.rollback()
+        db.execute(text("PRAGMA foreign_keys=OFF"))
+
+def test_order_history_read_model(client, db, user_token_headers, admin_token_headers, order_products, request):
+    order_ids = []
+    for product_ids in (order_products[:1], order_products, order_products[1:]):
+        response = client.post(
+            "/api/v1/orders/",
+            headers=user_token_headers,
+            json={
+                "user_id": 2,
+                "shipping_address": "Test Address",
+                "items": [{"product_id": product_id, "quantity": 1} for product_id in product_ids]
+            }
+        )
+        order_ids.append(response.json()["id"])
+    client.post(f"/api/v1/orders/{order_ids[0]}/cancel", headers=user_token_headers)
+
+    statements = request.getfixturevalue("query_counter")
+    response = client.get("/api/v1/orders/history", headers=user_token_headers, params={"limit": 2})
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert len(statements) == 1
+    page = response.json()
+    assert [row["order_id"] for row in page] == [order_ids[2], order_ids[1]]
+    assert page[1]["item_count"] == 3
+    assert page[1]["product_names"] == ["Line 0", "Line 1", "Line 2"]
+
+    response = client.get(
+        "/api/v1/orders/history",
+        headers=user_token_headers,
+        params={"limit": 2, "cursor": response.headers["X-Next-Cursor"]}
+    )
+    page = response.json()
+    assert [(row["order_id"], row["status"]) for row in page] == [(order_ids[0], "cancelled")]
+    assert "X-Next-Cursor" not in response.headers
+
+def test_backfill_order_summaries(client, db, user_token_headers, order_products):
+    from app.models.order import OrderSummary
+    from app.services.order import order_service
+    client.post(
+        "/api/v1/orders/",
+        headers=user_token_headers,
+        json={"user_id": 2, "shipping_address": "Test Address", "items": [{"product_id": order_products[0], "quantity": 2}]}
+    )
+    db.query(OrderSummary).delete()
+    db.commit()
+    assert order_service.backfill_summaries(db) == 1
+    summary = db.query(OrderSummary).one()
+    assert (summary.item_count, summary.product_names) == (2, '["Line 0"]')
+    assert order_service.backfill_summaries(db) == 0
+
+def test_bulk_order_status_reports_outcomes(client, db, user_token_headers, admin_token_headers, order_products):
+    order_ids = []
+    for _ in range(3):
+        response = client.post(
+            "/api/v1/orders/",
+            headers=user_token_headers,
+            json={"user_id": 2, "shipping_address": "Test Address", "items": [{"product_id": order_products[0], "quantity": 1}]}
+        )
+        order_ids.append(response.json()["id"])
+    client.post(f"/api/v1/orders/{order_ids[2]}/cancel", headers=user_token_headers)
+
+    response = client.post(
+        "/api/v1/orders/bulk/status",
+        headers=admin_token_headers,
+        json={"order_ids": order_ids + [999], "status": "processing"}
+    )
+    assert response.status_code == status.HTTP_200_OK, response.text
+    result = response.json()
+    assert (result["succeeded"], result["failed"]) == (2, 2)
+    outcomes = {outcome["order_id"]: outcome for outcome in result["outcomes"]}
+    assert outcomes[order_ids[0]]["ok"] and outcomes[order_ids[1]]["status"] == "processing"
+    assert outcomes[order_ids[2]]["error"] == "Cannot change status from cancelled to processing"
+    assert outcomes[999]["error"] == "Order not found"
+
+    response = client.post(
+        "/api/v1/orders/bulk/status",
+        headers=admin_token_headers,
+        json={"filter": {"status": "processing"}, "status": "delivered"}
+    )
+    assert response.json()["succeeded"] == 0
+
+    response = client.post(
+        "/api/v1/orders/bulk/status",
+        headers=admin_token_headers,
+        json={"order_ids": order_ids, "status": "cancelled"}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    response = client.post(
+        "/api/v1/orders/bulk/status",
+        headers=user_token_headers,
+        json={"order_ids": order_ids, "status": "processing"}
+    )
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+def test_update_order_status_follows_transitions(client, db, user_token_headers, admin_token_headers, order_products):
+    from app.models.product import Product
+    response = client.post(
+        "/api/v1/orders/",
+        headers=user_token_headers,
+        json={"user_id": 2, "shipping_address": "Test Address", "items": [{"product_id": order_products[0], "quantity": 2}]}
+    )
+    order_id = response.json()["id"]
+    response = client.put(f"/api/v1/orders/{order_id}", headers=admin_token_headers, json={"status": "shipped"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Cannot change status from pending to shipped"
+
+    response = client.put(f"/api/v1/orders/{order_id}", headers=admin_token_headers, json={"status": "cancelled"})
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json()["status"] == "cancelled"
+    db.expire_all()
+    assert db.query(Product.stock).filter(Product.id == order_products[0]).scalar() == 5
+    response = client.put(f"/api/v1/orders/{order_id}", headers=admin_token_headers, json={"status": "pending"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_bulk_cancel_restores_stock_per_product(client, db, user_token_headers, admin_token_headers, order_products, request):
+    from app.models.product import Product
+    order_ids = []
+    for quantity in (1, 2):
+        response = client.post(
+            "/api/v1/orders/",
+            headers=user_token_headers,
+            json={
+                "user_id": 2,
+                "shipping_address": "Test Address",
+                "items": [{"product_id": product_id, "quantity": quantity} for product_id in order_products[:2]]
+            }
+        )
+        order_ids.append(response.json()["id"])
+    for next_status in ("processing", "shipped"):
+        client.put(f"/api/v1/orders/{order_ids[1]}", headers=admin_token_headers, json={"status": next_status})
+
+    statements = request.getfixturevalue("query_counter")
+    response = client.post(
+        "/api/v1/orders/bulk/cancel",
+        headers=admin_token_headers,
+        json={"filter": {"user_id": 2}}
+    )
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert len([s for s in statements if s.lstrip().upper().startswith("UPDATE PRODUCTS")]) == 1
+    result = response.json()
+    assert (result["succeeded"], result["failed"]) == (1, 1)
+    assert result["outcomes"][1]["error"] == "Cannot change status from shipped to cancelled"
+
+    db.expire_all()
+    stock = dict(db.query(Product.id, Product.stock).filter(Product.id.in_(order_products)))
+    assert [stock[product_id] for product_id in order_products] == [3, 3, 5]
+    assert db.get(Order, order_ids[0]).status == OrderStatus.CANCELLED
+
+def test_archive_terminal_orders(client, db, user_token_headers, admin_token_headers, order_products, request):
+    from datetime import timedelta
+    from app.models.order import ArchivedOrder, ArchivedOrderItem
+    from app.services.analytics import sales_rollup_service
+    from app.services.order import order_service
+    order_ids = []
+    for product_id in order_products:
+        response = client.post(
+            "/api/v1/orders/",
+            headers=user_token_headers,
+            json={"user_id": 2, "shipping_address": "Test Address", "items": [{"product_id": product_id, "quantity": 2}]}
+        )
+        order_ids.append(response.json()["id"])
+    client.post(f"/api/v1/orders/{order_ids[0]}/cancel", headers=user_token_headers)
+    for next_status in ("processing", "shipped", "delivered"):
+        client.put(f"/api/v1/orders/{order_ids[1]}", headers=admin_token_headers, json={"status": next_status})
+
+    assert order_service.archive(db, older_than=timedelta(days=1)).orders_archived == 0
+    result = order_service.archive(db, older_than=timedelta(0), batch_size=1)
+    assert (result.batches, result.orders_archived, result.items_archived) == (2, 2, 2)
+    assert [id for id, in db.query(Order.id)] == [order_ids[2]]
+    assert db.query(OrderItem).count() == 1
+    assert sorted(id for id, in db.query(ArchivedOrder.id)) == order_ids[:2]
+    assert db.query(ArchivedOrderItem).count() == 2
+
+    statements = request.getfixturevalue("query_counter")
+    response = client.get("/api/v1/orders/", headers=user_token_headers)
+    assert len(statements) == 2
+    assert [(order["id"], order["status"]) for order in response.json()] == [
+        (order_ids[0], "cancelled"), (order_ids[1], "delivered"), (order_ids[2], "pending"),
+    ]
+    assert [order["items"][0]["product_id"] for order in response.json()] == order_products
+
+    response = client.get(f"/api/v1/orders/{order_ids[1]}", headers=user_token_headers)
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert (response.json()["status"], len(response.json()["items"])) == ("delivered", 1)
+    response = client.put(f"/api/v1/orders/{order_ids[1]}", headers=admin_token_headers, json={"status": "pending"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    response = client.post(f"/api/v1/orders/{order_ids[0]}/cancel", headers=user_token_headers)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    response = client.get("/api/v1/orders/history", headers=user_token_headers)
+    assert len(response.json()) == 3
+    assert sales_rollup_service.rebuild(db) == 3
+
+def test_archiving_newest_order_does_not_reuse_its_id(client, db, user_token_headers, order_products):
+    from datetime import timedelta
+    from app.services.order import order_service
+    order_ids = []
+    for product_id in order_products[:2]:
+        response = client.post(
+            "/api/v1/orders/",
+            headers=user_token_headers,
+            json={"user_id": 2, "shipping_address": "Test Address", "items": [{"product_id": product_id, "quantity": 1}]}
+        )
+        order_ids.append(response.json()["id"])
+    client.post(f"/api/v1/orders/{order_ids[1]}/cancel", headers=user_token_headers)
+    assert order_service.archive(db, older_than=timedelta(0)).orders_archived == 1
+
+    response = client.post(
+        "/api/v1/orders/",
+        headers=user_token_headers,
+        json={"user_id": 2, "shipping_address": "Test Address", "items": [{"product_id": order_products[2], "quantity": 1}]}
+    )
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json()["id"] > order_ids[1]
+    response = client.get("/api/v1/orders/", headers=user_token_headers)
+    assert [order["id"] for order in response.json()] == order_ids + [order_ids[1] + 1]
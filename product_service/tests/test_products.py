@@ -1,3 +1,4 @@
+import json
 import pytest
 from fastapi import status
 from app.models.product import Product, Category
@@ -112,3 +113,316 @@ def test_delete_product(client, admin_token_headers, test_product):
     # Verify product is deleted
     response = client.get(f"/api/v1/products/{test_product['id']}")
     assert response.status_code == status.HTTP_404_NOT_FOUND 
+
+def test_get_products_cursor_pagination(client, db, test_category):
+    for i in range(5):
+        db.add(Product(name=f"Product {i}", price=10.0, stock=1, category_id=test_category.id))
+    db.commit()
+
+    seen = []
+    cursor = None
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/v1/products/", params=params)
+        assert response.status_code == status.HTTP_200_OK
+        seen.extend(p["name"] for p in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    assert seen == [f"Product {i}" for i in range(5)]
+
+def test_get_products_invalid_cursor(client):
+    response = client.get("/api/v1/products/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_get_products_query_count(client, db, test_category, request):
+    other = Category(name="Other Category")
+    db.add(other)
+    db.commit()
+    for i in range(10):
+        category_id = test_category.id if i % 2 else other.id
+        db.add(Product(name=f"Product {i}", price=10.0, stock=1, category_id=category_id))
+    db.commit()
+
+    statements = request.getfixturevalue("query_counter")
+    response = client.get("/api/v1/products/")
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()) == 10
+    assert len(statements) == 1
+
+def test_search_products_ranks_matches(client, db, test_category):
+    db.add_all([
+        Product(name="Trail Running Shoe", description="Lightweight shoe for trail running",
+                price=80.0, stock=5, category_id=test_category.id),
+        Product(name="Rain Jacket", description="Packable jacket, great for running in the rain",
+                price=120.0, stock=5, category_id=test_category.id),
+        Product(name="Coffee Mug", description="Ceramic mug",
+                price=8.0, stock=5, category_id=test_category.id),
+    ])
+    db.commit()
+
+    response = client.get("/api/v1/products/search", params={"q": "running shoe"})
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert [p["name"] for p in data] == ["Trail Running Shoe"]
+
+    response = client.get("/api/v1/products/search", params={"q": "run"})
+    data = response.json()
+    assert [p["name"] for p in data] == ["Trail Running Shoe", "Rain Jacket"]
+    assert data[0]["score"] >= data[1]["score"]
+
+def test_search_index_follows_product_writes(client, admin_token_headers, test_product):
+    response = client.get("/api/v1/products/search", params={"q": "Test"})
+    assert [p["id"] for p in response.json()] == [test_product["id"]]
+
+    client.put(
+        f"/api/v1/products/{test_product['id']}",
+        headers=admin_token_headers,
+        json={"name": "Renamed Gadget"}
+    )
+    assert client.get("/api/v1/products/search", params={"q": "gadget"}).json()[0]["id"] == test_product["id"]
+
+    client.delete(f"/api/v1/products/{test_product['id']}", headers=admin_token_headers)
+    assert client.get("/api/v1/products/search", params={"q": "gadget"}).json() == []
+
+@pytest.fixture
+def catalog(db, test_category):
+    other = Category(name="Another Category")
+    db.add(other)
+    db.commit()
+    rows = [
+        ("Cheap", 10.0, 5, test_category.id, True),
+        ("Mid", 60.0, 0, test_category.id, True),
+        ("Pricey", 300.0, 2, other.id, True),
+        ("Hidden", 40.0, 3, other.id, False),
+        ("Luxury", 1500.0, 1, other.id, True),
+    ]
+    for name, price, stock, category_id, is_active in rows:
+        db.add(Product(name=name, price=price, stock=stock, category_id=category_id, is_active=is_active))
+    db.commit()
+    return {"category_id": test_category.id, "other_id": other.id}
+
+def test_get_products_filters(client, catalog):
+    response = client.get("/api/v1/products/", params={
+        "category_id": catalog["other_id"], "is_active": True, "min_price": 100, "max_price": 1000,
+    })
+    assert [p["name"] for p in response.json()] == ["Pricey"]
+
+    response = client.get("/api/v1/products/", params={"in_stock": False})
+    assert [p["name"] for p in response.json()] == ["Mid"]
+
+def test_get_products_sorted_pages(client, catalog):
+    names = []
+    params = {"sort": "-price", "limit": 2}
+    while True:
+        response = client.get("/api/v1/products/", params=params)
+        assert response.status_code == status.HTTP_200_OK, response.text
+        names.extend(p["name"] for p in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        params["cursor"] = cursor
+    assert names == ["Luxury", "Pricey", "Mid", "Hidden", "Cheap"]
+
+    response = client.get("/api/v1/products/", params={"sort": "price", "cursor": params["cursor"]})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_get_products_invalid_sort(client):
+    response = client.get("/api/v1/products/", params={"sort": "stock"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+def test_get_products_facets(client, catalog, request):
+    statements = request.getfixturevalue("query_counter")
+    response = client.get("/api/v1/products/", params={
+        "facets": True, "is_active": True, "category_id": catalog["other_id"],
+    })
+    assert response.status_code == status.HTTP_200_OK, response.text
+    data = response.json()
+    assert [p["name"] for p in data["items"]] == ["Pricey", "Luxury"]
+    # Category counts ignore the category filter itself
+    counts = {facet["name"]: facet["count"] for facet in data["facets"]["categories"]}
+    assert counts == {"Test Category": 2, "Another Category": 2}
+    buckets = {facet["min_price"]: facet["count"] for facet in data["facets"]["price_ranges"]}
+    assert buckets[250] == 1
+    assert buckets[1000] == 1
+    assert sum(buckets.values()) == 2
+    assert len(statements) == 3
+
+def test_get_product_conditional(client, admin_token_headers, test_product):
+    url = f"/api/v1/products/{test_product['id']}"
+    response = client.get(url)
+    etag = response.headers["ETag"]
+    assert response.headers["Last-Modified"]
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+
+    client.put(url, headers=admin_token_headers, json={"stock": 3})
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["ETag"] != etag
+    assert response.json()["stock"] == 3
+
+def test_get_product_etag_follows_category(client, admin_token_headers, test_product):
+    url = f"/api/v1/products/{test_product['id']}"
+    etag = client.get(url).headers["ETag"]
+    client.put(
+        f"/api/v1/products/categories/{test_product['category_id']}",
+        headers=admin_token_headers,
+        json={"description": "Changed"}
+    )
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["category"]["description"] == "Changed"
+
+def test_get_product_if_modified_since(client, test_product):
+    url = f"/api/v1/products/{test_product['id']}"
+    response = client.get(url, headers={"If-Modified-Since": "Fri, 01 Jan 2100 00:00:00 GMT"})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    response = client.get(url, headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"})
+    assert response.status_code == status.HTTP_200_OK
+
+def test_get_categories_conditional(client, admin_token_headers, test_category):
+    etag = client.get("/api/v1/products/categories/").headers["ETag"]
+    response = client.get("/api/v1/products/categories/", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+    client.post(
+        "/api/v1/products/categories/",
+        headers=admin_token_headers,
+        json={"name": "Second Category"}
+    )
+    response = client.get("/api/v1/products/categories/", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.json()) == 2
+
+def test_import_products_csv(client, db, admin_token_headers, test_product):
+    csv_body = (
+        "id,name,description,price,stock,category_id,category,is_active\n"
+        ",Imported One,First,10.5,3,,Test Category,\n"
+        f",Imported Two,,20,0,{test_product['category_id']},,false\n"
+        ",Bad Price,,-1,1,,Test Category,\n"
+        ",No Category,,5,1,,Missing,\n"
+        f"{test_product['id']},Replaced,,99,7,{test_product['category_id']},,\n"
+    )
+    response = client.post(
+        "/api/v1/products/import",
+        headers=admin_token_headers,
+        files={"file": ("catalog.csv", csv_body, "text/csv")},
+    )
+    assert response.status_code == status.HTTP_200_OK, response.text
+    data = response.json()
+    assert data["created"] == 2
+    assert data["upserted"] == 1
+    assert data["failed"] == 2
+    assert [error["line"] for error in data["errors"]] == [4, 5]
+
+    names = {p["name"]: p for p in client.get("/api/v1/products/").json()}
+    assert set(names) == {"Imported One", "Imported Two", "Replaced"}
+    assert names["Imported Two"]["is_active"] is False
+    assert names["Replaced"]["stock"] == 7
+
+def test_import_products_ndjson(client, admin_token_headers, test_category):
+    lines = [
+        '{"name": "Lamp", "price": 30, "stock": 4, "category": "Test Category"}',
+        "not json",
+        '{"name": "Desk", "price": 150, "stock": 1, "category_id": %d}' % test_category.id,
+    ]
+    response = client.post(
+        "/api/v1/products/import",
+        headers=admin_token_headers,
+        files={"file": ("catalog.ndjson", "\n".join(lines), "application/x-ndjson")},
+    )
+    assert response.status_code == status.HTTP_200_OK, response.text
+    data = response.json()
+    assert data["created"] == 2
+    assert data["errors"] == [{"line": 2, "error": "Row is not a JSON object"}]
+    assert client.get("/api/v1/products/search", params={"q": "lamp"}).json()[0]["name"] == "Lamp"
+
+def test_import_products_requires_admin(client, user_token_headers):
+    response = client.post(
+        "/api/v1/products/import",
+        headers=user_token_headers,
+        files={"file": ("catalog.csv", "name\n", "text/csv")},
+    )
+    assert response.status_code == status.HTTP_403_FORBIDDEN
+
+def test_export_products_ndjson(client, db, admin_token_headers, test_product):
+    response = client.get("/api/v1/products/export", headers=admin_token_headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert rows == [{
+        "id": test_product["id"],
+        "name": test_product["name"],
+        "description": test_product["description"],
+        "price": test_product["price"],
+        "stock": test_product["stock"],
+        "category_id": test_product["category_id"],
+        "category": "Test Category",
+        "is_active": True,
+        "created_at": rows[0]["created_at"],
+        "updated_at": None,
+    }]
+
+def test_export_products_csv_round_trips(client, admin_token_headers, test_product):
+    response = client.get("/api/v1/products/export", headers=admin_token_headers, params={"format": "csv"})
+    assert response.status_code == status.HTTP_200_OK
+    lines = response.text.splitlines()
+    assert lines[0].startswith("id,name,description,price,stock,category_id,category")
+    assert len(lines) == 2
+
+    response = client.post(
+        "/api/v1/products/import",
+        headers=admin_token_headers,
+        files={"file": ("products.csv", response.text, "text/csv")},
+    )
+    assert response.json()["upserted"] == 1
+
+def test_export_products_since(client, admin_token_headers, test_product):
+    response = client.get(
+        "/api/v1/products/export",
+        headers=admin_token_headers,
+        params={"since": "2100-01-01T00:00:00"},
+    )
+    assert response.text == ""
+
+def test_export_products_streams_in_chunks(db, test_category):
+    from app.services.catalog_io import catalog_io_service
+    for i in range(5):
+        db.add(Product(name=f"Product {i}", price=1.0, stock=1, category_id=test_category.id))
+    db.commit()
+    chunks = list(catalog_io_service.export_products(db, chunk_size=2))
+    assert [chunk.count("\n") for chunk in chunks] == [2, 2, 1]
+
+def test_read_products_batch(client, db, test_category, request):
+    other = Category(name="Other Category")
+    db.add(other)
+    db.commit()
+    ids = []
+    for i, category_id in enumerate([test_category.id, other.id, test_category.id]):
+        product = Product(name=f"Product {i}", price=10.0, stock=1, category_id=category_id)
+        db.add(product)
+        db.commit()
+        ids.append(product.id)
+
+    statements = request.getfixturevalue("query_counter")
+    response = client.get("/api/v1/products/batch", params={"ids": f"{ids[2]},999,{ids[0]},{ids[1]}"})
+    assert response.status_code == status.HTTP_200_OK, response.text
+    data = response.json()
+    assert [item["id"] for item in data] == [ids[2], 999, ids[0], ids[1]]
+    assert [item["found"] for item in data] == [True, False, True, True]
+    assert data[1]["product"] is None
+    assert data[3]["product"]["category"]["name"] == "Other Category"
+    assert len(statements) == 2
+
+    response = client.post("/api/v1/products/batch", json={"ids": [ids[1]]})
+    assert response.json()[0]["product"]["name"] == "Product 1"
+
+def test_read_products_batch_invalid_ids(client):
+    response = client.get("/api/v1/products/batch", params={"ids": "1,abc"})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
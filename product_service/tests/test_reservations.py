@@ -0,0 +1,75 @@
+from datetime import datetime, timedelta, timezone
+from fastapi import status
+
+OTHER_USER_HEADERS = {"Authorization": "Bearer admin-token"}
+
+def test_reservation_holds_stock(client, user_token_headers, test_product):
+    product_id = test_product["id"]
+    response = client.post(
+        "/api/v1/reservations/",
+        headers=user_token_headers,
+        json={"items": [{"product_id": product_id, "quantity": 7}], "ttl_seconds": 60}
+    )
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert [(r["product_id"], r["quantity"]) for r in response.json()] == [(product_id, 7)]
+
+    response = client.get("/api/v1/reservations/availability", params={"ids": str(product_id)})
+    assert response.json() == [{"product_id": product_id, "stock": 10, "reserved": 7, "available": 3}]
+
+    # Re-reserving replaces the previous hold instead of stacking on it
+    response = client.post(
+        "/api/v1/reservations/",
+        headers=user_token_headers,
+        json={"items": [{"product_id": product_id, "quantity": 8}]}
+    )
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert [r["quantity"] for r in response.json()] == [8]
+
+    response = client.post(
+        "/api/v1/reservations/",
+        headers=OTHER_USER_HEADERS,
+        json={"items": [{"product_id": product_id, "quantity": 3}]}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert response.json()["detail"] == "Not enough stock for product Test Product"
+
+def test_checkout_respects_and_converts_holds(client, db, user_token_headers, test_product):
+    from app.models.reservation import StockReservation
+    product_id = test_product["id"]
+    client.post(
+        "/api/v1/reservations/",
+        headers=user_token_headers,
+        json={"items": [{"product_id": product_id, "quantity": 8}]}
+    )
+    # Holds belong to the authenticated user; naming the holder in the body does not help
+    response = client.post(
+        "/api/v1/orders/",
+        headers=OTHER_USER_HEADERS,
+        json={"user_id": 2, "shipping_address": "Elsewhere", "items": [{"product_id": product_id, "quantity": 3}]}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST, response.text
+
+    response = client.post(
+        "/api/v1/orders/",
+        headers=user_token_headers,
+        json={"user_id": 2, "shipping_address": "Test Address", "items": [{"product_id": product_id, "quantity": 8}]}
+    )
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json()["user_id"] == 2
+    assert db.query(StockReservation).count() == 0
+    response = client.get("/api/v1/reservations/availability", params={"ids": str(product_id)})
+    assert response.json()[0]["available"] == 2
+
+def test_expired_holds_are_released_in_batches(db, test_product):
+    from app.models.reservation import StockReservation
+    from app.services.reservation import reservation_service
+    now = datetime.now(timezone.utc)
+    db.add_all(
+        [StockReservation(product_id=test_product["id"], user_id=user_id, quantity=1, expires_at=now - timedelta(minutes=1))
+         for user_id in range(5)]
+        + [StockReservation(product_id=test_product["id"], user_id=9, quantity=2, expires_at=now + timedelta(minutes=5))]
+    )
+    db.commit()
+    assert reservation_service.availability(db, product_ids=[test_product["id"]])[test_product["id"]].available == 8
+    assert reservation_service.release_expired(db, batch_size=2) == 5
+    assert [r.user_id for r in db.query(StockReservation)] == [9]
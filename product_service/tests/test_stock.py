@@ -0,0 +1,79 @@
+from fastapi import status
+from app.models.product import Product, StockShard
+
+def place_order(client, headers, product_id, quantity):
+    return client.post(
+        "/api/v1/orders/",
+        headers=headers,
+        json={"user_id": 2, "shipping_address": "Test Address", "items": [{"product_id": product_id, "quantity": quantity}]}
+    )
+
+def shard_quantities(db, product_id):
+    db.expire_all()
+    return [row.quantity for row in db.query(StockShard).filter(StockShard.product_id == product_id).order_by(StockShard.shard)]
+
+def test_sharded_checkout_and_consolidation(client, db, user_token_headers, admin_token_headers, test_product):
+    from app.services.stock import stock_counter_service
+    product_id = test_product["id"]
+    response = client.put(f"/api/v1/products/{product_id}/stock-shards", headers=admin_token_headers, json={"shards": 4})
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert response.json() == {"product_id": product_id, "stock": 10, "shards": 4}
+    assert shard_quantities(db, product_id) == [3, 3, 2, 2]
+
+    for _ in range(3):
+        assert place_order(client, user_token_headers, product_id, 2).status_code == status.HTTP_200_OK
+    assert sum(shard_quantities(db, product_id)) == 4
+    # products.stock is only a mirror until consolidation; availability sums the shards
+    assert db.query(Product.stock).filter(Product.id == product_id).scalar() == 10
+    response = client.get("/api/v1/reservations/availability", params={"ids": str(product_id)})
+    assert response.json()[0]["available"] == 4
+
+    assert stock_counter_service.consolidate(db) == [product_id]
+    assert shard_quantities(db, product_id) == [1, 1, 1, 1]
+    assert db.query(Product.stock).filter(Product.id == product_id).scalar() == 4
+
+def test_sharded_take_drains_siblings(client, db, user_token_headers, admin_token_headers, test_product):
+    product_id = test_product["id"]
+    client.put(f"/api/v1/products/{product_id}/stock-shards", headers=admin_token_headers, json={"shards": 5})
+    # No single shard holds 5, so the order is spread over several
+    order = place_order(client, user_token_headers, product_id, 5)
+    assert order.status_code == status.HTTP_200_OK, order.text
+    assert sum(shard_quantities(db, product_id)) == 5
+
+    response = place_order(client, user_token_headers, product_id, 6)
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert sum(shard_quantities(db, product_id)) == 5
+
+    response = client.post(f"/api/v1/orders/{order.json()['id']}/cancel", headers=user_token_headers)
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert sum(shard_quantities(db, product_id)) == 10
+
+def test_sharded_stock_update_and_unshard(client, db, admin_token_headers, test_product):
+    product_id = test_product["id"]
+    client.put(f"/api/v1/products/{product_id}/stock-shards", headers=admin_token_headers, json={"shards": 2})
+    response = client.put(f"/api/v1/products/{product_id}", headers=admin_token_headers, json={"stock": 7})
+    assert response.status_code == status.HTTP_200_OK, response.text
+    assert shard_quantities(db, product_id) == [4, 3]
+
+    response = client.delete(f"/api/v1/products/{product_id}/stock-shards", headers=admin_token_headers)
+    assert response.json() == {"product_id": product_id, "stock": 7, "shards": 0}
+    assert shard_quantities(db, product_id) == []
+
+def test_cart_checks_sum_the_shards(client, db, user_token_headers, admin_token_headers, test_product, test_cart):
+    product_id = test_product["id"]
+    client.put(f"/api/v1/products/{product_id}/stock-shards", headers=admin_token_headers, json={"shards": 4})
+    for _ in range(3):
+        place_order(client, admin_token_headers, product_id, 2)
+    # Four units left in the shards while products.stock still says 10
+    response = client.post("/api/v1/cart/items/", headers=user_token_headers, json={"product_id": product_id, "quantity": 5})
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    response = client.post("/api/v1/cart/items/", headers=user_token_headers, json={"product_id": product_id, "quantity": 4})
+    assert response.status_code == status.HTTP_200_OK, response.text
+    response = client.patch(
+        "/api/v1/cart/items",
+        headers=user_token_headers,
+        json={"operations": [{"op": "set", "product_id": product_id, "quantity": 5}]}
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    place_order(client, admin_token_headers, product_id, 1)
+    assert client.get("/api/v1/cart/summary", headers=user_token_headers).json()["has_out_of_stock"] is True
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 from typing import List
 import re
 from app import models, schemas
@@ -55,7 +55,14 @@ async def read_users(
     db: Session = Depends(get_db),
     _: str = Depends(require_role(["Admin"]))
 ):
-    users = db.query(models.User).offset(skip).limit(limit).all()
+    users = (
+        db.query(models.User)
+        .options(selectinload(models.User.addresses), selectinload(models.User.contacts))
+        .order_by(models.User.id)
+        .offset(skip)
+        .limit(limit)
+        .all()
+    )
     return users
 
 @router.get("/users/{user_id}", response_model=schemas.User)
@@ -64,7 +71,12 @@ async def read_user(
     db: Session = Depends(get_db),
     _: str = Depends(require_role(["Admin"]))
 ):
-    user = db.query(models.User).filter(models.User.id == user_id).first()
+    user = (
+        db.query(models.User)
+        .options(selectinload(models.User.addresses), selectinload(models.User.contacts))
+        .filter(models.User.id == user_id)
+        .first()
+    )
     if user is None:
         raise HTTPException(
             status_code=404, 
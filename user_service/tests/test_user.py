@@ -2,7 +2,7 @@ import os
 import sys
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
 from datetime import datetime, timedelta, timezone
@@ -268,6 +268,48 @@ def test_get_nonexistent_user(admin_token):
     )
     assert response.status_code == 404
 
+def test_list_users_query_count(admin_token):
+    """U10: Listing users does not lazy load addresses and contacts per user"""
+    def add_users(prefix, count):
+        db = TestingSessionLocal()
+        for i in range(count):
+            user = models.User(
+                username=f"{prefix}{i}",
+                email=f"{prefix}{i}@example.com",
+                hashed_password="x",
+                role="User"
+            )
+            user.addresses.append(models.Address(type="home", street="1 Main St", city="City",
+                                                 state="State", country="Country", postal_code="12345"))
+            user.contacts.append(models.Contact(phone_type="mobile", phone_number="5551234567"))
+            db.add(user)
+        db.commit()
+        db.close()
+
+    def count_queries():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        try:
+            response = client.get(
+                "/users/",
+                headers={"Authorization": f"Bearer {admin_token}"}
+            )
+        finally:
+            event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        assert response.status_code == 200
+        return len(response.json()), len(statements)
+
+    add_users("few", 2)
+    few_users, few_queries = count_queries()
+    add_users("many", 10)
+    many_users, many_queries = count_queries()
+    assert many_users == few_users + 10
+    assert many_queries == few_queries
+
 # Contact & Address Tests
 def test_add_user_address(user_token):
     """C1: Add new address"""